@@ -0,0 +1,174 @@
+"""
+Admission control for database-backed routes.
+
+Every request that opens a database session first takes a slot from the
+worker's admission controller. Routes are classed as "heavy" (listings,
+aggregates, exports: `Settings.heavy_routes`) or "light" (everything
+else, mostly point lookups). Each class has its own concurrency limit,
+and both share a total budget kept below the connection pool, so scans
+can never hold every connection. The remaining connections are left for
+the sessions that partitioned aggregates open in parallel
+(`parallel_max_workers`) and for background work.
+
+Requests that cannot run yet wait in a single priority queue: when a
+slot frees up, light requests are admitted before heavy ones, and FIFO
+within a class. Queues are bounded in length and in wait time; past
+either bound the request is shed with `503` and `Retry-After` instead of
+adding load to Postgres.
+"""
+import asyncio
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+HEAVY = "heavy"
+LIGHT = "light"
+
+# Lower is admitted first
+PRIORITIES = {LIGHT: 0, HEAVY: 1}
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is shed; `retry_after` is in seconds.
+    """
+
+    def __init__(self, route_class: str, reason: str, retry_after: int):
+        super().__init__(f"{route_class} requests {reason}")
+        self.route_class = route_class
+        self.retry_after = retry_after
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    sequence: int
+    route_class: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class AdmissionController:
+    """
+    Per-class concurrency limits under a shared total, with a bounded
+    priority queue of waiting requests.
+    """
+
+    def __init__(
+        self,
+        total: int,
+        limits: Dict[str, int],
+        max_queue: Dict[str, int],
+        max_wait_seconds: Dict[str, float],
+        retry_after_seconds: int,
+    ):
+        self.total = total
+        self.limits = limits
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.running: Dict[str, int] = {name: 0 for name in limits}
+        self.queued: Dict[str, int] = {name: 0 for name in limits}
+        self.shed: Dict[str, int] = {name: 0 for name in limits}
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+
+    def _fits(self, route_class: str) -> bool:
+        return (
+            sum(self.running.values()) < self.total
+            and self.running[route_class] < self.limits[route_class]
+        )
+
+    def _ahead(self, route_class: str) -> bool:
+        """Whether a waiter of the same or a higher priority is queued."""
+        return any(w.priority <= PRIORITIES[route_class] for w in self._waiters)
+
+    async def acquire(self, route_class: str) -> None:
+        """
+        Take a slot for `route_class`, waiting in the queue if needed.
+
+        Raises:
+            Overloaded: If the class queue is full or the wait timed out
+        """
+        if self._fits(route_class) and not self._ahead(route_class):
+            self.running[route_class] += 1
+            return
+        if self.queued[route_class] >= self.max_queue[route_class]:
+            self.shed[route_class] += 1
+            raise Overloaded(route_class, "queue is full", self.retry_after_seconds)
+
+        waiter = _Waiter(
+            PRIORITIES[route_class],
+            next(self._sequence),
+            route_class,
+            asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._waiters, waiter)
+        self.queued[route_class] += 1
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter.future), self.max_wait_seconds[route_class]
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the wait ended: hand the slot back
+                self.release(route_class)
+            else:
+                waiter.future.cancel()
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self.queued[route_class] -= 1
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            self.shed[route_class] += 1
+            raise Overloaded(route_class, "waited too long", self.retry_after_seconds) from None
+
+    def release(self, route_class: str) -> None:
+        """
+        Return a slot and admit the queued requests that now fit, by priority.
+        """
+        self.running[route_class] -= 1
+        blocked = []
+        while self._waiters and sum(self.running.values()) < self.total:
+            waiter = heapq.heappop(self._waiters)
+            if not self._fits(waiter.route_class):
+                # Class at its own limit: let lower priorities through
+                blocked.append(waiter)
+                continue
+            self.queued[waiter.route_class] -= 1
+            self.running[waiter.route_class] += 1
+            waiter.future.set_result(None)
+        for waiter in blocked:
+            heapq.heappush(self._waiters, waiter)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {
+                "limit": self.limits[name],
+                "running": self.running[name],
+                "queued": self.queued[name],
+                "shed": self.shed[name],
+            }
+            for name in self.limits
+        }
+
+
+def route_class(route_name: Optional[str]) -> str:
+    """
+    Admission class of a route, by its endpoint function name.
+    """
+    return HEAVY if route_name in settings.heavy_routes else LIGHT
+
+
+admission = AdmissionController(
+    total=settings.admission_total_slots,
+    limits={HEAVY: settings.admission_heavy_slots, LIGHT: settings.admission_light_slots},
+    max_queue={HEAVY: settings.admission_heavy_queue, LIGHT: settings.admission_light_queue},
+    max_wait_seconds={
+        HEAVY: settings.admission_heavy_wait_seconds,
+        LIGHT: settings.admission_light_wait_seconds,
+    },
+    retry_after_seconds=settings.admission_retry_after_seconds,
+)
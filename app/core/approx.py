@@ -0,0 +1,192 @@
+"""
+Approximate aggregates from block samples, with confidence intervals.
+
+`TABLESAMPLE SYSTEM (p)` keeps every table block independently with
+probability p/100. Treating blocks as the sampling units gives unbiased
+Horvitz-Thompson estimates of counts and sums, and variances that stay
+honest when rows are clustered on disk:
+
+    total  = sum(y_b) / p
+    var    = (1 - p) / p^2 * sum(y_b^2)
+
+Means are ratio estimates (sum / count) with the usual linearized
+variance. Intervals are normal-approximation 95% intervals.
+
+Callers ask for a relative error bound: the sample grows (up to
+`approx_max_sample_percent`) until every estimate meets it, otherwise
+`estimate_groups` returns None and the route falls back to the exact path.
+"""
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy import Label, TableSample, func, literal, literal_column, select, tablesample
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+Z_95 = 1.959964
+
+APPROX_DESCRIPTION = "Estimate from a table sample, with 95% confidence intervals"
+SAMPLE_PERCENT_DESCRIPTION = "Initial sample size in percent of the table blocks (default `APPROX_SAMPLE_PERCENT`)"
+MAX_ERROR_DESCRIPTION = "Largest accepted relative half-width of the intervals before falling back to the exact path (default `APPROX_MAX_ERROR`)"
+
+
+@dataclass
+class Estimate:
+    """
+    Point estimate with a 95% confidence interval.
+    """
+    value: float
+    low: float
+    high: float
+
+    @classmethod
+    def from_variance(cls, value: float, variance: float) -> "Estimate":
+        half_width = Z_95 * math.sqrt(max(variance, 0.0))
+        return cls(value, value - half_width, value + half_width)
+
+    @property
+    def relative_error(self) -> float:
+        if self.value == 0:
+            return 0.0 if self.high == self.low else math.inf
+        return (self.high - self.low) / 2 / abs(self.value)
+
+    @property
+    def interval(self) -> Tuple[float, float]:
+        return self.low, self.high
+
+
+@dataclass
+class GroupEstimate:
+    """
+    Estimates of one group: row count, and per measure sum, mean and sample min/max.
+    """
+    rows: Estimate
+    sums: Dict[str, Estimate] = field(default_factory=dict)
+    means: Dict[str, Estimate] = field(default_factory=dict)
+    minimums: Dict[str, float] = field(default_factory=dict)
+    maximums: Dict[str, float] = field(default_factory=dict)
+
+    def within(self, max_error: float) -> bool:
+        estimates = [self.rows, *self.sums.values(), *self.means.values()]
+        return all(estimate.relative_error <= max_error for estimate in estimates)
+
+
+def sample_percents(start: Optional[float]) -> List[float]:
+    """
+    Increasing sample sizes to try, from `start` up to `approx_max_sample_percent`.
+    """
+    percent = start or settings.approx_sample_percent
+    percents = []
+    while percent < settings.approx_max_sample_percent:
+        percents.append(percent)
+        percent *= 4
+    percents.append(settings.approx_max_sample_percent)
+    return percents
+
+
+def sampled_table(model, percent: float, seed: int) -> TableSample:
+    """
+    Block sample of a model's table, reproducible for a given seed.
+    """
+    return tablesample(model.__table__, func.system(percent), name="sampled", seed=literal(seed))
+
+
+def estimate_groups(
+    db: Session,
+    model,
+    groups: Callable[[TableSample], List[Label]],
+    measures: List[str],
+    where: Callable[[TableSample], List],
+    max_error: float,
+    sample_percent: Optional[float] = None,
+) -> Optional[Tuple[Dict[Hashable, GroupEstimate], float, int]]:
+    """
+    Estimate count, sums and means per group from growing block samples.
+
+    Groups absent from the sample are absent from the result; small groups
+    rarely meet the error bound and force the exact fallback instead.
+
+    Args:
+        model: SQLAlchemy model of the sampled table
+        groups: Callable returning the labeled grouping expressions over the sample (may be empty)
+        measures: Names of the numeric columns to sum and average
+        where: Callable returning the filter clauses over the sample
+        max_error: Relative half-width every estimate must reach
+        sample_percent: First sample size to try (default `approx_sample_percent`)
+
+    Returns:
+        (estimates by tuple of group values, sample percent used, seed), or
+        None when even the largest sample misses the error bound
+    """
+    for percent in sample_percents(sample_percent):
+        seed = random.randrange(2 ** 31)
+        sampled = sampled_table(model, percent, seed)
+        estimates = _estimate(db, sampled, groups(sampled), measures, where(sampled), percent / 100)
+        if estimates and all(group.within(max_error) for group in estimates.values()):
+            return estimates, percent, seed
+    return None
+
+
+def _estimate(db, sampled, groups, measures, clauses, p) -> Dict[Hashable, GroupEstimate]:
+    # Page number of the row: blocks are the sampling units
+    block = literal_column(f"({sampled.name}.ctid::text::point)[0]").label("block")
+    inner_columns = [*groups, block, func.count().label("n")]
+    for name in measures:
+        column = sampled.c[name]
+        inner_columns += [
+            func.sum(column).label(f"s_{name}"),
+            func.count(column).label(f"c_{name}"),
+            func.min(column).label(f"min_{name}"),
+            func.max(column).label(f"max_{name}"),
+        ]
+    inner = (
+        select(*inner_columns)
+        .where(*clauses)
+        .group_by(*groups, block)
+        .subquery("blocks")
+    )
+
+    outer_groups = [inner.c[group.name] for group in groups]
+    n = inner.c.n
+    outer_columns = [*outer_groups, func.sum(n), func.sum(n * n)]
+    for name in measures:
+        s, c = inner.c[f"s_{name}"], inner.c[f"c_{name}"]
+        outer_columns += [
+            func.sum(s), func.sum(s * s), func.sum(c), func.sum(c * c), func.sum(s * c),
+            func.min(inner.c[f"min_{name}"]), func.max(inner.c[f"max_{name}"]),
+        ]
+    rows = db.execute(select(*outer_columns).group_by(*outer_groups)).all()
+
+    scale = (1 - p) / (p * p)
+    estimates = {}
+    for row in rows:
+        key = tuple(row[: len(groups)])
+        values = row[len(groups):]
+        rows_sum, rows_sq = float(values[0]), float(values[1])
+        group = GroupEstimate(rows=Estimate.from_variance(rows_sum / p, scale * rows_sq))
+        for i, name in enumerate(measures):
+            s, s_sq, c, c_sq, s_c, minimum, maximum = values[2 + i * 7: 9 + i * 7]
+            if not c:
+                continue
+            s, s_sq, c, c_sq, s_c = (float(v) for v in (s, s_sq, c, c_sq, s_c))
+            group.sums[name] = Estimate.from_variance(s / p, scale * s_sq)
+            ratio = s / c
+            # Linearized variance of the ratio sum(s) / sum(c)
+            residual_sq = s_sq - 2 * ratio * s_c + ratio * ratio * c_sq
+            group.means[name] = Estimate.from_variance(ratio, scale * residual_sq / (c / p) ** 2)
+            group.minimums[name] = minimum
+            group.maximums[name] = maximum
+        estimates[key] = group
+    return estimates
+
+
+def set_sample_headers(response: Response, percent: float) -> None:
+    """
+    Mark a response as estimated from a sample of `percent` percent of the table.
+    """
+    response.headers["X-Data-Source"] = "sample"
+    response.headers["X-Sample-Percent"] = f"{percent:g}"
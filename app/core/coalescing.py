@@ -0,0 +1,114 @@
+"""
+Single-flight coalescing of identical concurrent GET requests.
+
+While a GET is being served, identical requests arriving in the same
+worker (same path and same query parameters, in any order) wait for the
+in-flight response and replay it instead of running the query again.
+Nothing is kept once the leading request completes, so this is not a
+cache: a request that arrives after the response was sent runs normally.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import STICKY_COOKIE
+
+logger = logging.getLogger(__name__)
+
+FlightKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class SingleFlightMiddleware:
+    """
+    ASGI middleware sharing one in-flight GET response between identical requests.
+
+    Followers wait at most `coalesce_wait_seconds` for the leader; past
+    that, or when the leader's response cannot be shared (5xx, larger
+    than `coalesce_max_body_bytes`, client gone mid-response), they run
+    the request themselves. Streams, ranged downloads and requests pinned
+    to the primary by read-your-writes are never coalesced.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._flights: Dict[FlightKey, asyncio.Future] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        key = self._key(scope)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            try:
+                messages = await asyncio.wait_for(
+                    asyncio.shield(flight), timeout=settings.coalesce_wait_seconds
+                )
+            except asyncio.TimeoutError:
+                messages = None
+            if messages is None:
+                await self.app(scope, receive, send)
+                return
+            for message in messages:
+                if message["type"] == "http.response.start":
+                    message = {
+                        **message,
+                        "headers": [*message["headers"], (b"x-coalesced", b"1")],
+                    }
+                await send(message)
+            return
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        messages: List[Message] = []
+        shareable = True
+        size = 0
+
+        async def capture(message: Message) -> None:
+            nonlocal shareable, size
+            if shareable:
+                if message["type"] == "http.response.start" and message["status"] >= 500:
+                    shareable = False
+                elif message["type"] == "http.response.body":
+                    size += len(message.get("body", b""))
+                    if size > settings.coalesce_max_body_bytes:
+                        shareable = False
+                if shareable:
+                    messages.append(message)
+                else:
+                    messages.clear()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            del self._flights[key]
+            complete = bool(messages) and not messages[-1].get("more_body", False)
+            flight.set_result(messages if shareable and complete else None)
+
+    @staticmethod
+    def _key(scope: Scope) -> Optional[FlightKey]:
+        """
+        Build the coalescing key, or None when the request must run on its own.
+        """
+        if (
+            not settings.coalesce_enabled
+            or scope["type"] != "http"
+            or scope["method"] != "GET"
+        ):
+            return None
+        path = scope["path"]
+        if any(path.startswith(settings.api_prefix + p) for p in settings.coalesce_exclude_paths):
+            return None
+        for name, value in scope["headers"]:
+            if name == b"range":
+                return None
+            if name == b"cookie" and STICKY_COOKIE.encode() in value:
+                return None
+        query = parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+        return path, tuple(sorted(query))
@@ -3,7 +3,7 @@ Application configuration settings using Pydantic Settings.
 """
 
 import os
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -27,6 +27,107 @@ class Settings(BaseSettings):
     api_version: str = "1.0.0"
     api_prefix: str = "/api/v2"
 
+    db_driver: str = "psycopg2"
+    db_prepare_threshold: int = 2
+    db_binary_results: bool = True
+
+    database_replica_urls: str = ""
+    replica_health_check_interval: float = 5.0
+    read_your_writes_seconds: float = 0.0
+
+    status_shard_urls: str = ""
+    status_shard_strategy: Literal["hash", "range"] = "hash"
+    status_shard_range_starts: str = ""
+    # Largest `skip` of a status listing read from every shard; deeper pages need `cursor`
+    status_shard_max_skip: int = 10000
+
+    statement_timeout_ms: int = 30000
+    route_statement_timeouts_ms: Dict[str, int] = {
+        "get_status_records": 10000,
+        "get_trips": 10000,
+        "get_weather_records": 5000,
+    }
+    disconnect_poll_interval: float = 0.5
+
+    count_exact_threshold: int = 100000
+    count_cache_ttl_seconds: float = 60.0
+
+    retention_enabled: bool = False
+    retention_days: int = 365
+    retention_batch_hours: int = 24
+    retention_max_batches: int = 500
+    retention_interval_minutes: int = 60
+    retention_vacuum: bool = True
+    change_log_retention_days: int = 30
+
+    changes_max_limit: int = 10000
+
+    pool_warmup_connections: int = 5
+
+    export_dir: str = "/tmp/sfbikeshare-exports"
+    export_workers: int = 2
+    export_batch_rows: int = 10000
+
+    sse_buffer_size: int = 100
+    sse_heartbeat_seconds: float = 15.0
+
+    coalesce_enabled: bool = True
+    coalesce_wait_seconds: float = 5.0
+    coalesce_max_body_bytes: int = 4 * 1024 * 1024
+    coalesce_exclude_paths: List[str] = ["/status/stream", "/exports"]
+
+    status_snapshot_enabled: bool = True
+    status_snapshot_dir: str = "/tmp/sfbikeshare-status-snapshot"
+    status_snapshot_check_seconds: float = 30.0
+
+    weather_cube_check_seconds: float = 30.0
+
+    parallel_max_workers: int = 8
+    parallel_min_partition_hours: float = 24 * 7
+    route_parallel_degree: Dict[str, int] = {
+        "aggregate_status": 4,
+        "aggregate_trips": 4,
+    }
+
+    status_write_behind: bool = False
+    status_write_durability: Literal["flush", "enqueue"] = "flush"
+    status_buffer_max_rows: int = 10000
+    status_flush_rows: int = 1000
+    status_flush_interval_ms: int = 200
+    status_flush_wait_seconds: float = 10.0
+
+    admission_enabled: bool = True
+    # Pool of 30 minus parallel_max_workers partition sessions and a few
+    # background connections (write-behind flusher, exports, refreshers)
+    admission_total_slots: int = 20
+    admission_heavy_slots: int = 6
+    admission_light_slots: int = 20
+    admission_heavy_queue: int = 50
+    admission_light_queue: int = 200
+    admission_heavy_wait_seconds: float = 10.0
+    admission_light_wait_seconds: float = 2.0
+    admission_retry_after_seconds: int = 5
+    heavy_routes: List[str] = [
+        "get_stations",
+        "rank_station_outages",
+        "get_status_records",
+        "aggregate_status",
+        "get_status_at",
+        "get_trips",
+        "get_active_trips",
+        "count_active_trips",
+        "aggregate_trips",
+        "get_bike_timeline",
+        "get_weather_records",
+        "get_daily_demand",
+        "download_export",
+        "get_changes",
+    ]
+
+    approx_sample_percent: float = 1.0
+    approx_max_sample_percent: float = 25.0
+    approx_max_error: float = 0.01
+
     @property
     def database_url(self) -> str:
         """
@@ -37,5 +138,32 @@ class Settings(BaseSettings):
             f"@{self.postgres_host_app}:{self.postgres_port_app}/{self.postgres_db_app}"
         )
 
+    @property
+    def replica_urls(self) -> List[str]:
+        """
+        Read replica URLs parsed from the comma-separated `DATABASE_REPLICA_URLS`.
+        """
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+
+    @property
+    def status_shard_url_list(self) -> List[str]:
+        """
+        Status shard URLs parsed from the comma-separated `STATUS_SHARD_URLS`.
+        """
+        return [url.strip() for url in self.status_shard_urls.split(",") if url.strip()]
+
+    @property
+    def status_shard_range_start_list(self) -> List[int]:
+        """
+        First station ID of each shard after the first (`range` strategy).
+        """
+        return [int(value) for value in self.status_shard_range_starts.split(",") if value.strip()]
+
+    def statement_timeout_for(self, route_name: Optional[str]) -> int:
+        """
+        Statement timeout in milliseconds for the given route (endpoint function name).
+        """
+        return self.route_statement_timeouts_ms.get(route_name, self.statement_timeout_ms)
+
 
 settings = Settings()
@@ -0,0 +1,109 @@
+"""
+Cheap total-count metadata for paginated list routes.
+"""
+import threading
+import time
+from typing import Dict, NamedTuple, Tuple
+
+from fastapi import Response
+from sqlalchemy import text
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_COUNT_EXACT_HEADER = "X-Total-Count-Exact"
+
+
+class TotalCount(NamedTuple):
+    """A row count and whether it is exact or a planner estimate."""
+
+    value: int
+    exact: bool
+
+
+_CACHE_MAX_ENTRIES = 1024
+
+_cache: Dict[Tuple, Tuple[float, TotalCount]] = {}
+_cache_lock = threading.Lock()
+
+
+def _table_estimate(db: Session, table: str) -> int:
+    """
+    Row estimate of a whole table from `pg_class.reltuples`.
+    """
+    reltuples = db.execute(
+        text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": f"public.{table}"},
+    ).scalar()
+    return max(int(reltuples or 0), 0)
+
+
+def _plan_estimate(db: Session, query: Query) -> int:
+    """
+    Planner row estimate of a query from `EXPLAIN (FORMAT JSON)`.
+    """
+    compiled = query.statement.compile(dialect=db.get_bind().dialect)
+    plan = db.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _cache_key(db: Session, query: Query) -> Tuple:
+    # Status shards (see `app.core.sharding`) hold different rows for the same query
+    compiled = query.statement.compile(dialect=db.get_bind().dialect)
+    params = tuple(sorted((k, str(v)) for k, v in compiled.params.items()))
+    return db.info.get("shard"), str(compiled), params
+
+
+def total_count(db: Session, query: Query, table: str, filtered: bool) -> TotalCount:
+    """
+    Count the rows matched by a list query as cheaply as possible.
+
+    Unfiltered queries use `pg_class.reltuples` and filtered ones the
+    planner's row estimate. Sets estimated below
+    `Settings.count_exact_threshold` are counted exactly. Results are
+    cached per statement and parameters for `count_cache_ttl_seconds`.
+
+    Args:
+        db: Session to count with
+        query: Filtered query, without ordering or pagination
+        table: Table name used for the unfiltered estimate
+        filtered: Whether the query has any filter applied
+
+    Returns:
+        TotalCount: The count and whether it is exact
+    """
+    key = _cache_key(db, query)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    estimate = _plan_estimate(db, query) if filtered else _table_estimate(db, table)
+    if estimate <= settings.count_exact_threshold:
+        result = TotalCount(query.order_by(None).count(), True)
+    else:
+        result = TotalCount(estimate, False)
+
+    with _cache_lock:
+        if len(_cache) >= _CACHE_MAX_ENTRIES:
+            for stale in [k for k, (expires, _) in _cache.items() if expires <= now]:
+                del _cache[stale]
+            if len(_cache) >= _CACHE_MAX_ENTRIES:
+                _cache.clear()
+        _cache[key] = (now + settings.count_cache_ttl_seconds, result)
+    return result
+
+
+def set_total_count_headers(
+    response: Response, db: Session, query: Query, table: str, filtered: bool
+) -> None:
+    """
+    Add `X-Total-Count` and `X-Total-Count-Exact` headers for a list query.
+    """
+    count = total_count(db, query, table, filtered)
+    response.headers[TOTAL_COUNT_HEADER] = str(count.value)
+    response.headers[TOTAL_COUNT_EXACT_HEADER] = "true" if count.exact else "false"
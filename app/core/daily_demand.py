@@ -0,0 +1,53 @@
+"""
+Incremental maintenance of the precomputed daily demand x weather table.
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+def refresh_daily_demand(
+    db: Session, days: Iterable[date], station_ids: Optional[Iterable[Optional[int]]] = None
+) -> None:
+    """
+    Recompute the `daily_demand` rows of the given days.
+
+    Runs inside the caller's transaction so the fact table is committed
+    together with the trip or weather change that made it stale. The
+    database function locks each day until commit, so concurrent writes
+    to the same day are applied one after the other.
+
+    Args:
+        db: Session holding the pending write
+        days: Days whose rows must be rebuilt
+        station_ids: Only rebuild the rows of these stations (all when None)
+    """
+    stations = None
+    if station_ids is not None:
+        stations = sorted({s for s in station_ids if s is not None})
+        if not stations:
+            return
+    db.flush()
+    for day in sorted(set(days)):
+        db.execute(
+            text("SELECT public.refresh_daily_demand(:start, :end, CAST(:stations AS INTEGER[]))"),
+            {"start": day, "end": day + timedelta(days=1), "stations": stations},
+        )
+
+
+def zip_code_stations(db: Session, zip_code: str) -> List[int]:
+    """
+    Stations whose city uses the weather of the given ZIP code.
+    """
+    rows = db.execute(
+        text(
+            "SELECT s.id FROM public.station s "
+            "JOIN public.city_zip_code z ON z.city = s.city "
+            "WHERE z.zip_code = :zip_code"
+        ),
+        {"zip_code": zip_code},
+    )
+    return [row[0] for row in rows]
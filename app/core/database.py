@@ -1,28 +1,293 @@
 """
 Database session management using SQLAlchemy.
 """
-from typing import Generator
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from typing import AsyncGenerator, Dict, List, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 
+from app.core.admission import Overloaded, admission, route_class
 from app.core.config import settings
 
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    echo=False,
-)
+# Connections per engine: `POOL_SIZE` kept open, up to `POOL_MAX_OVERFLOW` more
+POOL_SIZE = 10
+POOL_MAX_OVERFLOW = 20
+
+# SQLAlchemy URL scheme of each supported driver (`DB_DRIVER`)
+DRIVER_SCHEMES = {
+    "psycopg2": "postgresql+psycopg2",
+    "psycopg": "postgresql+psycopg",
+}
+
+
+def _engine_url(url: str) -> str:
+    """
+    Rewrite a `postgresql://` URL for the configured driver.
+    """
+    if settings.db_driver not in DRIVER_SCHEMES:
+        raise ValueError(
+            f"Unsupported DB_DRIVER {settings.db_driver!r}; use one of {', '.join(DRIVER_SCHEMES)}"
+        )
+    return f"{DRIVER_SCHEMES[settings.db_driver]}://{url.split('://', 1)[1]}"
+
+
+if settings.db_driver == "psycopg":
+    import psycopg
+
+    class BinaryCursor(psycopg.Cursor):
+        """
+        psycopg 3 cursor requesting binary results unless told otherwise.
+        """
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.format = psycopg.pq.Format.BINARY
+
+
+def _use_binary_results(dbapi_connection, connection_record):
+    """
+    Make every client-side cursor of a psycopg 3 connection fetch results in binary format.
+    """
+    dbapi_connection.cursor_factory = BinaryCursor
+
+
+def _create_engine(url: str) -> Engine:
+    """
+    Create a pooled engine for the configured driver.
+
+    With `DB_DRIVER=psycopg`, statements executed `DB_PREPARE_THRESHOLD`
+    times on a connection become server-side prepared statements (no
+    re-parse and re-plan; a negative threshold disables them), results travel in binary format when
+    `DB_BINARY_RESULTS` is set, and `executemany` batches are pipelined.
+    """
+    connect_args = {}
+    if settings.db_driver == "psycopg":
+        threshold = settings.db_prepare_threshold
+        connect_args["prepare_threshold"] = threshold if threshold >= 0 else None
+    created = create_engine(
+        _engine_url(url),
+        pool_pre_ping=True,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        echo=False,
+        connect_args=connect_args,
+    )
+    if settings.db_driver == "psycopg" and settings.db_binary_results:
+        event.listen(created, "connect", _use_binary_results)
+    return created
+
+
+engine = _create_engine(settings.database_url)
+
+replica_engines = [_create_engine(url) for url in settings.replica_urls]
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db() -> Generator[Session, None, None]:
+logger = logging.getLogger(__name__)
+
+# Partitioned aggregates open up to `parallel_max_workers` sessions besides
+# the admitted requests' own, on the same engine (or shard engine)
+if settings.admission_total_slots + settings.parallel_max_workers > POOL_SIZE + POOL_MAX_OVERFLOW:
+    logger.warning(
+        "ADMISSION_TOTAL_SLOTS (%s) + PARALLEL_MAX_WORKERS (%s) exceed the %s connections "
+        "of each pool; heavy aggregates can exhaust it",
+        settings.admission_total_slots,
+        settings.parallel_max_workers,
+        POOL_SIZE + POOL_MAX_OVERFLOW,
+    )
+
+READ_METHODS = {"GET", "HEAD"}
+STICKY_COOKIE = "sfbikeshare_primary_until"
+
+
+class ReplicaRouter:
+    """
+    Round-robin selection over the healthy read replicas.
+
+    A replica that fails a connection is taken out of rotation for
+    `check_interval` seconds and probed with `SELECT 1` before it is
+    handed out again.
+    """
+
+    def __init__(self, engines: List[Engine], check_interval: float):
+        self._engines = engines
+        self._check_interval = check_interval
+        self._unhealthy_until: Dict[int, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self) -> Optional[Engine]:
+        """
+        Return the next healthy replica, or None when none is available.
+        """
+        for _ in range(len(self._engines)):
+            with self._lock:
+                index = next(self._counter) % len(self._engines)
+            if self._is_healthy(index):
+                return self._engines[index]
+        return None
+
+    def mark_unhealthy(self, replica: Engine) -> None:
+        """
+        Take a replica out of rotation until its next health check.
+        """
+        index = self._engines.index(replica)
+        with self._lock:
+            self._unhealthy_until[index] = time.monotonic() + self._check_interval
+
+    def _is_healthy(self, index: int) -> bool:
+        with self._lock:
+            until = self._unhealthy_until.get(index)
+        if until is None:
+            return True
+        if time.monotonic() < until:
+            return False
+        if self._probe(self._engines[index]):
+            with self._lock:
+                self._unhealthy_until.pop(index, None)
+            return True
+        self.mark_unhealthy(self._engines[index])
+        return False
+
+    @staticmethod
+    def _probe(replica: Engine) -> bool:
+        try:
+            with replica.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except OperationalError:
+            return False
+
+
+replica_router = ReplicaRouter(replica_engines, settings.replica_health_check_interval)
+
+
+def _is_sticky(request: Request) -> bool:
+    """
+    Whether the client wrote recently enough to be pinned to the primary.
+    """
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+@event.listens_for(SessionLocal, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    """
+    Enforce the session's time budget on every transaction it begins.
+
+    `set_config(..., true)` is transaction-local, so the pooled connection
+    goes back to the pool without the setting.
+    """
+    timeout_ms = session.info.get("statement_timeout_ms")
+    if timeout_ms is not None:
+        connection.execute(
+            text("SELECT set_config('statement_timeout', :timeout, true)"),
+            {"timeout": str(timeout_ms)},
+        )
+    session.info["backend_pid"] = connection.connection.dbapi_connection.info.backend_pid
+
+
+@event.listens_for(SessionLocal, "after_commit")
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_backend(session):
+    """
+    Drop the backend PID before the connection goes back to the pool.
+
+    Request sessions hold `cancel_lock` while cancelling, so a cancel in
+    flight finishes before the connection can be handed to another request.
+    """
+    with session.info.get("cancel_lock") or nullcontext():
+        session.info.pop("backend_pid", None)
+
+
+def _open_session(request: Request) -> Session:
+    """
+    Open a session on a replica for reads, falling back to the primary.
+
+    The session carries the statement timeout of the matched route.
+    """
+    route = request.scope.get("route")
+    info = {"statement_timeout_ms": settings.statement_timeout_for(getattr(route, "name", None))}
+
+    if request.method in READ_METHODS and not _is_sticky(request):
+        while (replica := replica_router.choose()) is not None:
+            db = SessionLocal(bind=replica, info={**info, "cancel_lock": threading.Lock()})
+            try:
+                db.connection()
+                return db
+            except OperationalError:
+                db.close()
+                replica_router.mark_unhealthy(replica)
+    return SessionLocal(info={**info, "cancel_lock": threading.Lock()})
+
+
+def _close_session(db: Session) -> None:
+    """
+    Close a request session, waiting for a disconnect cancel in flight.
+
+    `Session.close` returns the connection without the after_rollback
+    event, so the backend PID is dropped here first.
+    """
+    _forget_backend(db)
+    db.close()
+
+
+def _cancel_backend(db: Session) -> None:
+    """
+    Cancel the query currently running on the session's backend, if any.
+
+    Runs under the session's `cancel_lock`, so the backend cannot be
+    returned to the pool (and reused by another request) meanwhile.
+    """
+    with db.info["cancel_lock"]:
+        backend_pid = db.info.get("backend_pid")
+        if backend_pid is None:
+            return
+        with db.get_bind().connect() as conn:
+            conn.execute(text("SELECT pg_cancel_backend(:pid)"), {"pid": backend_pid})
+    logger.info("Cancelled backend %s after client disconnect", backend_pid)
+
+
+async def _cancel_on_disconnect(request: Request, db: Session) -> None:
+    """
+    Poll the client connection and cancel the backend query once it hangs up.
+    """
+    while not await request.is_disconnected():
+        await asyncio.sleep(settings.disconnect_poll_interval)
+    await run_in_threadpool(_cancel_backend, db)
+
+
+async def get_db(request: Request, response: Response) -> AsyncGenerator[Session, None]:
     """
     Dependency function to get database session.
+
+    GET/HEAD requests run on a read replica when `DATABASE_REPLICA_URLS`
+    is set; every other method runs on the primary. With
+    `READ_YOUR_WRITES_SECONDS` > 0, a write pins the client's following
+    reads to the primary through a cookie for that many seconds.
+
+    Each transaction runs under the route's `statement_timeout` (see
+    `Settings.route_statement_timeouts_ms`). For reads, the running query
+    is cancelled with `pg_cancel_backend` when the client disconnects.
+
+    Before a session is opened the request takes an admission slot of its
+    route class (see `app.core.admission`); shed requests get `503` with
+    `Retry-After`.
     
     Yields:
         Session: SQLAlchemy database session
@@ -34,8 +299,41 @@ def get_db() -> Generator[Session, None, None]:
             return db.query(Station).all()
         ```
     """
-    db = SessionLocal()
+    admitted = None
+    if settings.admission_enabled:
+        admitted = route_class(getattr(request.scope.get("route"), "name", None))
+        try:
+            await admission.acquire(admitted)
+        except Overloaded as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Server busy: {exc}",
+                headers={"Retry-After": str(exc.retry_after)},
+            )
+    try:
+        db = await run_in_threadpool(_open_session, request)
+    except BaseException:
+        if admitted is not None:
+            admission.release(admitted)
+        raise
+    if request.method not in READ_METHODS and settings.read_your_writes_seconds > 0:
+        response.set_cookie(
+            STICKY_COOKIE,
+            str(time.time() + settings.read_your_writes_seconds),
+            max_age=int(settings.read_your_writes_seconds) + 1,
+            httponly=True,
+        )
+
+    watcher = None
+    if request.method in READ_METHODS:
+        watcher = asyncio.create_task(_cancel_on_disconnect(request, db))
     try:
         yield db
     finally:
-        db.close()
+        if watcher is not None:
+            watcher.cancel()
+        try:
+            await run_in_threadpool(_close_session, db)
+        finally:
+            if admitted is not None:
+                admission.release(admitted)
@@ -0,0 +1,333 @@
+"""
+Asynchronous bulk exports of whole tables to compressed files.
+
+Jobs are recorded in `public.export_job` so any worker can report on
+them; the export itself runs on a small thread pool in the worker that
+accepted it and streams rows through a server-side cursor.
+
+With status sharded, a status export opens one cursor per shard (only
+the owning shard when filtered by `station_id`) and merges them by time.
+"""
+import csv
+import gzip
+import hashlib
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import timedelta
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import pyarrow
+import pyarrow.parquet
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import BigInteger, Date, Integer, Numeric, TIMESTAMP, and_, func, or_, select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.sharding import shard_map
+from app.core.status_snapshot import to_naive
+from app.models.models import ExportJob, Station, Status, Trip, Weather
+
+logger = logging.getLogger(__name__)
+
+EXPORT_TABLES = {
+    "station": (Station, None),
+    "trip": (Trip, Trip.start_date),
+    "status": (Status, Status.time),
+    "weather": (Weather, Weather.date),
+}
+
+FILE_EXTENSIONS = {"csv": "csv.gz", "ndjson": "ndjson.gz", "parquet": "parquet"}
+
+# A running job whose heartbeat is older than this is considered dead
+STALE_JOB_AFTER = timedelta(minutes=5)
+# Jobs waiting in this worker's pool are touched this often to stay alive
+QUEUED_HEARTBEAT = STALE_JOB_AFTER / 5
+
+_executor = ThreadPoolExecutor(max_workers=settings.export_workers, thread_name_prefix="export")
+_queued: Set[str] = set()
+_queued_lock = threading.Lock()
+_heartbeat: Optional[threading.Thread] = None
+
+
+class ExportError(ValueError):
+    """Invalid export request."""
+
+
+def params_hash(params: Dict[str, Any]) -> str:
+    """
+    Stable hash of the export parameters, used to reuse identical exports.
+    """
+    canonical = json.dumps(jsonable_encoder(params), sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def build_statement(params: Dict[str, Any]):
+    """
+    Build the SELECT of an export from its table, filters and time range.
+
+    Raises:
+        ExportError: Unknown table, filter column or unsupported range
+    """
+    model, time_column = EXPORT_TABLES[params["table"]]
+    columns = model.__table__.columns
+    statement = select(*columns)
+
+    for name, value in (params.get("filters") or {}).items():
+        if name not in columns:
+            raise ExportError(f"Unknown column '{name}' for table {params['table']}")
+        statement = statement.where(columns[name] == value)
+
+    if params.get("start") is not None or params.get("end") is not None:
+        if time_column is None:
+            raise ExportError(f"Table {params['table']} has no time column to filter on")
+        if params.get("start") is not None:
+            statement = statement.where(time_column >= params["start"])
+        if params.get("end") is not None:
+            statement = statement.where(time_column < params["end"])
+
+    if time_column is not None:
+        statement = statement.order_by(time_column)
+    return statement
+
+
+def _export_sessions(db, params: Dict[str, Any], stack: ExitStack) -> List:
+    """
+    Sessions holding the rows of an export: the shards owning them for a
+    sharded status export, otherwise `db`.
+    """
+    if params["table"] != "status" or not shard_map.enabled:
+        return [db]
+    station_id = (params.get("filters") or {}).get("station_id")
+    if station_id is not None:
+        indexes = [shard_map.index_for(int(station_id))]
+    else:
+        indexes = range(len(shard_map))
+    return [stack.enter_context(shard_map.session(db, index)) for index in indexes]
+
+
+def _merged_partitions(results, time_index: int, size: int) -> Iterator[List]:
+    """
+    Partitions of `size` rows merged from results that are each ordered by
+    the column at `time_index`.
+    """
+    merged = heapq.merge(*results, key=lambda row: row[time_index])
+    while partition := list(islice(merged, size)):
+        yield partition
+
+
+def submit_export(params: Dict[str, Any]) -> ExportJob:
+    """
+    Create an export job, or return an identical one that is done or still alive.
+
+    A finished job is only reused when its range has an `end` that had
+    already passed when the job was created: an open-ended range, or one
+    reaching past that moment, may have gained rows since.
+
+    Raises:
+        ExportError: Invalid parameters
+    """
+    build_statement(params)
+
+    digest = params_hash(params)
+    reusable = [
+        and_(
+            ExportJob.status.in_(("pending", "running")),
+            ExportJob.updated_at > func.now() - STALE_JOB_AFTER,
+        )
+    ]
+    if params.get("end") is not None:
+        reusable.append(
+            and_(ExportJob.status == "done", ExportJob.created_at > to_naive(params["end"]))
+        )
+    with SessionLocal() as db:
+        existing = (
+            db.query(ExportJob)
+            .filter(ExportJob.params_hash == digest, or_(*reusable))
+            .order_by(ExportJob.created_at.desc())
+            .first()
+        )
+        if existing is not None and (
+            existing.status != "done" or os.path.exists(existing.file_path)
+        ):
+            return existing
+
+        job = ExportJob(
+            id=uuid.uuid4().hex,
+            params_hash=digest,
+            table_name=params["table"],
+            format=params["format"],
+            params=jsonable_encoder(params),
+            status="pending",
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+    _enqueue(job.id)
+    return job
+
+
+def _enqueue(job_id: str) -> None:
+    """
+    Queue a job on the export pool, keeping its heartbeat fresh until it starts.
+    """
+    global _heartbeat
+    with _queued_lock:
+        _queued.add(job_id)
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_touch_queued, name="export-heartbeat", daemon=True)
+            _heartbeat.start()
+    _executor.submit(run_export, job_id)
+
+
+def _touch_queued() -> None:
+    """
+    Refresh `updated_at` of the pending jobs queued in this worker, so an
+    identical submit keeps reusing them while they wait for a free thread.
+    """
+    while True:
+        time.sleep(QUEUED_HEARTBEAT.total_seconds())
+        with _queued_lock:
+            job_ids = list(_queued)
+        if not job_ids:
+            continue
+        try:
+            with SessionLocal() as db:
+                db.query(ExportJob).filter(
+                    ExportJob.id.in_(job_ids), ExportJob.status == "pending"
+                ).update({"updated_at": func.now()}, synchronize_session=False)
+                db.commit()
+        except Exception:
+            logger.exception("Export heartbeat of %s queued jobs failed", len(job_ids))
+
+
+def _update_job(job_id: str, **values) -> None:
+    with SessionLocal() as db:
+        db.query(ExportJob).filter(ExportJob.id == job_id).update(
+            {**values, "updated_at": func.now()}
+        )
+        db.commit()
+
+
+def run_export(job_id: str) -> None:
+    """
+    Write the export of a job to its compressed file, reporting progress.
+    """
+    with _queued_lock:
+        _queued.discard(job_id)
+    with SessionLocal() as db:
+        job = db.get(ExportJob, job_id)
+        params = dict(job.params)
+        fmt = job.format
+
+    os.makedirs(settings.export_dir, exist_ok=True)
+    path = os.path.join(settings.export_dir, f"{job_id}.{FILE_EXTENSIONS[fmt]}")
+    tmp_path = f"{path}.part"
+    statement = build_statement(params)
+
+    try:
+        with SessionLocal() as db, ExitStack() as stack:
+            sessions = _export_sessions(db, params, stack)
+            compiled = statement.compile(dialect=db.get_bind().dialect)
+            rows_estimate = 0
+            for session in sessions:
+                plan = session.connection().exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+                ).scalar()
+                rows_estimate += int(plan[0]["Plan"]["Plan Rows"])
+            _update_job(job_id, status="running", rows_estimate=rows_estimate)
+
+            results = [
+                session.execute(
+                    statement, execution_options={"yield_per": settings.export_batch_rows}
+                )
+                for session in sessions
+            ]
+            if len(results) == 1:
+                partitions = results[0].partitions()
+            else:
+                names = [column.name for column in statement.selected_columns]
+                time_index = names.index(EXPORT_TABLES[params["table"]][1].key)
+                partitions = _merged_partitions(results, time_index, settings.export_batch_rows)
+            writer = _WRITERS[fmt]
+            rows = writer(tmp_path, list(statement.selected_columns), partitions, job_id)
+
+        os.replace(tmp_path, path)
+        _update_job(
+            job_id,
+            status="done",
+            rows_written=rows,
+            file_path=path,
+            file_size=os.path.getsize(path),
+            finished_at=func.now(),
+        )
+        logger.info("Export %s finished: %s rows", job_id, rows)
+    except Exception as e:
+        logger.exception("Export %s failed", job_id)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        _update_job(job_id, status="failed", error=str(e), finished_at=func.now())
+
+
+def _write_csv(path, columns, partitions, job_id) -> int:
+    rows = 0
+    with gzip.open(path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([column.name for column in columns])
+        for partition in partitions:
+            writer.writerows(partition)
+            rows += len(partition)
+            _update_job(job_id, rows_written=rows)
+    return rows
+
+
+def _write_ndjson(path, columns, partitions, job_id) -> int:
+    names = [column.name for column in columns]
+    rows = 0
+    with gzip.open(path, "wt") as f:
+        for partition in partitions:
+            for row in partition:
+                f.write(json.dumps(dict(zip(names, row)), default=str))
+                f.write("\n")
+            rows += len(partition)
+            _update_job(job_id, rows_written=rows)
+    return rows
+
+
+def _arrow_type(column):
+    if isinstance(column.type, BigInteger):
+        return pyarrow.int64()
+    if isinstance(column.type, Integer):
+        return pyarrow.int32()
+    if isinstance(column.type, Numeric):
+        return pyarrow.decimal128(column.type.precision, column.type.scale)
+    if isinstance(column.type, TIMESTAMP):
+        return pyarrow.timestamp("us")
+    if isinstance(column.type, Date):
+        return pyarrow.date32()
+    return pyarrow.string()
+
+
+def _write_parquet(path, columns, partitions, job_id) -> int:
+    schema = pyarrow.schema([(column.name, _arrow_type(column)) for column in columns])
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+        for partition in partitions:
+            batch = pyarrow.Table.from_pylist(
+                [dict(zip(schema.names, row)) for row in partition], schema=schema
+            )
+            writer.write_table(batch)
+            rows += len(partition)
+            _update_job(job_id, rows_written=rows)
+    return rows
+
+
+_WRITERS = {"csv": _write_csv, "ndjson": _write_ndjson, "parquet": _write_parquet}
@@ -0,0 +1,79 @@
+"""
+Sparse fieldsets: restrict GET responses to the columns a client asks for.
+
+The requested columns are pushed down into the SQL `SELECT` list, so
+unused columns are never read, hydrated into ORM objects or serialized.
+"""
+from functools import lru_cache
+from typing import List, Optional, Type, Union
+
+from fastapi import HTTPException, Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Column
+from sqlalchemy.engine import Row
+
+FIELDS_DESCRIPTION = "Comma-separated list of columns to return (default: all)"
+
+
+def parse_fields(model, fields: Optional[str]) -> Optional[List[Column]]:
+    """
+    Validate a `fields=` query parameter against a model's columns.
+
+    Args:
+        model: SQLAlchemy model of the route
+        fields: Raw comma-separated column names, or None for all columns
+
+    Returns:
+        The selected columns in request order, or None when not restricted
+
+    Raises:
+        HTTPException: 400 if a name is not a column of the model
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    columns = model.__table__.columns
+    unknown = [name for name in names if name not in columns]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid fields {unknown or fields!r}; allowed: {', '.join(columns.keys())}",
+        )
+    return [columns[name] for name in names]
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Type[BaseModel], name: str) -> TypeAdapter:
+    return TypeAdapter(schema.model_fields[name].annotation)
+
+
+def _serialize(row: Row, names: List[str], schema: Type[BaseModel]) -> dict:
+    return {
+        name: _adapter(schema, name).dump_python(value, mode="json")
+        for name, value in zip(names, row)
+    }
+
+
+def sparse_response(
+    rows: Union[Row, List[Row]],
+    columns: List[Column],
+    schema: Type[BaseModel],
+    response: Optional[Response] = None,
+) -> JSONResponse:
+    """
+    Serialize rows selected with `parse_fields` columns.
+
+    Values go through the response schema's field types, so they are
+    rendered exactly as in the full response. Headers already set on
+    `response` (e.g. `X-Total-Count`) are carried over.
+    """
+    names = [column.name for column in columns]
+    if isinstance(rows, list):
+        content = [_serialize(row, names, schema) for row in rows]
+    else:
+        content = _serialize(rows, names, schema)
+    headers = None
+    if response is not None:
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return JSONResponse(content=content, headers=headers)
@@ -0,0 +1,184 @@
+"""
+Partitioned execution of large time-range aggregates.
+
+A long range is split into day-aligned sub-ranges that run concurrently,
+each on its own pooled connection, on a bounded thread pool shared by
+the worker. Every sub-range returns partial aggregates keyed by group,
+which are merged before responding: counts, sums, min/max and log-bucket
+sketches for percentiles are all mergeable.
+
+The degree of parallelism is set per route in
+`Settings.route_parallel_degree`; ranges shorter than
+`parallel_min_partition_hours` per partition are not split further.
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+T = TypeVar("T")
+
+# Relative accuracy of the percentile sketches (1%)
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.parallel_max_workers, thread_name_prefix="partition"
+)
+
+
+def split_range(start: datetime, end: datetime, parts: int) -> List[Tuple[datetime, datetime]]:
+    """
+    Split [start, end) into at most `parts` contiguous sub-ranges whose
+    inner boundaries fall on midnight, so hour/day buckets never straddle
+    two partitions.
+    """
+    if parts <= 1 or end - start <= timedelta(days=1):
+        return [(start, end)]
+    step_days = max(1, math.ceil((end - start) / timedelta(days=1) / parts))
+    midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    bounds = [start]
+    cursor = midnight + timedelta(days=step_days)
+    while cursor < end:
+        bounds.append(cursor)
+        cursor += timedelta(days=step_days)
+    bounds.append(end)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def degree_for(route_name: str, start: datetime, end: datetime) -> int:
+    """
+    Number of partitions for a route and range.
+    """
+    configured = settings.route_parallel_degree.get(route_name, 1)
+    min_partition = timedelta(hours=settings.parallel_min_partition_hours)
+    return max(1, min(configured, math.floor((end - start) / min_partition)))
+
+
+def run_partitioned(
+    db: Session,
+    route_name: str,
+    start: datetime,
+    end: datetime,
+    work: Callable[[Session, datetime, datetime], T],
+) -> List[T]:
+    """
+    Run `work(session, sub_start, sub_end)` over the partitions of [start, end).
+
+    With a single partition, `work` runs on the request's own session.
+    Otherwise each partition gets a new session bound to the same engine
+    (primary or replica) and statement timeout as `db`.
+    """
+    ranges = split_range(start, end, degree_for(route_name, start, end))
+    if len(ranges) == 1:
+        return [work(db, start, end)]
+
+    bind = db.get_bind()
+    info = {"statement_timeout_ms": db.info.get("statement_timeout_ms")}
+
+    def run(sub_range: Tuple[datetime, datetime]) -> T:
+        with SessionLocal(bind=bind, info=dict(info)) as session:
+            return work(session, *sub_range)
+
+    futures = [_executor.submit(run, sub_range) for sub_range in ranges]
+    return [future.result() for future in futures]
+
+
+def sketch_key(column):
+    """
+    SQL expression of the log bucket of `column` (NULL for values <= 0).
+    """
+    return case(
+        (column > 0, func.ceil(func.ln(column) / math.log(SKETCH_GAMMA))),
+        else_=None,
+    )
+
+
+@dataclass
+class LogSketch:
+    """
+    Log-bucket histogram giving quantiles within SKETCH_RELATIVE_ACCURACY.
+
+    Bucket `k` holds the values in (gamma^(k-1), gamma^k]; values <= 0
+    are counted apart.
+    """
+    buckets: Dict[int, int] = field(default_factory=dict)
+    zeros: int = 0
+
+    def add(self, key: Optional[int], count: int) -> None:
+        if key is None:
+            self.zeros += count
+        else:
+            self.buckets[int(key)] = self.buckets.get(int(key), 0) + count
+
+    def merge(self, other: "LogSketch") -> None:
+        self.zeros += other.zeros
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.zeros + sum(self.buckets.values())
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * SKETCH_GAMMA ** key / (SKETCH_GAMMA + 1)
+        return 2 * SKETCH_GAMMA ** max(self.buckets) / (SKETCH_GAMMA + 1)
+
+
+@dataclass
+class PartialAggregate:
+    """
+    Mergeable count / sum / min / max, with an optional percentile sketch.
+    """
+    count: int = 0
+    total: float = 0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    sketch: Optional[LogSketch] = None
+
+    def add(self, count: int, total, minimum, maximum) -> None:
+        self.count += count
+        self.total += total or 0
+        if minimum is not None:
+            self.minimum = minimum if self.minimum is None else min(self.minimum, minimum)
+        if maximum is not None:
+            self.maximum = maximum if self.maximum is None else max(self.maximum, maximum)
+
+    def merge(self, other: "PartialAggregate") -> None:
+        self.add(other.count, other.total, other.minimum, other.maximum)
+        if other.sketch is not None:
+            if self.sketch is None:
+                self.sketch = LogSketch()
+            self.sketch.merge(other.sketch)
+
+    @property
+    def average(self) -> Optional[float]:
+        return float(self.total) / self.count if self.count else None
+
+
+def merge_partials(
+    partials: Iterable[Dict[Hashable, Dict[str, PartialAggregate]]]
+) -> Dict[Hashable, Dict[str, PartialAggregate]]:
+    """
+    Merge per-partition results: {group key: {measure: PartialAggregate}}.
+    """
+    merged: Dict[Hashable, Dict[str, PartialAggregate]] = {}
+    for partial in partials:
+        for key, measures in partial.items():
+            target = merged.setdefault(key, {})
+            for name, aggregate in measures.items():
+                target.setdefault(name, PartialAggregate()).merge(aggregate)
+    return merged
@@ -0,0 +1,155 @@
+"""
+Status retention: downsample old raw samples into `status_hourly`, and
+prune old change feed entries.
+
+The work itself is done by `public.downsample_status_batch` (see
+`sql/008-status-retention.sql`); this module drives it from the API
+process as a scheduled background task. `src/status_retention.py` is
+the command-line equivalent.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.sharding import shard_map
+
+logger = logging.getLogger(__name__)
+
+RETENTION_LOCK_NAME = "sfbikeshare.status_retention"
+
+
+@dataclass
+class RetentionReport:
+    """Outcome of one retention run."""
+
+    cutoff: datetime
+    batches: int = 0
+    rows_deleted: int = 0
+    buckets_written: int = 0
+    # Size of the deleted rows: free for reuse by new samples after VACUUM,
+    # though the table file keeps its size (the freed pages are not at its end)
+    freed_bytes: int = 0
+    skipped: bool = False
+
+
+def run_retention(
+    older_than: timedelta,
+    batch: timedelta,
+    max_batches: int,
+    vacuum: bool = True,
+    target: Engine = engine,
+) -> RetentionReport:
+    """
+    Downsample and delete raw status rows older than `older_than`.
+
+    Each batch covers at most `batch` of data and is committed on its
+    own. A session advisory lock makes concurrent runs (one per
+    gunicorn worker) skip instead of competing.
+
+    Args:
+        older_than: Age after which raw samples are downsampled
+        batch: Time span processed per transaction
+        max_batches: Upper bound of batches per run
+        vacuum: Run `VACUUM ANALYZE public.status` after deleting rows
+        target: Database holding the samples (the primary, or a status shard)
+
+    Returns:
+        RetentionReport: Rows processed and space freed for reuse
+    """
+    report = RetentionReport(cutoff=datetime.now() - older_than)
+    with target.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        locked = conn.execute(
+            text("SELECT pg_try_advisory_lock(hashtext(:name))"),
+            {"name": RETENTION_LOCK_NAME},
+        ).scalar()
+        if not locked:
+            report.skipped = True
+            return report
+
+        try:
+            # Downsampling is not published to the change feed (GET /changes)
+            # and keeps the outage intervals already computed
+            conn.execute(text("SET sfbikeshare.skip_change_log = on"))
+            conn.execute(text("SET sfbikeshare.skip_station_outages = on"))
+            while report.batches < max_batches:
+                row = conn.execute(
+                    text("SELECT * FROM public.downsample_status_batch(:cutoff, :batch)"),
+                    {"cutoff": report.cutoff, "batch": batch},
+                ).first()
+                if row is None:
+                    break
+                report.batches += 1
+                report.rows_deleted += row.rows_deleted
+                report.buckets_written += row.buckets_written
+                report.freed_bytes += row.bytes_deleted
+                logger.info(
+                    "Retention batch %s-%s: %s rows into %s hourly buckets",
+                    row.window_start, row.window_end, row.rows_deleted, row.buckets_written,
+                )
+
+            if vacuum and report.rows_deleted:
+                conn.execute(text("VACUUM ANALYZE public.status"))
+        finally:
+            conn.execute(text("RESET sfbikeshare.skip_change_log"))
+            conn.execute(text("RESET sfbikeshare.skip_station_outages"))
+            conn.execute(
+                text("SELECT pg_advisory_unlock(hashtext(:name))"),
+                {"name": RETENTION_LOCK_NAME},
+            )
+    return report
+
+
+def prune_change_log(older_than: timedelta) -> int:
+    """
+    Delete change feed entries older than `older_than` (see
+    `public.prune_change_log`); clients holding older tokens must resync.
+
+    Returns:
+        int: Number of change_log rows deleted
+    """
+    with engine.begin() as conn:
+        return conn.execute(
+            text("SELECT public.prune_change_log(now() - :older_than)"),
+            {"older_than": older_than},
+        ).scalar()
+
+
+async def retention_loop() -> None:
+    """
+    Run the retention job every `Settings.retention_interval_minutes`,
+    on each status shard when status is sharded.
+    """
+    while True:
+        for target in shard_map.engines or [engine]:
+            try:
+                report = await asyncio.to_thread(
+                    run_retention,
+                    timedelta(days=settings.retention_days),
+                    timedelta(hours=settings.retention_batch_hours),
+                    settings.retention_max_batches,
+                    settings.retention_vacuum,
+                    target,
+                )
+                if not report.skipped:
+                    logger.info(
+                        "Retention run on %s: %s rows in %s batches, %s buckets, %s bytes freed for reuse",
+                        target.url.database, report.rows_deleted, report.batches,
+                        report.buckets_written, report.freed_bytes,
+                    )
+            except Exception:
+                logger.exception("Retention run on %s failed", target.url.database)
+        try:
+            pruned = await asyncio.to_thread(
+                prune_change_log, timedelta(days=settings.change_log_retention_days)
+            )
+            if pruned:
+                logger.info("Pruned %s change feed entries", pruned)
+        except Exception:
+            logger.exception("Change feed pruning failed")
+        await asyncio.sleep(settings.retention_interval_minutes * 60)
@@ -0,0 +1,131 @@
+"""
+Sharding of `public.status` by station across Postgres nodes.
+
+With `STATUS_SHARD_URLS` set, status samples live on the listed
+databases instead of the primary, each holding the samples of the
+stations it owns:
+
+- `hash` (default): station `s` lives on shard `s % len(shards)`
+- `range`: `STATUS_SHARD_RANGE_STARTS` lists the first station ID of
+  every shard after the first, e.g. `40,60` for three shards holding
+  stations below 40, 40 to 59, and 60 and above
+
+Single-station reads and writes go to the owning shard. Cross-station
+queries are scattered to every shard in parallel, each on its own
+session, and the routes merge the partial results.
+
+`src/split_status_shards.py` creates the shard tables and moves the
+samples of an existing database onto the shards.
+"""
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, _create_engine
+
+T = TypeVar("T")
+
+
+class ShardMap:
+    """
+    Maps station IDs to the engine of the shard that stores their samples.
+    """
+
+    def __init__(self, urls: List[str], strategy: str, range_starts: List[int]):
+        if strategy == "range" and len(range_starts) != len(urls) - 1:
+            raise ValueError(
+                f"STATUS_SHARD_RANGE_STARTS needs {len(urls) - 1} values for {len(urls)} shards"
+            )
+        if range_starts != sorted(range_starts):
+            raise ValueError("STATUS_SHARD_RANGE_STARTS must be increasing")
+        self.strategy = strategy
+        self.range_starts = range_starts
+        self.engines = [_create_engine(url) for url in urls]
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(urls), 1), thread_name_prefix="shard"
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engines)
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def index_for(self, station_id: int) -> int:
+        """
+        Shard index owning a station.
+        """
+        if self.strategy == "range":
+            return bisect.bisect_right(self.range_starts, station_id)
+        return station_id % len(self.engines)
+
+    def group(self, station_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """
+        Station IDs grouped by owning shard index.
+        """
+        groups: Dict[int, List[int]] = {}
+        for station_id in station_ids:
+            groups.setdefault(self.index_for(station_id), []).append(station_id)
+        return groups
+
+    @contextmanager
+    def session(self, db: Session, index: int) -> Iterator[Session]:
+        """
+        Session on a shard, with the statement timeout of the request's session.
+        """
+        info = {"statement_timeout_ms": db.info.get("statement_timeout_ms"), "shard": index}
+        with SessionLocal(bind=self.engines[index], info=info) as session:
+            yield session
+
+    @contextmanager
+    def station_session(self, db: Session, station_id: int) -> Iterator[Session]:
+        """
+        Session holding a station's samples: `db` itself when sharding is
+        off, otherwise a session on the owning shard.
+        """
+        if not self.enabled:
+            yield db
+            return
+        with self.session(db, self.index_for(station_id)) as session:
+            yield session
+
+    def scatter(
+        self,
+        db: Session,
+        work: Callable[[Session, Optional[int]], T],
+        station_ids: Optional[Iterable[int]] = None,
+    ) -> List[T]:
+        """
+        Run `work(session, shard_index)` on every shard concurrently, or
+        only on the shards owning `station_ids`; results are in shard order.
+
+        When sharding is off, `work(db, None)` runs once on the request's
+        own session.
+        """
+        if not self.enabled:
+            return [work(db, None)]
+        if station_ids is None:
+            indexes = list(range(len(self.engines)))
+        else:
+            indexes = sorted(self.group(station_ids))
+
+        def run(index: int) -> T:
+            with self.session(db, index) as session:
+                return work(session, index)
+
+        if len(indexes) == 1:
+            return [run(indexes[0])]
+        futures = [self._executor.submit(run, index) for index in indexes]
+        return [future.result() for future in futures]
+
+
+shard_map = ShardMap(
+    settings.status_shard_url_list,
+    settings.status_shard_strategy,
+    settings.status_shard_range_start_list,
+)
@@ -0,0 +1,336 @@
+"""
+Write-behind buffer for single-sample status POSTs.
+
+With `STATUS_WRITE_BEHIND=true`, `POST /status` appends the sample to a
+bounded in-worker buffer and answers `202`. A background thread flushes
+batches of up to `status_flush_rows` samples: one `COPY` into a temporary
+table, then a single `INSERT ... SELECT` that skips samples already
+stored (same check as the synchronous path, over
+`idx_status_station_time`).
+
+`status_write_durability` chooses when the client is answered:
+
+- `flush`: after the batch holding its sample committed; duplicates are
+  reported like on the synchronous path. A batch starts as soon as the
+  previous one is done, so concurrent writers share transactions.
+- `enqueue`: as soon as the sample is buffered; batches are written every
+  `status_flush_interval_ms` or when full. Samples still buffered when a
+  worker dies are lost.
+
+When Postgres rejects a batch because of its data (SQLSTATE classes 22
+and 23, e.g. a value out of range), the samples are written one at a
+time and only the rejected ones are dropped: their `flush` writers get
+the error, and `enqueue` samples are logged and counted as rejected.
+A unique violation is left out: it comes from a concurrent writer, not
+from the values. It and any other failure retry the whole batch
+(`enqueue`) or report it as failed (`flush`).
+
+With status sharded, each flush writes one transaction per shard; when
+one of them fails the whole batch is retried (`enqueue`) or reported as
+failed (`flush`), although the other shards may have stored their part.
+
+The buffer is flushed on graceful shutdown, and its depth is reported by
+`GET /metrics`.
+"""
+import io
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.sharding import shard_map
+from app.core.status_snapshot import to_naive
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("station_id", "bikes_available", "docks_available", "time", "category1", "category2")
+
+CREATE_STAGING = """
+    CREATE TEMP TABLE status_incoming (
+        seq BIGINT NOT NULL,
+        station_id INTEGER NOT NULL,
+        bikes_available INTEGER NOT NULL,
+        docks_available INTEGER NOT NULL,
+        time TIMESTAMP NOT NULL,
+        category1 INTEGER,
+        category2 INTEGER
+    ) ON COMMIT DROP
+"""
+COPY_STAGING = f"COPY status_incoming (seq, {', '.join(COLUMNS)}) FROM STDIN"
+# First occurrence of each key in the batch, unless already stored
+INSERT_NEW = f"""
+    INSERT INTO public.status ({', '.join(COLUMNS)})
+    SELECT {', '.join(COLUMNS)}
+    FROM (
+        SELECT DISTINCT ON (station_id, time) *
+        FROM status_incoming
+        ORDER BY station_id, time, seq
+    ) AS i
+    WHERE NOT EXISTS (
+        SELECT 1 FROM public.status s
+        WHERE s.station_id = i.station_id AND s.time = i.time
+    )
+    RETURNING station_id, time
+"""
+
+
+class BufferFull(Exception):
+    """Raised when the buffer holds `status_buffer_max_rows` samples."""
+
+
+@dataclass
+class PendingSample:
+    """A buffered sample; `done` is set once its batch is flushed."""
+    values: Tuple
+    done: threading.Event = field(default_factory=threading.Event)
+    inserted: Optional[bool] = None
+    error: Optional[str] = None
+
+    @property
+    def key(self) -> Tuple[int, datetime]:
+        return self.values[0], self.values[3]
+
+
+# unique_violation comes from a concurrent writer (the same sample, or
+# derived rows such as station outages), not from the sample's values
+UNIQUE_VIOLATION = "23505"
+
+
+def _is_data_error(exc: Exception) -> bool:
+    """
+    Whether Postgres rejected the rows themselves (data exception or
+    integrity violation) rather than failing the transaction as a whole.
+    """
+    sqlstate = getattr(exc, "sqlstate", None) or getattr(exc, "pgcode", None)
+    return sqlstate is not None and sqlstate[:2] in ("22", "23") and sqlstate != UNIQUE_VIOLATION
+
+
+def _text_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return str(value)
+
+
+def _copy_rows(cursor, rows: List[Tuple]) -> None:
+    """
+    COPY rows into the staging table with either driver.
+    """
+    if hasattr(cursor, "copy_expert"):  # psycopg2
+        data = io.StringIO()
+        for row in rows:
+            data.write("\t".join(_text_value(v) for v in row) + "\n")
+        data.seek(0)
+        cursor.copy_expert(COPY_STAGING, data)
+    else:  # psycopg 3
+        with cursor.copy(COPY_STAGING) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+class StatusWriteBuffer:
+    """
+    Bounded buffer of status samples with a background flusher thread.
+    """
+
+    def __init__(self):
+        self._pending: List[PendingSample] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._sequence = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.duplicate_rows = 0
+        self.rejected_rows = 0
+        self.failed_flushes = 0
+        self.last_flush_ms: Optional[float] = None
+
+    def put(self, values: Tuple) -> PendingSample:
+        """
+        Buffer a sample (values in `COLUMNS` order). An aware `time` is
+        stored in UTC, like the synchronous path; COPY would drop its offset.
+
+        Raises:
+            BufferFull: If `status_buffer_max_rows` samples are waiting
+        """
+        sample = PendingSample((*values[:3], to_naive(values[3]), *values[4:]))
+        with self._condition:
+            if self._closing:
+                raise BufferFull("buffer is shutting down")
+            if len(self._pending) >= settings.status_buffer_max_rows:
+                raise BufferFull(f"{len(self._pending)} samples waiting")
+            self._pending.append(sample)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="status-buffer", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return sample
+
+    def depth(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def _run(self) -> None:
+        # Writers waiting for their flush are served as soon as the flusher
+        # is idle (group commit: samples arriving meanwhile form the next
+        # batch); acknowledged samples wait for the interval or a full batch.
+        interval = settings.status_flush_interval_ms / 1000
+        min_rows = 1 if settings.status_write_durability == "flush" else settings.status_flush_rows
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + interval
+                while (
+                    not self._closing
+                    and len(self._pending) < min_rows
+                    and (remaining := deadline - time.monotonic()) > 0
+                ):
+                    self._condition.wait(remaining)
+                batch = self._pending[: settings.status_flush_rows]
+                del self._pending[: len(batch)]
+                if not batch and self._closing:
+                    return
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: List[PendingSample]) -> None:
+        started = time.monotonic()
+        rows = []
+        for sample in batch:
+            self._sequence += 1
+            rows.append((self._sequence, *sample.values))
+        rejected: Dict[int, str] = {}
+        try:
+            inserted = self._store(rows, rejected)
+        except Exception as exc:
+            self.failed_flushes += 1
+            logger.exception("Status buffer flush of %s samples failed", len(batch))
+            self._requeue_or_fail(batch, str(exc))
+            return
+
+        self.flushes += 1
+        self.flushed_rows += len(inserted)
+        self.duplicate_rows += len(batch) - len(inserted) - len(rejected)
+        self.rejected_rows += len(rejected)
+        self.last_flush_ms = (time.monotonic() - started) * 1000
+        for row, sample in zip(rows, batch):
+            if row[0] in rejected:
+                logger.error("Status sample %s rejected: %s", sample.values, rejected[row[0]])
+                sample.error = rejected[row[0]]
+                sample.done.set()
+                continue
+            # Only the first sample of a key in the batch counts as inserted
+            sample.inserted = sample.key in inserted
+            inserted.discard(sample.key)
+            sample.done.set()
+
+    @staticmethod
+    def _store(rows: List[Tuple], rejected: Dict[int, str]) -> Set[Tuple[int, datetime]]:
+        """
+        Write a batch, one transaction per status shard when sharded.
+        Rows Postgres rejects are left out and added to `rejected` by
+        sequence number.
+        """
+        if not shard_map.enabled:
+            return StatusWriteBuffer._store_isolating(engine, rows, rejected)
+        by_shard: Dict[int, List[Tuple]] = {}
+        for row in rows:
+            by_shard.setdefault(shard_map.index_for(row[1]), []).append(row)
+        inserted = set()
+        for index, shard_rows in by_shard.items():
+            inserted |= StatusWriteBuffer._store_isolating(
+                shard_map.engines[index], shard_rows, rejected
+            )
+        return inserted
+
+    @staticmethod
+    def _store_isolating(
+        target: Engine, rows: List[Tuple], rejected: Dict[int, str]
+    ) -> Set[Tuple[int, datetime]]:
+        """
+        `_store_on`, retrying row by row when the batch is rejected for its
+        data so that one bad sample does not hold back the others.
+        """
+        try:
+            return StatusWriteBuffer._store_on(target, rows)
+        except Exception as exc:
+            if not _is_data_error(exc):
+                raise
+            if len(rows) == 1:
+                rejected[rows[0][0]] = str(exc)
+                return set()
+        inserted = set()
+        for row in rows:
+            inserted |= StatusWriteBuffer._store_isolating(target, [row], rejected)
+        return inserted
+
+    @staticmethod
+    def _store_on(target: Engine, rows: List[Tuple]) -> Set[Tuple[int, datetime]]:
+        connection = target.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(CREATE_STAGING)
+            _copy_rows(cursor, rows)
+            cursor.execute(INSERT_NEW)
+            inserted = {tuple(row) for row in cursor.fetchall()}
+            connection.commit()
+            return inserted
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def _requeue_or_fail(self, batch: List[PendingSample], error: str) -> None:
+        """
+        Retry `enqueue` samples on the next flush (they were already
+        acknowledged); fail the waiting `flush` writers.
+        """
+        enqueue = settings.status_write_durability == "enqueue"
+        with self._condition:
+            requeue = enqueue and not self._closing
+            if requeue:
+                self._pending[:0] = batch
+        if requeue:
+            time.sleep(settings.status_flush_interval_ms / 1000)
+            return
+        if enqueue:
+            logger.error("Dropped %s acknowledged status samples at shutdown", len(batch))
+        for sample in batch:
+            sample.error = error
+            sample.done.set()
+
+    def close(self, timeout: float = 30.0) -> None:
+        """
+        Flush what is buffered and stop the flusher (graceful shutdown).
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.error("Status buffer still had %s samples at shutdown", self.depth())
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "depth": self.depth(),
+            "capacity": settings.status_buffer_max_rows,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "duplicate_rows": self.duplicate_rows,
+            "rejected_rows": self.rejected_rows,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+status_buffer = StatusWriteBuffer()
@@ -0,0 +1,131 @@
+"""
+Live status fan-out for the Server-Sent Events stream.
+
+Each worker holds a single Postgres `LISTEN status_insert` connection
+(fed by the `trg_status_notify` trigger; one per shard when status is
+sharded) and fans the samples out to its SSE subscribers. Every
+subscriber has a bounded buffer: when a slow client falls behind, its
+oldest pending samples are dropped and the client is told how many it
+missed.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Optional, Set
+
+import psycopg2
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "status_insert"
+
+
+class Subscription:
+    """A subscriber's bounded buffer of pending samples."""
+
+    def __init__(self, station_ids: Optional[Set[int]], loop: asyncio.AbstractEventLoop):
+        self.station_ids = station_ids
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.sse_buffer_size)
+        self.dropped = 0
+
+    def wants(self, sample: dict) -> bool:
+        return self.station_ids is None or sample["station_id"] in self.station_ids
+
+    def push(self, sample: dict) -> None:
+        """
+        Enqueue a sample, dropping the oldest one if the buffer is full.
+
+        Must run on the subscriber's event loop.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(sample)
+
+
+class StatusBroadcaster:
+    """Single LISTEN connection per worker, shared by all SSE subscribers."""
+
+    def __init__(self):
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def subscribe(self, station_ids: Optional[Set[int]]) -> Subscription:
+        """
+        Register a subscriber on the running event loop, starting the listener if needed.
+        """
+        subscription = Subscription(station_ids, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._listen, name="status-listen", daemon=True
+                )
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def close(self) -> None:
+        """
+        Stop the listener thread (on application shutdown).
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _dispatch(self, sample: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if subscription.wants(sample):
+                subscription.loop.call_soon_threadsafe(subscription.push, sample)
+
+    def _listen(self) -> None:
+        """
+        Listener thread: LISTEN, wait for notifications and dispatch them.
+
+        With status sharded, one connection per shard is watched.
+        Reconnects with a short back-off if a connection drops.
+        """
+        urls = settings.status_shard_url_list or [settings.database_url]
+        while not self._stop.is_set():
+            conns = []
+            try:
+                for url in urls:
+                    conn = psycopg2.connect(url)
+                    conns.append(conn)
+                    conn.autocommit = True
+                    with conn.cursor() as cur:
+                        cur.execute(f"LISTEN {CHANNEL}")
+                logger.info("Listening on %s", CHANNEL)
+                while not self._stop.is_set():
+                    readable, _, _ = select.select(conns, [], [], 1.0)
+                    for conn in readable:
+                        conn.poll()
+                        while conn.notifies:
+                            notify = conn.notifies.pop(0)
+                            self._dispatch(json.loads(notify.payload))
+            except Exception as e:
+                logger.warning("Status listener failed, reconnecting: %s", e)
+                self._stop.wait(2)
+            finally:
+                for conn in conns:
+                    conn.close()
+
+
+broadcaster = StatusBroadcaster()
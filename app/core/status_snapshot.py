@@ -0,0 +1,290 @@
+"""
+Read-only, memory-mapped columnar snapshot of `public.status`.
+
+`src/build_status_snapshot.py` writes the snapshot as typed column files
+sorted by (station_id, time) plus a per-station offset index:
+
+    <status_snapshot_dir>/current -> <version>/
+        meta.json       rows, coverage window, build time
+        stations.i32    sorted station ids
+        offsets.i64     row offset of each station (len(stations) + 1)
+        time.i64        seconds since epoch, sorted within each station
+        bikes.i16       bikes_available
+        docks.i16       docks_available
+
+Every worker maps the files read-only, so all workers share a single
+copy through the page cache. The `current` link is swapped atomically by
+the builder and re-resolved every `status_snapshot_check_seconds`.
+
+Samples written to Postgres inside the coverage window after the build
+(late inserts, updates, deletes) are only visible after the next build.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core import warmup
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+COLUMNS = ("station_id", "time", "bikes_available", "docks_available")
+BUCKET_SECONDS = {"hour": 3600, "day": 86400}
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_naive(value: datetime) -> datetime:
+    """
+    A request timestamp as `time` (TIMESTAMP WITHOUT TIME ZONE) compares
+    with it in Postgres: aware values are converted to the session time
+    zone (UTC on the API's servers) and lose their offset.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def to_epoch(value: datetime) -> int:
+    """
+    Seconds since epoch of a naive (UTC-as-stored) or aware timestamp.
+    """
+    return int((to_naive(value) - EPOCH).total_seconds())
+
+
+def from_epoch(seconds: int) -> datetime:
+    return EPOCH + timedelta(seconds=int(seconds))
+
+
+class StatusSnapshot:
+    """
+    One mapped snapshot version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {self.meta['format_version']}")
+        self.coverage_start = datetime.fromisoformat(self.meta["coverage_start"])
+        self.coverage_end = datetime.fromisoformat(self.meta["coverage_end"])
+        self.stations = self._map("stations.i32", "<i4")
+        self.offsets = self._map("offsets.i64", "<i8")
+        self.time = self._map("time.i64", "<i8")
+        self.bikes = self._map("bikes.i16", "<i2")
+        self.docks = self._map("docks.i16", "<i2")
+
+    def _map(self, name: str, dtype: str) -> np.ndarray:
+        path = os.path.join(self.path, name)
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def covers(self, start: Optional[datetime], end: Optional[datetime]) -> bool:
+        """
+        True when the half-open range [start, end) lies inside the coverage window.
+
+        An open start is covered (the snapshot starts at the oldest sample);
+        an open end is not, since newer samples live only in Postgres.
+        """
+        if end is None or to_naive(end) > self.coverage_end:
+            return False
+        return start is None or to_naive(start) >= self.coverage_start
+
+    def station_range(
+        self,
+        station_id: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> Tuple[int, int]:
+        """
+        Row interval [lo, hi) of a station's samples in [start, end).
+
+        With `after` (a `(time, station_id)` listing cursor), only the
+        samples that sort after it by `(time, station_id)` are kept.
+        """
+        index = int(np.searchsorted(self.stations, station_id))
+        if index >= len(self.stations) or self.stations[index] != station_id:
+            return 0, 0
+        base, hi = int(self.offsets[index]), int(self.offsets[index + 1])
+        times = self.time[base:hi]
+        lo = base
+        if start is not None:
+            lo += int(np.searchsorted(times, to_epoch(start), side="left"))
+        if after is not None:
+            after_time, after_station_id = to_naive(after[0]), after[1]
+            # Samples in the cursor's own second come after it only if this
+            # station sorts after the cursor's (times are whole seconds)
+            inclusive = station_id > after_station_id and after_time.microsecond == 0
+            side = "left" if inclusive else "right"
+            lo = max(lo, base + int(np.searchsorted(times, to_epoch(after_time), side=side)))
+        if end is not None:
+            hi = base + int(np.searchsorted(times, to_epoch(end), side="left"))
+        return lo, max(lo, hi)
+
+    def rows(
+        self,
+        station_id: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        skip: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> List[Dict]:
+        """
+        A station's samples in [start, end) (and past `after`), ordered by time.
+        """
+        lo, hi = self.station_range(station_id, start, end, after)
+        lo = min(lo + skip, hi)
+        hi = min(lo + limit, hi)
+        return [
+            {
+                "station_id": station_id,
+                "time": from_epoch(t),
+                "bikes_available": int(b),
+                "docks_available": int(d),
+            }
+            for t, b, d in zip(self.time[lo:hi], self.bikes[lo:hi], self.docks[lo:hi])
+        ]
+
+    def latest_at(self, at: datetime) -> List[Dict]:
+        """
+        Latest sample at or before `at` of every station, by binary search.
+        """
+        target = to_epoch(at)
+        results = []
+        for index, station_id in enumerate(self.stations):
+            lo, hi = int(self.offsets[index]), int(self.offsets[index + 1])
+            position = lo + int(np.searchsorted(self.time[lo:hi], target, side="right")) - 1
+            if position < lo:
+                continue
+            results.append({
+                "at": at,
+                "station_id": int(station_id),
+                "time": from_epoch(self.time[position]),
+                "bikes_available": int(self.bikes[position]),
+                "docks_available": int(self.docks[position]),
+            })
+        return results
+
+    def count(
+        self,
+        station_id: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> int:
+        lo, hi = self.station_range(station_id, start, end, after)
+        return hi - lo
+
+    def aggregate(
+        self,
+        station_ids: Iterable[int],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        bucket: Optional[str],
+    ) -> List[Dict]:
+        """
+        Per-station (and per-bucket) sample count, average, min and max of bikes/docks.
+        """
+        results = []
+        for station_id in station_ids:
+            lo, hi = self.station_range(station_id, start, end)
+            if lo == hi:
+                continue
+            times = self.time[lo:hi]
+            bikes = self.bikes[lo:hi].astype(np.int64)
+            docks = self.docks[lo:hi].astype(np.int64)
+            if bucket is None:
+                starts = np.array([0])
+                keys = [None]
+            else:
+                size = BUCKET_SECONDS[bucket]
+                buckets = times // size
+                starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+                keys = [from_epoch(b * size) for b in buckets[starts]]
+            counts = np.diff(np.r_[starts, len(times)])
+            bikes_sum = np.add.reduceat(bikes, starts)
+            docks_sum = np.add.reduceat(docks, starts)
+            bikes_min = np.minimum.reduceat(bikes, starts)
+            bikes_max = np.maximum.reduceat(bikes, starts)
+            docks_min = np.minimum.reduceat(docks, starts)
+            docks_max = np.maximum.reduceat(docks, starts)
+            for i, key in enumerate(keys):
+                results.append({
+                    "station_id": station_id,
+                    "bucket": key,
+                    "samples": int(counts[i]),
+                    "avg_bikes_available": float(bikes_sum[i] / counts[i]),
+                    "min_bikes_available": int(bikes_min[i]),
+                    "max_bikes_available": int(bikes_max[i]),
+                    "avg_docks_available": float(docks_sum[i] / counts[i]),
+                    "min_docks_available": int(docks_min[i]),
+                    "max_docks_available": int(docks_max[i]),
+                })
+        return results
+
+    def station_ids(self) -> List[int]:
+        return [int(s) for s in self.stations]
+
+
+class SnapshotHolder:
+    """
+    Tracks the snapshot the `current` link points to, remapping when it changes.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[StatusSnapshot] = None
+        self._target: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[StatusSnapshot]:
+        """
+        The current snapshot, or None when disabled or not built yet.
+        """
+        if not settings.status_snapshot_enabled:
+            return None
+        if time.monotonic() - self._checked_at >= settings.status_snapshot_check_seconds:
+            self.refresh()
+        return self._snapshot
+
+    def refresh(self) -> None:
+        if not settings.status_snapshot_enabled:
+            return
+        with self._lock:
+            self._checked_at = time.monotonic()
+            link = os.path.join(settings.status_snapshot_dir, "current")
+            try:
+                target = os.path.realpath(link, strict=True)
+            except OSError:
+                self._snapshot, self._target = None, None
+                return
+            if target == self._target:
+                return
+            try:
+                self._snapshot = StatusSnapshot(target)
+                self._target = target
+                logger.info(
+                    "Mapped status snapshot %s (%s rows, %s to %s)",
+                    target,
+                    self._snapshot.meta["rows"],
+                    self._snapshot.coverage_start,
+                    self._snapshot.coverage_end,
+                )
+            except Exception as e:
+                logger.warning("Could not map status snapshot %s: %s", target, e)
+
+
+snapshots = SnapshotHolder()
+
+warmup.warmup_hooks.append(snapshots.refresh)
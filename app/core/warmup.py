@@ -0,0 +1,86 @@
+"""
+Worker warmup: pre-fill the connection pools and warm hot caches.
+
+Runs once per gunicorn worker from the application lifespan. Until it
+finishes, `GET /ready` answers 503 so the load balancer keeps traffic
+away from a cold worker.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.database import engine, replica_engines
+from app.core.sharding import shard_map
+
+logger = logging.getLogger(__name__)
+
+WARMUP_QUERIES = [
+    "SELECT * FROM public.station",
+    "SELECT MAX(time) FROM public.status",
+    "SELECT MAX(start_date) FROM public.trip",
+    "SELECT * FROM public.weather ORDER BY date DESC LIMIT 100",
+]
+
+# Status shards only hold the status tables
+SHARD_WARMUP_QUERIES = [
+    "SELECT MAX(time) FROM public.status",
+]
+
+# Extra warmup steps registered by other modules (in-memory caches, ...)
+warmup_hooks: List[Callable[[], None]] = []
+
+ready = threading.Event()
+
+
+def _prefill_pool(target: Engine, connections: int, queries: List[str]) -> None:
+    """
+    Open `connections` pooled connections at once, run `queries` on one of
+    them, then return them all to the pool.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(target.connect())
+        for query in queries:
+            opened[0].execute(text(query)).fetchall()
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+def warm_up() -> None:
+    """
+    Pre-fill every pool, run the warmup queries and hooks, then mark the worker ready.
+
+    Failures are logged and do not keep the worker unready forever: a
+    cold cache is better than a worker that never takes traffic.
+    """
+    connections = min(settings.pool_warmup_connections, engine.pool.size())
+    targets = [(target, WARMUP_QUERIES) for target in (engine, *replica_engines)]
+    targets += [(target, SHARD_WARMUP_QUERIES) for target in shard_map.engines]
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        for (target, _), result in zip(
+            targets,
+            executor.map(lambda t: _safe(_prefill_pool, t[0], connections, t[1]), targets),
+        ):
+            logger.info("Warmed pool of %s: %s", target.url.render_as_string(), result)
+
+    for hook in warmup_hooks:
+        _safe(hook)
+
+    ready.set()
+    logger.info("Worker warmup finished")
+
+
+def _safe(func: Callable, *args) -> str:
+    try:
+        func(*args)
+        return "ok"
+    except Exception as e:
+        logger.warning("Warmup step %s failed: %s", getattr(func, "__name__", func), e)
+        return f"failed ({e})"
@@ -0,0 +1,248 @@
+"""
+In-memory weather aggregation cube.
+
+`public.weather` is loaded once into compact numpy arrays and
+pre-aggregated at day, week, month and year granularity into cells keyed
+by (period, zip_code, events). Every cell keeps mergeable measures
+(counts, sums, min/max), so `GET /weather/summary` only filters cells
+and rolls them up by zip code or by events.
+
+The cube is rebuilt lazily when it is stale: immediately after a write
+in this worker (`invalidate()`), and within `weather_cube_check_seconds`
+after a write in another worker or process, detected through a cheap
+fingerprint of the table (row count and newest `xmin`).
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from app.core import warmup
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("day", "week", "month", "year")
+
+LOAD_QUERY = text("""
+    SELECT date, zip_code, events, mean_temperature_f, max_temperature_f,
+           min_temperature_f, precipitation_inches, mean_humidity, mean_wind_speed_mph
+    FROM public.weather
+""")
+FINGERPRINT_QUERY = text(
+    "SELECT COUNT(*), COALESCE(MAX(xmin::text::bigint), 0) FROM public.weather"
+)
+
+# Measures averaged over their non-null days
+AVERAGED = ("mean_temperature_f", "mean_humidity", "mean_wind_speed_mph")
+
+
+def _period_start(days: np.ndarray, granularity: str) -> np.ndarray:
+    """
+    First day of the period containing each day (datetime64[D] array).
+    """
+    if granularity == "day":
+        return days
+    if granularity == "week":
+        # 1970-01-01 was a Thursday; weeks start on Monday
+        return days - ((days.astype(np.int64) + 3) % 7)
+    unit = "M" if granularity == "month" else "Y"
+    return days.astype(f"datetime64[{unit}]").astype("datetime64[D]")
+
+
+@dataclass
+class Cells:
+    """
+    Aggregated cells of one granularity, one entry per (period, zip, events).
+    """
+    period: np.ndarray
+    zip_index: np.ndarray
+    events_index: np.ndarray
+    days: np.ndarray
+    rainy_days: np.ndarray
+    precipitation: np.ndarray
+    max_temperature: np.ndarray
+    min_temperature: np.ndarray
+    sums: Dict[str, np.ndarray]
+    counts: Dict[str, np.ndarray]
+
+
+class WeatherCube:
+    """
+    Immutable cube built from one read of `public.weather`.
+    """
+
+    def __init__(self, rows: List[Tuple], fingerprint: Tuple[int, int]):
+        self.fingerprint = fingerprint
+        self.zip_codes: List[str] = sorted({row[1] for row in rows})
+        self.events: List[Optional[str]] = [None] + sorted({row[2] for row in rows if row[2]})
+        zip_lookup = {z: i for i, z in enumerate(self.zip_codes)}
+        events_lookup = {e: i for i, e in enumerate(self.events)}
+
+        def column(index):
+            return np.array(
+                [np.nan if row[index] is None else float(row[index]) for row in rows],
+                dtype=np.float64,
+            )
+
+        days = np.array([row[0] for row in rows], dtype="datetime64[D]")
+        zip_index = np.array([zip_lookup[row[1]] for row in rows], dtype=np.int16)
+        events_index = np.array([events_lookup[row[2] or None] for row in rows], dtype=np.int8)
+        values = {
+            "mean_temperature_f": column(3),
+            "max_temperature_f": column(4),
+            "min_temperature_f": column(5),
+            "precipitation_inches": column(6),
+            "mean_humidity": column(7),
+            "mean_wind_speed_mph": column(8),
+        }
+        rain = np.array(["Rain" in (row[2] or "") for row in rows])
+        rainy = (np.nan_to_num(values["precipitation_inches"]) > 0) | rain
+
+        self.cells = {
+            granularity: self._aggregate(
+                _period_start(days, granularity), zip_index, events_index, values, rainy
+            )
+            for granularity in GRANULARITIES
+        }
+
+    def _aggregate(self, period, zip_index, events_index, values, rainy) -> Cells:
+        if len(period) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return Cells(period, zip_index, events_index, empty, empty, empty, empty, empty,
+                         {m: empty for m in AVERAGED}, {m: empty for m in AVERAGED})
+        order = np.lexsort((events_index, zip_index, period))
+        period, zip_index, events_index = period[order], zip_index[order], events_index[order]
+        starts = np.flatnonzero(np.r_[
+            True,
+            (period[1:] != period[:-1]) | (zip_index[1:] != zip_index[:-1])
+            | (events_index[1:] != events_index[:-1]),
+        ])
+        ordered = {name: array[order] for name, array in values.items()}
+        return Cells(
+            period=period[starts],
+            zip_index=zip_index[starts],
+            events_index=events_index[starts],
+            days=np.diff(np.r_[starts, len(period)]),
+            rainy_days=np.add.reduceat(rainy[order].astype(np.int64), starts),
+            precipitation=np.add.reduceat(np.nan_to_num(ordered["precipitation_inches"]).astype(np.float64), starts),
+            max_temperature=np.fmax.reduceat(ordered["max_temperature_f"].astype(np.float64), starts),
+            min_temperature=np.fmin.reduceat(ordered["min_temperature_f"].astype(np.float64), starts),
+            sums={m: np.add.reduceat(np.nan_to_num(ordered[m]).astype(np.float64), starts) for m in AVERAGED},
+            counts={m: np.add.reduceat((~np.isnan(ordered[m])).astype(np.int64), starts) for m in AVERAGED},
+        )
+
+    def summary(
+        self,
+        granularity: str,
+        group_by: str,
+        zip_code: Optional[str],
+        start: Optional[date],
+        end: Optional[date],
+    ) -> List[Dict]:
+        """
+        Roll the cells of a granularity up by period and `zip_code` or `events`.
+
+        `start`/`end` (inclusive) select whole periods by their first day.
+        """
+        cells = self.cells[granularity]
+        mask = np.ones(len(cells.period), dtype=bool)
+        if zip_code is not None:
+            if zip_code not in self.zip_codes:
+                return []
+            mask &= cells.zip_index == self.zip_codes.index(zip_code)
+        if start is not None:
+            mask &= cells.period >= _period_start(np.array([start], dtype="datetime64[D]"), granularity)[0]
+        if end is not None:
+            mask &= cells.period <= np.datetime64(end, "D")
+        index = np.flatnonzero(mask)
+        if len(index) == 0:
+            return []
+
+        group = cells.zip_index[index] if group_by == "zip_code" else cells.events_index[index]
+        order = np.lexsort((group, cells.period[index]))
+        index, group = index[order], group[order]
+        period = cells.period[index]
+        starts = np.flatnonzero(np.r_[True, (period[1:] != period[:-1]) | (group[1:] != group[:-1])])
+
+        def total(array):
+            return np.add.reduceat(array[index], starts)
+
+        days = total(cells.days)
+        rainy_days = total(cells.rainy_days)
+        precipitation = total(cells.precipitation)
+        max_temperature = np.fmax.reduceat(cells.max_temperature[index], starts)
+        min_temperature = np.fmin.reduceat(cells.min_temperature[index], starts)
+        averages = {}
+        for measure in AVERAGED:
+            sums, counts = total(cells.sums[measure]), total(cells.counts[measure])
+            averages[measure] = [float(s / c) if c else None for s, c in zip(sums, counts)]
+
+        results = []
+        for i, first in enumerate(starts):
+            label = int(group[first])
+            results.append({
+                "period": period[first].item(),
+                "zip_code": self.zip_codes[label] if group_by == "zip_code" else zip_code,
+                "events": self.events[label] if group_by == "events" else None,
+                "days": int(days[i]),
+                "rainy_days": int(rainy_days[i]),
+                "total_precipitation_inches": float(precipitation[i]),
+                "mean_temperature_f": averages["mean_temperature_f"][i],
+                "max_temperature_f": None if np.isnan(max_temperature[i]) else float(max_temperature[i]),
+                "min_temperature_f": None if np.isnan(min_temperature[i]) else float(min_temperature[i]),
+                "mean_humidity": averages["mean_humidity"][i],
+                "mean_wind_speed_mph": averages["mean_wind_speed_mph"][i],
+            })
+        return results
+
+
+class WeatherCubeHolder:
+    """
+    Holds the current cube and rebuilds it when the table changed.
+    """
+
+    def __init__(self):
+        self._cube: Optional[WeatherCube] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> WeatherCube:
+        if self._cube is None or time.monotonic() - self._checked_at >= settings.weather_cube_check_seconds:
+            self.refresh()
+        return self._cube
+
+    def invalidate(self) -> None:
+        """
+        Force a fingerprint check on the next read (call after writing weather records).
+        """
+        self._checked_at = 0.0
+
+    def refresh(self) -> None:
+        """
+        Rebuild the cube if the table fingerprint changed since the last build.
+        """
+        with self._lock:
+            if self._cube is not None and time.monotonic() - self._checked_at < settings.weather_cube_check_seconds:
+                return
+            with SessionLocal() as db:
+                fingerprint = tuple(db.execute(FINGERPRINT_QUERY).one())
+                if self._cube is None or fingerprint != self._cube.fingerprint:
+                    started = time.monotonic()
+                    self._cube = WeatherCube(db.execute(LOAD_QUERY).all(), fingerprint)
+                    logger.info(
+                        "Built weather cube from %s rows in %.0f ms",
+                        fingerprint[0], (time.monotonic() - started) * 1000,
+                    )
+            self._checked_at = time.monotonic()
+
+
+weather_cube = WeatherCubeHolder()
+
+warmup.warmup_hooks.append(weather_cube.refresh)
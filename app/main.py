@@ -4,12 +4,43 @@ SF Bike Share FastAPI Application
 Main application entry point that configures and initializes the FastAPI app.
 """
 
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi import status as http_status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
 
+from app.core.admission import admission
+from app.core.coalescing import SingleFlightMiddleware
 from app.core.config import settings
-from app.routes import stations, trips, status, weather
-print("Iniciando a aplicação FastAPI...")
+from app.core.retention import retention_loop
+from app.core.status_buffer import status_buffer
+from app.core.status_events import broadcaster
+from app.core import warmup
+from app.routes import stations, trips, status, weather, analytics, exports, changes
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start and stop the application's background tasks.
+    """
+    logger.info("Iniciando a aplicação FastAPI...")
+    tasks = [asyncio.create_task(asyncio.to_thread(warmup.warm_up))]
+    if settings.retention_enabled:
+        tasks.append(asyncio.create_task(retention_loop()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.to_thread(status_buffer.close)
+    await asyncio.to_thread(broadcaster.close)
+
+
 app = FastAPI(
     title=settings.api_title,
     description=settings.api_description,
@@ -17,17 +48,34 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
+app.add_middleware(SingleFlightMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Total-Count-Exact", "X-Coalesced", "X-Data-Source", "X-Sample-Percent", "Retry-After", "X-Next-Cursor"],
 )
 
 
+@app.exception_handler(OperationalError)
+async def query_timeout_handler(request: Request, exc: OperationalError):
+    """
+    Answer 504 when a query was cancelled by its route's statement_timeout.
+    """
+    sqlstate = getattr(exc.orig, "pgcode", None) or getattr(exc.orig, "sqlstate", None)
+    if sqlstate != "57014":
+        raise exc
+    return JSONResponse(
+        status_code=http_status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": "Query exceeded the time budget of this route"},
+    )
+
+
 @app.get("/", tags=["Health"])
 def health_check():
     """
@@ -44,7 +92,39 @@ def health_check():
     }
 
 
+@app.get("/ready", tags=["Health"])
+def readiness_check():
+    """
+    Readiness endpoint.
+
+    Answers 503 until this worker has pre-filled its connection pool and
+    warmed its caches, then 200.
+    """
+    if not warmup.ready.is_set():
+        return JSONResponse(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "warming up"},
+        )
+    return {"status": "ready"}
+
+
+@app.get("/metrics", tags=["Health"])
+def metrics():
+    """
+    Load metrics of this worker.
+
+    - **admission**: Per route class limit, running and queued requests,
+      and requests shed with 503 since startup
+    - **status_buffer**: Depth and flush counters of the status
+      write-behind buffer (`STATUS_WRITE_BEHIND`)
+    """
+    return {"admission": admission.stats(), "status_buffer": status_buffer.stats()}
+
+
 app.include_router(stations.router, prefix=settings.api_prefix)
 app.include_router(trips.router, prefix=settings.api_prefix)
 app.include_router(status.router, prefix=settings.api_prefix)
 app.include_router(weather.router, prefix=settings.api_prefix)
+app.include_router(analytics.router, prefix=settings.api_prefix)
+app.include_router(exports.router, prefix=settings.api_prefix)
+app.include_router(changes.router, prefix=settings.api_prefix)
@@ -7,6 +7,7 @@ from typing import Optional
 from decimal import Decimal
 
 from sqlalchemy import (
+    BigInteger,
     Column,
     Integer,
     String,
@@ -14,8 +15,11 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    Text,
     TIMESTAMP,
+    func,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -123,3 +127,75 @@ class Status(Base):
     time = Column(TIMESTAMP, nullable=False, primary_key=True)
     category1 = Column(Integer)
     category2 = Column(Integer)
+
+
+class StationOutage(Base):
+    """
+    Station outage interval model.
+
+    A run of consecutive status samples with no bikes (`empty`) or no
+    free docks (`full`) at a station. Maintained from `public.status` by
+    the triggers of `sql/014-station-outages.sql`.
+    """
+
+    __tablename__ = "station_outage"
+
+    station_id = Column(Integer, primary_key=True)
+    kind = Column(String(5), primary_key=True)
+    started_at = Column(TIMESTAMP, primary_key=True)
+    ended_at = Column(TIMESTAMP)
+    last_seen = Column(TIMESTAMP, nullable=False)
+    samples = Column(Integer, nullable=False)
+
+
+class DailyDemand(Base):
+    """
+    Daily demand fact model.
+
+    Trips started per station per day with the weather of the station's
+    ZIP code attached. Maintained by `public.refresh_daily_demand`.
+    """
+
+    __tablename__ = "daily_demand"
+
+    date = Column(Date, primary_key=True, nullable=False)
+    station_id = Column(Integer, primary_key=True, nullable=False)
+    zip_code = Column(String(14))
+    trips_started = Column(Integer, nullable=False)
+    subscriber_trips = Column(Integer, nullable=False)
+    customer_trips = Column(Integer, nullable=False)
+    mean_duration = Column(Numeric(12, 3))
+    max_temperature_f = Column(Numeric(8, 3))
+    mean_temperature_f = Column(Numeric(8, 3))
+    min_temperature_f = Column(Numeric(8, 3))
+    mean_humidity = Column(Numeric(8, 3))
+    mean_visibility_miles = Column(Numeric(8, 3))
+    mean_wind_speed_mph = Column(Numeric(8, 3))
+    precipitation_inches = Column(Numeric(8, 3))
+    cloud_cover = Column(Numeric(8, 3))
+    events = Column(String(100))
+
+
+class ExportJob(Base):
+    """
+    Bulk export job model.
+
+    Tracks an asynchronous export of a table to a compressed file.
+    """
+
+    __tablename__ = "export_job"
+
+    id = Column(String(32), primary_key=True)
+    params_hash = Column(String(64), nullable=False)
+    table_name = Column(String(50), nullable=False)
+    format = Column(String(10), nullable=False)
+    params = Column(JSONB, nullable=False)
+    status = Column(String(10), nullable=False, default="pending")
+    rows_written = Column(BigInteger, nullable=False, default=0)
+    rows_estimate = Column(BigInteger)
+    file_path = Column(Text)
+    file_size = Column(BigInteger)
+    error = Column(Text)
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    finished_at = Column(TIMESTAMP)
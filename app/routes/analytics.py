@@ -0,0 +1,65 @@
+"""
+API routes for precomputed analytics endpoints.
+"""
+from typing import List, Optional
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session
+
+from app.core.counting import set_total_count_headers
+from app.core.database import get_db
+from app.core.fields import FIELDS_DESCRIPTION, parse_fields, sparse_response
+from app.models.models import DailyDemand as DailyDemandModel
+from app.schemas.analytics import DailyDemand
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+@router.get("/daily-demand", response_model=List[DailyDemand], summary="Get daily demand with weather")
+def get_daily_demand(
+    response: Response,
+    start: Optional[date] = Query(None, description="First day to include"),
+    end: Optional[date] = Query(None, description="Last day to include"),
+    station_id: Optional[int] = Query(None, description="Filter by station ID"),
+    zip_code: Optional[str] = Query(None, description="Filter by weather ZIP code"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    with_total: bool = Query(False, description="Return the total in the X-Total-Count header"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve trips per station per day joined with that day's weather.
+    
+    - **start** / **end**: Inclusive day range (optional)
+    - **station_id**: Filter by specific station ID (optional)
+    - **zip_code**: Filter by weather ZIP code (optional)
+    - **skip**: Number of records to skip (for pagination)
+    - **limit**: Maximum number of records to return (max 1000)
+    - **with_total**: Add `X-Total-Count` / `X-Total-Count-Exact` headers
+    - **fields**: Comma-separated columns to return (optional)
+    """
+    columns = parse_fields(DailyDemandModel, fields)
+    query = db.query(DailyDemandModel)
+    filtered = any(value is not None for value in (start, end, station_id, zip_code))
+
+    if start is not None:
+        query = query.filter(DailyDemandModel.date >= start)
+    if end is not None:
+        query = query.filter(DailyDemandModel.date <= end)
+    if station_id is not None:
+        query = query.filter(DailyDemandModel.station_id == station_id)
+    if zip_code is not None:
+        query = query.filter(DailyDemandModel.zip_code == zip_code)
+
+    if with_total:
+        set_total_count_headers(response, db, query, "daily_demand", filtered)
+
+    query = query.order_by(DailyDemandModel.date, DailyDemandModel.station_id)
+    if columns is not None:
+        rows = query.with_entities(*columns).offset(skip).limit(limit).all()
+        return sparse_response(rows, columns, DailyDemand, response)
+
+    rows = query.offset(skip).limit(limit).all()
+    return rows
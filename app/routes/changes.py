@@ -0,0 +1,122 @@
+"""
+API routes for the change feed.
+"""
+from typing import List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.sharding import shard_map
+from app.schemas.change import ChangeFeed
+
+router = APIRouter(prefix="/changes", tags=["Changes"])
+
+TABLES = ("station", "trip", "status", "weather")
+OPS = {"I": "insert", "U": "update", "D": "delete"}
+
+# Only changes of transactions older than the snapshot's xmin are returned:
+# they have all finished, so nothing can later appear before the last
+# token handed out (see sql/013-change-log.sql)
+CHANGES_QUERY = text("""
+    SELECT txid::text AS txid, id, changed_at, table_name, op, key, data
+    FROM public.change_log
+    WHERE (txid, id) > (CAST(:txid AS xid8), :id)
+      AND txid < pg_snapshot_xmin(pg_current_snapshot())
+      AND table_name = ANY(:tables)
+    ORDER BY txid, id
+    LIMIT :limit
+""")
+HEAD_QUERY = text("""
+    SELECT txid::text AS txid, id
+    FROM public.change_log
+    WHERE txid < pg_snapshot_xmin(pg_current_snapshot())
+    ORDER BY txid DESC, id DESC
+    LIMIT 1
+""")
+HORIZON_QUERY = text("SELECT txid::text AS txid, id FROM public.change_log_horizon")
+
+
+def _parse_token(token: str) -> Tuple[int, int]:
+    try:
+        txid, change_id = token.split("-")
+        return int(txid), int(change_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid change token: {token}"
+        )
+
+
+def _token(txid, change_id) -> str:
+    return f"{txid}-{change_id}"
+
+
+@router.get("/", response_model=ChangeFeed, summary="Get changes since a token")
+def get_changes(
+    since: Optional[str] = Query(None, description="Token from a previous call (`next`); omit to get the current position"),
+    tables: Optional[List[Literal["station", "trip", "status", "weather"]]] = Query(None, description="Only these tables (repeatable; default all)"),
+    limit: int = Query(1000, ge=1, le=settings.changes_max_limit, description="Maximum number of changes to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    Inserts, updates and deletes on stations, trips, status and weather
+    since `since`, oldest first.
+
+    - **since**: Token returned as `next` by the previous call (optional)
+    - **tables**: Restrict to `station`, `trip`, `status` and/or `weather` (optional, repeatable)
+    - **limit**: Maximum number of changes (for paging; check `has_more`)
+
+    To mirror the data, call without `since` to get the current position,
+    download the tables, then poll with `since` and apply the changes in
+    order (changes made during the download are replayed; apply them as
+    upserts). Tokens older than the feed's retention answer `410`, and the
+    mirror must be rebuilt. A change becomes visible once every transaction
+    that started before it has finished.
+
+    With status sharded (`STATUS_SHARD_URLS`), status changes are not
+    logged: `status` is left out of the default tables and asking for it
+    answers `400`.
+    """
+    feed_tables = list(tables or TABLES)
+    if shard_map.enabled:
+        if tables is not None and "status" in tables:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The change feed does not include status while status is sharded"
+            )
+        feed_tables = [table for table in feed_tables if table != "status"]
+    horizon = db.execute(HORIZON_QUERY).one()
+    if since is None:
+        head = db.execute(HEAD_QUERY).first() or horizon
+        return {"changes": [], "next": _token(head.txid, head.id), "has_more": False}
+
+    txid, change_id = _parse_token(since)
+    if (txid, change_id) < (int(horizon.txid), horizon.id):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Token is older than the change feed retention; resync the tables"
+        )
+
+    rows = db.execute(
+        CHANGES_QUERY,
+        {"txid": str(txid), "id": change_id, "tables": feed_tables, "limit": limit + 1},
+    ).all()
+    changes = [
+        {
+            "token": _token(row.txid, row.id),
+            "table": row.table_name,
+            "op": OPS[row.op],
+            "key": row.key,
+            "data": row.data,
+            "changed_at": row.changed_at,
+        }
+        for row in rows[:limit]
+    ]
+    return {
+        "changes": changes,
+        "next": changes[-1]["token"] if changes else since,
+        "has_more": len(rows) > limit,
+    }
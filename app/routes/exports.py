@@ -0,0 +1,82 @@
+"""
+API routes for bulk export jobs.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.exports import ExportError, FILE_EXTENSIONS, submit_export
+from app.models.models import ExportJob as ExportJobModel
+from app.schemas.export import ExportCreate, ExportJob
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+MEDIA_TYPES = {
+    "csv": "application/gzip",
+    "ndjson": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+@router.post("/", response_model=ExportJob, status_code=status.HTTP_202_ACCEPTED, summary="Start a bulk export")
+def create_export(export: ExportCreate):
+    """
+    Start an asynchronous export of a table to a compressed file.
+    
+    - **table**: `station`, `trip`, `status` or `weather`
+    - **format**: `csv` (gzip), `ndjson` (gzip) or `parquet` (zstd)
+    - **filters**: Equality filters by column name (optional)
+    - **start** / **end**: Half-open range over the table's time column (optional)
+
+    An export with identical parameters that is queued or still running is
+    returned instead of starting a new one. A finished one is returned only
+    if its `end` was already past when it started; a failed one never is.
+    """
+    try:
+        job = submit_export(export.model_dump())
+    except ExportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return job
+
+
+def _get_job(export_id: str, db: Session) -> ExportJobModel:
+    job = db.query(ExportJobModel).filter(ExportJobModel.id == export_id).first()
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Export with id {export_id} not found"
+        )
+    return job
+
+
+@router.get("/{export_id}", response_model=ExportJob, summary="Get export progress")
+def get_export(export_id: str, db: Session = Depends(get_db)):
+    """
+    Retrieve the status and progress of an export.
+    
+    - **export_id**: The export job identifier
+    """
+    return _get_job(export_id, db)
+
+
+@router.get("/{export_id}/download", summary="Download a finished export")
+def download_export(export_id: str, db: Session = Depends(get_db)):
+    """
+    Download the file of a finished export.
+
+    Supports HTTP `Range` requests, so interrupted downloads can be resumed.
+    
+    - **export_id**: The export job identifier
+    """
+    job = _get_job(export_id, db)
+    if job.status != "done":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Export {export_id} is {job.status}"
+        )
+    return FileResponse(
+        job.file_path,
+        media_type=MEDIA_TYPES[job.format],
+        filename=f"{job.table_name}-{job.id}.{FILE_EXTENSIONS[job.format]}",
+    )
@@ -2,25 +2,75 @@
 API routes for Station endpoints.
 """
 
-from typing import List
-from datetime import date
+from typing import List, Literal, Optional
+from datetime import date, datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from sqlalchemy import func, literal_column, or_
 from sqlalchemy.orm import Session
 
+from app.core.counting import set_total_count_headers
 from app.core.database import get_db
-from app.models.models import Station as StationModel
-from app.schemas.station import Station, StationCreate, StationUpdate
+from app.core.fields import FIELDS_DESCRIPTION, parse_fields, sparse_response
+from app.core.sharding import shard_map
+from app.models.models import Station as StationModel, StationOutage as StationOutageModel
+from app.schemas.station import (
+    Station,
+    StationCreate,
+    StationOutage,
+    StationOutageRank,
+    StationUpdate,
+)
 
 router = APIRouter(prefix="/stations", tags=["Stations"])
 
+# [started_at, ended_at] of an outage (up to last_seen while ongoing); must
+# match idx_station_outage_span (sql/014-station-outages.sql) exactly for the
+# GiST index to be used
+OUTAGE_END = func.coalesce(StationOutageModel.ended_at, StationOutageModel.last_seen)
+OUTAGE_SPAN = func.tsrange(
+    StationOutageModel.started_at, OUTAGE_END, literal_column("'[]'")
+)
+
+
+def _overlapping(query, start: Optional[datetime], end: Optional[datetime]):
+    """
+    Restrict an outage query to the outages overlapping [start, end).
+    """
+    if start is None and end is None:
+        return query
+    window = func.tsrange(start, end, literal_column("'[)'"))
+    query = query.filter(OUTAGE_SPAN.op("&&")(window))
+    if start is not None:
+        # An outage ending exactly at `start` only touches the window
+        query = query.filter(
+            or_(
+                StationOutageModel.ended_at.is_(None),
+                StationOutageModel.ended_at > start,
+            )
+        )
+    return query
+
+
+def _check_window(start: Optional[datetime], end: Optional[datetime]) -> None:
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start",
+        )
+
 
 @router.get("/", response_model=List[Station], summary="Get all stations")
 def get_stations(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(
         100, ge=1, le=1000, description="Maximum number of records to return"
     ),
+    with_total: bool = Query(
+        False, description="Return the total in the X-Total-Count header"
+    ),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     """
@@ -28,27 +78,193 @@ def get_stations(
 
     - **skip**: Number of records to skip (for pagination)
     - **limit**: Maximum number of records to return (max 1000)
+    - **with_total**: Add `X-Total-Count` / `X-Total-Count-Exact` headers
+    - **fields**: Comma-separated columns to return (optional)
     """
-    stations = db.query(StationModel).offset(skip).limit(limit).all()
+    columns = parse_fields(StationModel, fields)
+    query = db.query(StationModel)
+    if with_total:
+        set_total_count_headers(response, db, query, "station", filtered=False)
+    if columns is not None:
+        rows = query.with_entities(*columns).offset(skip).limit(limit).all()
+        return sparse_response(rows, columns, Station, response)
+    stations = query.offset(skip).limit(limit).all()
     return stations
 
 
+@router.get(
+    "/outages",
+    response_model=List[StationOutageRank],
+    summary="Rank stations by outage time",
+)
+def rank_station_outages(
+    start: datetime = Query(..., description="Start of the window (inclusive)"),
+    end: datetime = Query(..., description="End of the window (exclusive)"),
+    kind: Optional[Literal["empty", "full"]] = Query(
+        None, description="Only `empty` or `full` outages (default: both)"
+    ),
+    limit: int = Query(
+        10, ge=1, le=1000, description="Maximum number of stations to return"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Stations ranked by the time they spent empty or full within a window.
+
+    - **start** / **end**: Half-open time window
+    - **kind**: `empty` (no bikes) or `full` (no docks); one row per station and kind when omitted
+    - **limit**: Maximum number of rows to return (max 1000)
+
+    Outages are clipped to the window; ongoing ones count up to the
+    station's latest sample. Read from the precomputed outage intervals
+    through their GiST span index, never from the raw status samples.
+    """
+    _check_window(start, end)
+    clipped = func.extract(
+        "epoch",
+        func.least(OUTAGE_END, end) - func.greatest(StationOutageModel.started_at, start),
+    )
+    total = func.sum(clipped).label("total_seconds")
+
+    def ranked(session: Session, _):
+        query = session.query(
+            StationOutageModel.station_id,
+            StationOutageModel.kind,
+            func.count().label("outages"),
+            total,
+            func.max(clipped).label("longest_seconds"),
+        )
+        query = _overlapping(query, start, end)
+        if kind is not None:
+            query = query.filter(StationOutageModel.kind == kind)
+        return (
+            query.group_by(StationOutageModel.station_id, StationOutageModel.kind)
+            .order_by(
+                total.desc(), StationOutageModel.station_id, StationOutageModel.kind
+            )
+            .limit(limit)
+            .all()
+        )
+
+    # Each shard holds whole stations: its own top `limit` rows are enough
+    rows = [row for rows in shard_map.scatter(db, ranked) for row in rows]
+    rows.sort(key=lambda row: (-row.total_seconds, row.station_id, row.kind))
+    rows = rows[:limit]
+    names = dict(
+        db.query(StationModel.id, StationModel.name)
+        .filter(StationModel.id.in_({row.station_id for row in rows}))
+        .all()
+    )
+    return [
+        {
+            "station_id": row.station_id,
+            "name": names.get(row.station_id),
+            "kind": row.kind,
+            "outages": row.outages,
+            "total_seconds": float(row.total_seconds),
+            "longest_seconds": float(row.longest_seconds),
+        }
+        for row in rows
+    ]
+
+
 @router.get("/{station_id}", response_model=Station, summary="Get station by ID")
-def get_station(station_id: int, db: Session = Depends(get_db)):
+def get_station(
+    station_id: int,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db),
+):
     """
     Retrieve a specific station by its ID.
 
     - **station_id**: The unique identifier of the station
+    - **fields**: Comma-separated columns to return (optional)
     """
-    station = db.query(StationModel).filter(StationModel.id == station_id).first()
+    columns = parse_fields(StationModel, fields)
+    query = db.query(StationModel).filter(StationModel.id == station_id)
+    station = query.with_entities(*columns).first() if columns else query.first()
     if station is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Station with id {station_id} not found",
         )
+    if columns is not None:
+        return sparse_response(station, columns, Station)
     return station
 
 
+@router.get(
+    "/{station_id}/outages",
+    response_model=List[StationOutage],
+    summary="Get the empty/full outages of a station",
+)
+def get_station_outages(
+    station_id: int,
+    start: Optional[datetime] = Query(
+        None, description="Only outages overlapping the window from this time"
+    ),
+    end: Optional[datetime] = Query(
+        None, description="Only outages overlapping the window before this time"
+    ),
+    kind: Optional[Literal["empty", "full"]] = Query(
+        None, description="Only `empty` or `full` outages (default: both)"
+    ),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(
+        100, ge=1, le=1000, description="Maximum number of records to return"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Intervals during which a station had no bikes (`empty`) or no free
+    docks (`full`), ordered by start.
+
+    - **station_id**: The unique identifier of the station
+    - **start** / **end**: Half-open window the outages must overlap (optional)
+    - **kind**: `empty` or `full` (optional)
+    - **skip** / **limit**: Pagination (max 1000)
+
+    An outage starts at its first status sample and ends at the first
+    sample back in service. Outages still running at the station's latest
+    sample have no `ended_at` and are `ongoing`.
+    """
+    _check_window(start, end)
+    if db.query(StationModel.id).filter(StationModel.id == station_id).first() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Station with id {station_id} not found",
+        )
+
+    with shard_map.station_session(db, station_id) as session:
+        query = session.query(StationOutageModel).filter(
+            StationOutageModel.station_id == station_id
+        )
+        if kind is not None:
+            query = query.filter(StationOutageModel.kind == kind)
+        query = _overlapping(query, start, end)
+        outages = (
+            query.order_by(StationOutageModel.started_at, StationOutageModel.kind)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+    return [
+        {
+            "station_id": outage.station_id,
+            "kind": outage.kind,
+            "started_at": outage.started_at,
+            "ended_at": outage.ended_at,
+            "last_seen": outage.last_seen,
+            "samples": outage.samples,
+            "duration_seconds": (
+                (outage.ended_at or outage.last_seen) - outage.started_at
+            ).total_seconds(),
+            "ongoing": outage.ended_at is None,
+        }
+        for outage in outages
+    ]
+
+
 @router.post(
     "/",
     response_model=Station,
@@ -1,24 +1,86 @@
 """
 API routes for Status endpoints.
 """
-from typing import List
+import asyncio
+import heapq
+import json
+from contextlib import nullcontext
+from itertools import chain, islice
+from typing import AsyncGenerator, Iterator, List, Literal, Optional, Tuple
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import func, select, text, tuple_
 from sqlalchemy.orm import Session
 
+from app.core.approx import (
+    APPROX_DESCRIPTION,
+    MAX_ERROR_DESCRIPTION,
+    SAMPLE_PERCENT_DESCRIPTION,
+    estimate_groups,
+    set_sample_headers,
+)
+from app.core.config import settings
+
+from app.core.counting import TOTAL_COUNT_EXACT_HEADER, TOTAL_COUNT_HEADER, total_count
 from app.core.database import get_db
-from app.models.models import Status as StatusModel
-from app.schemas.status import Status, StatusCreate, StatusUpdate
+from app.core.fields import FIELDS_DESCRIPTION, parse_fields, sparse_response
+from app.core.parallel import PartialAggregate, merge_partials, run_partitioned
+from app.core.sharding import shard_map
+from app.models.models import Station as StationModel, Status as StatusModel
+from app.core.status_buffer import COLUMNS as BUFFER_COLUMNS, BufferFull, status_buffer
+from app.core.status_events import broadcaster
+from app.core.status_snapshot import COLUMNS as SNAPSHOT_COLUMNS, snapshots, to_naive
+from app.schemas.status import Status, StatusAggregate, StatusAt, StatusCreate, StatusUpdate
 
 router = APIRouter(prefix="/status", tags=["Status"])
 
+MAX_POINTS_IN_TIME = 96
+
+# Latest sample at or before each requested time, one backward index seek
+# on idx_status_station_time per (time, station)
+STATUS_AT_QUERY = text("""
+    SELECT t.at, s.id AS station_id, st.time, st.bikes_available, st.docks_available
+    FROM unnest(CAST(:times AS timestamp[])) AS t(at)
+    CROSS JOIN public.station s
+    CROSS JOIN LATERAL (
+        SELECT time, bikes_available, docks_available
+        FROM public.status
+        WHERE station_id = s.id AND time <= t.at
+        ORDER BY time DESC
+        LIMIT 1
+    ) st
+    ORDER BY t.at, s.id
+""")
+# Same lookup on a status shard, for the stations it owns (public.station
+# lives on the primary)
+STATUS_AT_SHARD_QUERY = text("""
+    SELECT t.at, s.id AS station_id, st.time, st.bikes_available, st.docks_available
+    FROM unnest(CAST(:times AS timestamp[])) AS t(at)
+    CROSS JOIN unnest(CAST(:station_ids AS integer[])) AS s(id)
+    CROSS JOIN LATERAL (
+        SELECT time, bikes_available, docks_available
+        FROM public.status
+        WHERE station_id = s.id AND time <= t.at
+        ORDER BY time DESC
+        LIMIT 1
+    ) st
+""")
+
 
 @router.get("/", response_model=List[Status], summary="Get all status records")
 def get_status_records(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     station_id: int = Query(None, description="Filter by station ID"),
+    time_from: Optional[datetime] = Query(None, description="Only records at or after this timestamp"),
+    time_to: Optional[datetime] = Query(None, description="Only records before this timestamp"),
+    cursor: Optional[str] = Query(None, description="Continue after this `X-Next-Cursor` value"),
+    with_total: bool = Query(False, description="Return the total in the X-Total-Count header"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
@@ -27,39 +89,422 @@ def get_status_records(
     - **skip**: Number of records to skip (for pagination)
     - **limit**: Maximum number of records to return (max 1000)
     - **station_id**: Filter by specific station ID (optional)
+    - **time_from** / **time_to**: Half-open `time` range (optional)
+    - **cursor**: Keyset pagination: records after this `X-Next-Cursor` (optional)
+    - **with_total**: Add `X-Total-Count` / `X-Total-Count-Exact` headers
+    - **fields**: Comma-separated columns to return (optional)
+    
+    Records are ordered by `(time, station_id)` when a time range or a
+    cursor is given, and always when status is sharded. Ordered pages
+    that are full carry `X-Next-Cursor`, the position of their last record.
+
+    Station histories restricted to the snapshot columns (`station_id`,
+    `time`, `bikes_available`, `docks_available`) whose range ends inside
+    the status snapshot are served from it (`X-Data-Source: snapshot`).
+
+    With `STATUS_SHARD_URLS` set, a station's history is read from its
+    shard; other listings read the first `skip + limit` records of every
+    shard in parallel and merge them, so their `skip` is limited to
+    `STATUS_SHARD_MAX_SKIP` (`400` above it; use `cursor` instead).
+    """
+    columns = parse_fields(StatusModel, fields)
+    after = _parse_cursor(cursor)
+    time_filtered = time_from is not None or time_to is not None
+
+    snapshot = snapshots.get()
+    if (
+        snapshot is not None
+        and station_id is not None
+        and columns is not None
+        and all(column.name in SNAPSHOT_COLUMNS for column in columns)
+        and snapshot.covers(time_from, time_to)
+    ):
+        if with_total:
+            response.headers["X-Total-Count"] = str(snapshot.count(station_id, time_from, time_to, after))
+            response.headers["X-Total-Count-Exact"] = "true"
+        response.headers["X-Data-Source"] = "snapshot"
+        samples = snapshot.rows(station_id, time_from, time_to, skip, limit, after)
+        if len(samples) == limit:
+            response.headers["X-Next-Cursor"] = f"{samples[-1]['time'].isoformat()}_{station_id}"
+        rows = [tuple(sample[column.name] for column in columns) for sample in samples]
+        return sparse_response(rows, columns, Status, response)
+
+    def filtered(session: Session):
+        query = session.query(StatusModel)
+        if station_id is not None:
+            query = query.filter(StatusModel.station_id == station_id)
+        if time_from is not None:
+            query = query.filter(StatusModel.time >= time_from)
+        if time_to is not None:
+            query = query.filter(StatusModel.time < time_to)
+        if after is not None:
+            # `time >= t` lets the planner use idx_status_time_btree
+            query = query.filter(
+                StatusModel.time >= after[0],
+                tuple_(StatusModel.time, StatusModel.station_id) > tuple_(*after),
+            )
+        return query
+
+    scattered = shard_map.enabled and station_id is None
+    if scattered and skip > settings.status_shard_max_skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"skip is limited to {settings.status_shard_max_skip} across status shards; "
+                "page with cursor (X-Next-Cursor) instead"
+            ),
+        )
+    ordered = time_filtered or after is not None or scattered
+    entities = [StatusModel] if columns is None else list(columns)
+    if ordered and columns is not None:
+        # Sparse rows also carry their (time, station_id) key for merging and the cursor
+        entities += [StatusModel.time, StatusModel.station_id]
+
+    def page(session: Session, offset: int, count: int):
+        query = filtered(session)
+        if ordered:
+            query = query.order_by(StatusModel.time, StatusModel.station_id)
+        return query.with_entities(*entities).offset(offset).limit(count).all()
+
+    def sort_key(row):
+        return (row.time, row.station_id) if columns is None else tuple(row[-2:])
+
+    if scattered:
+        pages = shard_map.scatter(db, lambda session, _: page(session, 0, skip + limit))
+        rows = list(islice(heapq.merge(*pages, key=sort_key), skip, skip + limit))
+    else:
+        owner = shard_map.station_session(db, station_id) if station_id is not None else nullcontext(db)
+        with owner as session:
+            rows = page(session, skip, limit)
+
+    if with_total:
+        counts = shard_map.scatter(
+            db,
+            lambda session, _: total_count(
+                session,
+                filtered(session),
+                "status",
+                filtered=station_id is not None or time_filtered or after is not None,
+            ),
+            [station_id] if station_id is not None else None,
+        )
+        response.headers[TOTAL_COUNT_HEADER] = str(sum(count.value for count in counts))
+        response.headers[TOTAL_COUNT_EXACT_HEADER] = "true" if all(count.exact for count in counts) else "false"
+    if ordered and len(rows) == limit:
+        last_time, last_station_id = sort_key(rows[-1])
+        response.headers["X-Next-Cursor"] = f"{last_time.isoformat()}_{last_station_id}"
+
+    if columns is not None:
+        return sparse_response([tuple(row[: len(columns)]) for row in rows], columns, Status, response)
+    return rows
+
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """
+    Parse an `X-Next-Cursor` value (`<time>_<station_id>`).
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    if cursor is None:
+        return None
+    try:
+        time_part, station_part = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(time_part), int(station_part)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor {cursor!r}; expected <time>_<station_id> from X-Next-Cursor"
+        )
+
+
+@router.get("/aggregate", response_model=List[StatusAggregate], summary="Aggregate availability per station")
+def aggregate_status(
+    response: Response,
+    time_from: datetime = Query(..., description="Start of the range (inclusive)"),
+    time_to: datetime = Query(..., description="End of the range (exclusive)"),
+    station_id: Optional[List[int]] = Query(None, description="Only these station IDs (repeatable)"),
+    bucket: Optional[Literal["hour", "day"]] = Query(None, description="Also group by hour or day"),
+    approx: bool = Query(False, description=APPROX_DESCRIPTION),
+    sample_percent: Optional[float] = Query(None, gt=0, le=100, description=SAMPLE_PERCENT_DESCRIPTION),
+    max_error: Optional[float] = Query(None, gt=0, lt=1, description=MAX_ERROR_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
     """
-    query = db.query(StatusModel)
+    Sample count and average / min / max bikes and docks available per station.
     
-    if station_id is not None:
-        query = query.filter(StatusModel.station_id == station_id)
+    - **time_from** / **time_to**: Half-open `time` range
+    - **station_id**: Restrict to one or more stations (optional, repeatable)
+    - **bucket**: Group by `hour` or `day` as well (optional)
+    - **approx** / **sample_percent** / **max_error**: Estimate from a table sample (optional)
     
-    status_records = query.offset(skip).limit(limit).all()
-    return status_records
+    Served from the status snapshot when the range lies inside its coverage
+    window (`X-Data-Source: snapshot`). Otherwise long ranges are split
+    into sub-ranges aggregated in parallel in Postgres and merged.
+
+    With status sharded, every shard (or only those owning `station_id`)
+    aggregates its stations in parallel.
+
+    With `approx=true`, ranges the snapshot does not cover are estimated
+    from a block sample of the table (`X-Data-Source: sample`,
+    `X-Sample-Percent`): sample count and averages come with 95% confidence
+    intervals, min and max are those of the sample. When the intervals are
+    wider than `max_error` even at the largest sample, the exact path runs
+    instead.
+    """
+    if time_to <= time_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="time_to must be after time_from"
+        )
+
+    snapshot = snapshots.get()
+    if snapshot is not None and snapshot.covers(time_from, time_to):
+        response.headers["X-Data-Source"] = "snapshot"
+        station_ids = sorted(set(station_id)) if station_id else snapshot.station_ids()
+        return snapshot.aggregate(station_ids, time_from, time_to, bucket)
+
+    if approx:
+        # Stations live on a single shard: per-shard groups never overlap
+        shard_estimates = shard_map.scatter(db, lambda session, _: estimate_groups(
+            session,
+            StatusModel,
+            lambda table: [table.c.station_id.label("station_id")] + (
+                [func.date_trunc(bucket, table.c.time).label("bucket")] if bucket is not None else []
+            ),
+            ["bikes_available", "docks_available"],
+            lambda table: [table.c.time >= time_from, table.c.time < time_to] + (
+                [table.c.station_id.in_(station_id)] if station_id else []
+            ),
+            max_error or settings.approx_max_error,
+            sample_percent,
+        ), station_id)
+        if all(estimated is not None for estimated in shard_estimates):
+            estimates = {}
+            for shard_groups, _, _ in shard_estimates:
+                estimates.update(shard_groups)
+            set_sample_headers(response, max(percent for _, percent, _ in shard_estimates))
+            return [
+                {
+                    "station_id": key[0],
+                    "bucket": key[1] if bucket is not None else None,
+                    "samples": round(estimate.rows.value),
+                    "avg_bikes_available": estimate.means["bikes_available"].value,
+                    "min_bikes_available": estimate.minimums["bikes_available"],
+                    "max_bikes_available": estimate.maximums["bikes_available"],
+                    "avg_docks_available": estimate.means["docks_available"].value,
+                    "min_docks_available": estimate.minimums["docks_available"],
+                    "max_docks_available": estimate.maximums["docks_available"],
+                    "approximate": True,
+                    "samples_ci95": estimate.rows.interval,
+                    "avg_bikes_available_ci95": estimate.means["bikes_available"].interval,
+                    "avg_docks_available_ci95": estimate.means["docks_available"].interval,
+                }
+                for key, estimate in sorted(estimates.items())
+            ]
+
+    def partial(session: Session, sub_start: datetime, sub_end: datetime):
+        group = [StatusModel.station_id]
+        if bucket is not None:
+            group.append(func.date_trunc(bucket, StatusModel.time).label("bucket"))
+        query = session.query(
+            *group,
+            func.count().label("samples"),
+            func.sum(StatusModel.bikes_available),
+            func.min(StatusModel.bikes_available),
+            func.max(StatusModel.bikes_available),
+            func.sum(StatusModel.docks_available),
+            func.min(StatusModel.docks_available),
+            func.max(StatusModel.docks_available),
+        ).filter(StatusModel.time >= sub_start, StatusModel.time < sub_end)
+        if station_id:
+            query = query.filter(StatusModel.station_id.in_(station_id))
+        partials = {}
+        for row in query.group_by(*group).all():
+            key = (row.station_id, row.bucket if bucket is not None else None)
+            bikes, docks = PartialAggregate(), PartialAggregate()
+            bikes.add(row.samples, *row[-6:-3])
+            docks.add(row.samples, *row[-3:])
+            partials[key] = {"bikes": bikes, "docks": docks}
+        return partials
+
+    shard_partials = shard_map.scatter(
+        db,
+        lambda session, _: run_partitioned(session, "aggregate_status", time_from, time_to, partial),
+        station_id,
+    )
+    merged = merge_partials(chain.from_iterable(shard_partials))
+    response.headers["X-Data-Source"] = "database"
+    return [
+        {
+            "station_id": key[0],
+            "bucket": key[1],
+            "samples": measures["bikes"].count,
+            "avg_bikes_available": measures["bikes"].average,
+            "min_bikes_available": measures["bikes"].minimum,
+            "max_bikes_available": measures["bikes"].maximum,
+            "avg_docks_available": measures["docks"].average,
+            "min_docks_available": measures["docks"].minimum,
+            "max_docks_available": measures["docks"].maximum,
+        }
+        for key, measures in sorted(merged.items())
+    ]
+
+
+@router.get("/at", response_model=List[StatusAt], summary="Status of every station at points in time")
+def get_status_at(
+    response: Response,
+    time: List[datetime] = Query(..., description="Point in time (repeatable for a batch)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Latest status sample at or before each requested time, for every station.
+    
+    - **time**: Point in time; repeat the parameter for a batch (max 96)
+    
+    Stations without any sample before a time are omitted for it. Times
+    inside the status snapshot's coverage window are answered from it;
+    the others by one index seek per station in Postgres. Times with an
+    offset are answered (and echoed in `at`) in UTC, as stored.
+    """
+    times = sorted({to_naive(at) for at in time})
+    if len(times) > MAX_POINTS_IN_TIME:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_POINTS_IN_TIME} points in time per request"
+        )
+
+    results = []
+    snapshot = snapshots.get()
+    if snapshot is not None:
+        covered = [at for at in times if at < snapshot.coverage_end]
+        for at in covered:
+            results.extend(snapshot.latest_at(at))
+        times = [at for at in times if at not in covered]
+    response.headers["X-Data-Source"] = "snapshot" if not times else "database"
+    if times and shard_map.enabled:
+        groups = shard_map.group(db.scalars(select(StationModel.id)))
+        for rows in shard_map.scatter(
+            db,
+            lambda session, index: session.execute(
+                STATUS_AT_SHARD_QUERY, {"times": times, "station_ids": groups[index]}
+            ).all(),
+            chain.from_iterable(groups.values()),
+        ):
+            results.extend(row._asdict() for row in rows)
+    elif times:
+        results.extend(row._asdict() for row in db.execute(STATUS_AT_QUERY, {"times": times}))
+    if times:
+        results.sort(key=lambda row: (row["at"], row["station_id"]))
+    return results
+
+
+@router.get("/stream", summary="Stream new status records (Server-Sent Events)")
+async def stream_status(
+    station_id: Optional[List[int]] = Query(None, description="Only stream these station IDs (repeatable)"),
+):
+    """
+    Push every new status record to the client as Server-Sent Events.
+    
+    - **station_id**: Restrict the stream to one or more stations (optional, repeatable)
+    
+    Each record is sent as a `status` event. Clients that fall behind have
+    their oldest pending records dropped and receive a `lagged` event with
+    the number of records they missed. A comment line is sent as keep-alive
+    when no records arrive.
+    """
+    subscription = broadcaster.subscribe(set(station_id) if station_id else None)
+
+    async def events():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    sample = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.sse_heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if subscription.dropped:
+                    yield f"event: lagged\ndata: {json.dumps({'dropped': subscription.dropped})}\n\n"
+                    subscription.dropped = 0
+                yield f"event: status\ndata: {json.dumps(sample)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _station_db(station_id: int, db: Session = Depends(get_db)) -> Iterator[Session]:
+    """
+    `get_db` for the single-sample routes: a session on the shard owning
+    `station_id` when status is sharded.
+    """
+    with shard_map.station_session(db, station_id) as session:
+        yield session
 
 
 @router.get("/{station_id}/{timestamp}", response_model=Status, summary="Get status by station and time")
-def get_status(station_id: int, timestamp: datetime, db: Session = Depends(get_db)):
+def get_status(
+    station_id: int,
+    timestamp: datetime,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(_station_db)
+):
     """
     Retrieve a specific status record by station ID and timestamp.
     
     - **station_id**: The station identifier
     - **timestamp**: The timestamp of the status record
+    - **fields**: Comma-separated columns to return (optional)
     """
-    status_record = db.query(StatusModel).filter(
+    columns = parse_fields(StatusModel, fields)
+    query = db.query(StatusModel).filter(
         StatusModel.station_id == station_id,
         StatusModel.time == timestamp
-    ).first()
+    )
+    status_record = query.with_entities(*columns).first() if columns else query.first()
     
     if status_record is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Status record for station {station_id} at {timestamp} not found"
         )
+    if columns is not None:
+        return sparse_response(status_record, columns, Status)
     return status_record
 
 
-@router.post("/", response_model=Status, status_code=status.HTTP_201_CREATED, summary="Create a new status record")
-def create_status(status_data: StatusCreate, db: Session = Depends(get_db)):
+async def _create_status_db(request: Request, response: Response) -> AsyncGenerator[Optional[Session], None]:
+    """
+    `get_db` for `create_status`, skipped in write-behind mode: buffered
+    samples never touch the database during the request, so they take
+    neither a connection nor an admission slot.
+    """
+    if settings.status_write_behind:
+        yield None
+        return
+    sessions = get_db(request, response)
+    db = await sessions.__anext__()
+    try:
+        yield db
+    finally:
+        await sessions.aclose()
+
+
+@router.post(
+    "/",
+    response_model=Status,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create a new status record",
+    responses={202: {"model": Status, "description": "Sample accepted by the write-behind buffer"}},
+)
+def create_status(status_data: StatusCreate, db: Session = Depends(_create_status_db)):
     """
     Create a new station status record.
     
@@ -69,31 +514,75 @@ def create_status(status_data: StatusCreate, db: Session = Depends(get_db)):
     - **time**: Timestamp of the status record
     - **category1**: Category 1 classification (optional)
     - **category2**: Category 2 classification (optional)
+
+    With `STATUS_WRITE_BEHIND=true` the sample is buffered and written in
+    batches, and the answer is `202`: after its batch committed
+    (`STATUS_WRITE_DURABILITY=flush`) or as soon as it is buffered
+    (`enqueue`). A full buffer answers `503` with `Retry-After`.
     """
-    # Check if status record already exists
-    db_status = db.query(StatusModel).filter(
-        StatusModel.station_id == status_data.station_id,
-        StatusModel.time == status_data.time
-    ).first()
+    if settings.status_write_behind:
+        return _buffer_status(status_data)
+
+    with shard_map.station_session(db, status_data.station_id) as session:
+        # Check if status record already exists
+        db_status = session.query(StatusModel).filter(
+            StatusModel.station_id == status_data.station_id,
+            StatusModel.time == status_data.time
+        ).first()
     
-    if db_status:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Status record for station {status_data.station_id} at {status_data.time} already exists"
-        )
+        if db_status:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Status record for station {status_data.station_id} at {status_data.time} already exists"
+            )
     
-    db_status = StatusModel(**status_data.model_dump())
-    db.add(db_status)
+        db_status = StatusModel(**status_data.model_dump())
+        session.add(db_status)
+        try:
+            session.commit()
+            session.refresh(db_status)
+        except Exception as e:
+            session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error creating status record: {str(e)}"
+            )
+        return db_status
+
+
+def _buffer_status(status_data: StatusCreate) -> JSONResponse:
+    """
+    Write-behind path of `create_status`.
+    """
     try:
-        db.commit()
-        db.refresh(db_status)
-    except Exception as e:
-        db.rollback()
+        sample = status_buffer.put(tuple(getattr(status_data, column) for column in BUFFER_COLUMNS))
+    except BufferFull as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error creating status record: {str(e)}"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Status write buffer is full: {str(e)}",
+            headers={"Retry-After": "1"},
         )
-    return db_status
+
+    if settings.status_write_durability == "flush":
+        if not sample.done.wait(settings.status_flush_wait_seconds):
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Status record not flushed in time; it may still be stored"
+            )
+        if sample.error is not None:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error creating status record: {sample.error}"
+            )
+        if not sample.inserted:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Status record for station {status_data.station_id} at {status_data.time} already exists"
+            )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=jsonable_encoder(Status.model_validate(status_data.model_dump())),
+    )
 
 
 @router.put("/{station_id}/{timestamp}", response_model=Status, summary="Update a status record")
@@ -101,7 +590,7 @@ def update_status(
     station_id: int,
     timestamp: datetime,
     status_data: StatusUpdate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(_station_db)
 ):
     """
     Update an existing status record.
@@ -139,7 +628,7 @@ def update_status(
 
 
 @router.delete("/{station_id}/{timestamp}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete a status record")
-def delete_status(station_id: int, timestamp: datetime, db: Session = Depends(get_db)):
+def delete_status(station_id: int, timestamp: datetime, db: Session = Depends(_station_db)):
     """
     Delete a status record by station ID and timestamp.
     
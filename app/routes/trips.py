@@ -1,48 +1,418 @@
 """
 API routes for Trip endpoints.
 """
-from typing import List
+from typing import List, Literal, Optional
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from sqlalchemy import TIMESTAMP, cast, func, literal_column, select, text
 from sqlalchemy.orm import Session
 
+from app.core.approx import (
+    APPROX_DESCRIPTION,
+    MAX_ERROR_DESCRIPTION,
+    SAMPLE_PERCENT_DESCRIPTION,
+    estimate_groups,
+    sampled_table,
+    set_sample_headers,
+)
+from app.core.config import settings
+from app.core.counting import set_total_count_headers
 from app.core.database import get_db
+from app.core.fields import FIELDS_DESCRIPTION, parse_fields, sparse_response
+from app.core.daily_demand import refresh_daily_demand
+from app.core.parallel import LogSketch, PartialAggregate, merge_partials, run_partitioned, sketch_key
 from app.models.models import Trip as TripModel
-from app.schemas.trip import Trip, TripCreate, TripUpdate
+from app.schemas.trip import Trip, TripActiveCount, TripAggregate, TripCreate, TripUpdate
 
 router = APIRouter(prefix="/trips", tags=["Trips"])
 
+MAX_ACTIVE_BUCKETS = 1000
+
+# [start_date, end_date) of a trip; must match idx_trip_active_span
+# (sql/012-trip-active-index.sql) exactly for the GiST index to be used.
+# The bound type is inlined so prepared statements keep matching it.
+TRIP_SPAN = func.tsrange(
+    TripModel.start_date,
+    func.greatest(TripModel.start_date, TripModel.end_date),
+    literal_column("'[)'"),
+)
+
+ACTIVE_COUNT_QUERY = text("""
+    SELECT b.bucket,
+           LEAST(b.bucket + CAST(:step AS interval), CAST(:end AS timestamp)) AS bucket_end,
+           (
+               SELECT COUNT(*)
+               FROM public.trip
+               WHERE tsrange(start_date, GREATEST(start_date, end_date), '[)')
+                     && tsrange(b.bucket, LEAST(b.bucket + CAST(:step AS interval), CAST(:end AS timestamp)), '[)')
+           ) AS trips
+    FROM generate_series(
+        CAST(:start AS timestamp),
+        CAST(:end AS timestamp) - interval '1 microsecond',
+        CAST(:step AS interval)
+    ) AS b(bucket)
+    ORDER BY b.bucket
+""")
+
 
 @router.get("/", response_model=List[Trip], summary="Get all trips")
 def get_trips(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    start_station_id: Optional[int] = Query(None, description="Filter by starting station ID"),
+    end_station_id: Optional[int] = Query(None, description="Filter by ending station ID"),
+    start_date_from: Optional[datetime] = Query(None, description="Only trips starting at or after this timestamp"),
+    start_date_to: Optional[datetime] = Query(None, description="Only trips starting before this timestamp"),
+    bike_id: Optional[int] = Query(None, description="Filter by bike ID"),
+    subscription_type: Optional[str] = Query(None, max_length=50, description="Filter by subscription type"),
+    min_duration: Optional[int] = Query(None, ge=0, description="Minimum trip duration in seconds"),
+    max_duration: Optional[int] = Query(None, ge=0, description="Maximum trip duration in seconds"),
+    with_total: bool = Query(False, description="Return the total in the X-Total-Count header"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
-    Retrieve all bike trips with pagination.
+    Retrieve bike trips with pagination and optional filtering.
     
     - **skip**: Number of records to skip (for pagination)
     - **limit**: Maximum number of records to return (max 1000)
+    - **start_station_id** / **end_station_id**: Filter by station (optional)
+    - **start_date_from** / **start_date_to**: Half-open `start_date` range (optional)
+    - **bike_id**: Filter by bike (optional)
+    - **subscription_type**: Filter by subscription type, e.g. `Subscriber` (optional)
+    - **min_duration** / **max_duration**: Duration bounds in seconds (optional)
+    - **with_total**: Add `X-Total-Count` / `X-Total-Count-Exact` headers
+    - **fields**: Comma-separated columns to return (optional)
+
+    When any filter is given, results are ordered by `start_date` so that
+    the composite indexes in `sql/006-indexes.sql` can serve the scan.
     """
-    trips = db.query(TripModel).offset(skip).limit(limit).all()
+    columns = parse_fields(TripModel, fields)
+    query = db.query(TripModel)
+    filtered = False
+
+    if start_station_id is not None:
+        query = query.filter(TripModel.start_station_id == start_station_id)
+        filtered = True
+    if end_station_id is not None:
+        query = query.filter(TripModel.end_station_id == end_station_id)
+        filtered = True
+    if start_date_from is not None:
+        query = query.filter(TripModel.start_date >= start_date_from)
+        filtered = True
+    if start_date_to is not None:
+        query = query.filter(TripModel.start_date < start_date_to)
+        filtered = True
+    if bike_id is not None:
+        query = query.filter(TripModel.bike_id == bike_id)
+        filtered = True
+    if subscription_type is not None:
+        query = query.filter(TripModel.subscription_type == subscription_type)
+        filtered = True
+    if min_duration is not None:
+        query = query.filter(TripModel.duration >= min_duration)
+        filtered = True
+    if max_duration is not None:
+        query = query.filter(TripModel.duration <= max_duration)
+        filtered = True
+
+    if with_total:
+        set_total_count_headers(response, db, query, "trip", filtered)
+
+    if filtered:
+        query = query.order_by(TripModel.start_date, TripModel.id)
+
+    if columns is not None:
+        rows = query.with_entities(*columns).offset(skip).limit(limit).all()
+        return sparse_response(rows, columns, Trip, response)
+
+    trips = query.offset(skip).limit(limit).all()
+    return trips
+
+
+@router.get("/active", response_model=List[Trip], summary="Get trips in progress at a time")
+def get_active_trips(
+    response: Response,
+    at: datetime = Query(..., description="Point in time"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    with_total: bool = Query(False, description="Return the total in the X-Total-Count header"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve the trips on the road at a given time (`start_date <= at < end_date`).
+    
+    - **at**: Point in time
+    - **skip**: Number of records to skip (for pagination)
+    - **limit**: Maximum number of records to return (max 1000)
+    - **with_total**: Add `X-Total-Count` / `X-Total-Count-Exact` headers
+    - **fields**: Comma-separated columns to return (optional)
+
+    Served by the GiST index on the trip's `[start_date, end_date)` span.
+    """
+    columns = parse_fields(TripModel, fields)
+    query = db.query(TripModel).filter(TRIP_SPAN.op("@>")(cast(at, TIMESTAMP)))
+
+    if with_total:
+        set_total_count_headers(response, db, query, "trip", filtered=True)
+
+    query = query.order_by(TripModel.start_date, TripModel.id)
+    if columns is not None:
+        rows = query.with_entities(*columns).offset(skip).limit(limit).all()
+        return sparse_response(rows, columns, Trip, response)
+
+    trips = query.offset(skip).limit(limit).all()
+    return trips
+
+
+@router.get("/active/count", response_model=List[TripActiveCount], summary="Count trips in progress per bucket")
+def count_active_trips(
+    start: datetime = Query(..., description="Start of the window (inclusive)"),
+    end: datetime = Query(..., description="End of the window (exclusive)"),
+    bucket: Optional[Literal["15min", "hour", "day"]] = Query(None, description="Split the window into buckets"),
+    db: Session = Depends(get_db)
+):
+    """
+    Count the trips overlapping a time window, optionally per bucket.
+    
+    - **start** / **end**: Half-open window
+    - **bucket**: `15min`, `hour` or `day` buckets (optional; one row for the whole window otherwise)
+
+    A trip counts in every bucket its `[start_date, end_date)` span
+    overlaps. Each bucket is one GiST index scan.
+    """
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start"
+        )
+    step_seconds = {"15min": 900, "hour": 3600, "day": 86400}.get(bucket)
+    window_seconds = (end - start).total_seconds()
+    if step_seconds is None:
+        step_seconds = window_seconds
+    if window_seconds / step_seconds > MAX_ACTIVE_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_ACTIVE_BUCKETS} buckets per request"
+        )
+
+    rows = db.execute(
+        ACTIVE_COUNT_QUERY,
+        {"start": start, "end": end, "step": f"{step_seconds} seconds"},
+    )
+    return [row._asdict() for row in rows]
+
+
+@router.get("/aggregate", response_model=List[TripAggregate], summary="Aggregate trip counts and durations")
+def aggregate_trips(
+    response: Response,
+    start_date_from: datetime = Query(..., description="Start of the `start_date` range (inclusive)"),
+    start_date_to: datetime = Query(..., description="End of the `start_date` range (exclusive)"),
+    group_by: Optional[Literal["start_station_id", "end_station_id", "subscription_type"]] = Query(None, description="Column to group by"),
+    start_station_id: Optional[int] = Query(None, description="Filter by starting station ID"),
+    subscription_type: Optional[str] = Query(None, max_length=50, description="Filter by subscription type"),
+    approx: bool = Query(False, description=APPROX_DESCRIPTION),
+    sample_percent: Optional[float] = Query(None, gt=0, le=100, description=SAMPLE_PERCENT_DESCRIPTION),
+    max_error: Optional[float] = Query(None, gt=0, lt=1, description=MAX_ERROR_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    """
+    Trip count and duration statistics (sum, average, min, max, percentiles).
+    
+    - **start_date_from** / **start_date_to**: Half-open `start_date` range
+    - **group_by**: `start_station_id`, `end_station_id` or `subscription_type` (optional)
+    - **start_station_id**: Filter by starting station (optional)
+    - **subscription_type**: Filter by subscription type (optional)
+    - **approx** / **sample_percent** / **max_error**: Estimate from a table sample (optional)
+
+    Long ranges are split into sub-ranges aggregated in parallel and
+    merged; percentiles come from mergeable log-bucket sketches and are
+    accurate to within 1%.
+
+    With `approx=true` the statistics are estimated from a block sample of
+    the table (`X-Data-Source: sample`, `X-Sample-Percent`) and count, total
+    and average come with 95% confidence intervals. Min, max and
+    percentiles are those of the sample. When the intervals are wider than
+    `max_error` even at the largest sample, the exact path runs instead.
+    """
+    if start_date_to <= start_date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date_to must be after start_date_from"
+        )
+
+    def filters(table):
+        clauses = [table.c.start_date >= start_date_from, table.c.start_date < start_date_to]
+        if start_station_id is not None:
+            clauses.append(table.c.start_station_id == start_station_id)
+        if subscription_type is not None:
+            clauses.append(table.c.subscription_type == subscription_type)
+        return clauses
+
+    if approx:
+        estimated = estimate_groups(
+            db,
+            TripModel,
+            lambda table: [table.c[group_by].label("group")] if group_by else [],
+            ["duration"],
+            filters,
+            max_error or settings.approx_max_error,
+            sample_percent,
+        )
+        if estimated is not None:
+            estimates, percent, seed = estimated
+            set_sample_headers(response, percent)
+            return _approximate_trip_aggregates(db, estimates, percent, seed, group_by, filters)
+
+    def partial(session: Session, sub_start: datetime, sub_end: datetime):
+        group = [getattr(TripModel, group_by).label("group")] if group_by else []
+        bucket = sketch_key(TripModel.duration).label("bucket")
+        query = session.query(
+            *group,
+            bucket,
+            func.count().label("trips"),
+            func.sum(TripModel.duration),
+            func.min(TripModel.duration),
+            func.max(TripModel.duration),
+        ).filter(TripModel.start_date >= sub_start, TripModel.start_date < sub_end)
+        if start_station_id is not None:
+            query = query.filter(TripModel.start_station_id == start_station_id)
+        if subscription_type is not None:
+            query = query.filter(TripModel.subscription_type == subscription_type)
+        partials = {}
+        for row in query.group_by(*group, bucket).all():
+            key = row.group if group_by else None
+            duration = partials.setdefault(key, {"duration": PartialAggregate(sketch=LogSketch())})["duration"]
+            duration.add(row.trips, *row[-3:])
+            duration.sketch.add(row.bucket, row.trips)
+        return partials
+
+    merged = merge_partials(
+        run_partitioned(db, "aggregate_trips", start_date_from, start_date_to, partial)
+    )
+    results = []
+    for key, measures in sorted(merged.items(), key=lambda item: (item[0] is None, item[0] if item[0] is not None else 0)):
+        duration = measures["duration"]
+        results.append({
+            "group": key,
+            "trips": duration.count,
+            "total_duration": duration.total,
+            "avg_duration": duration.average,
+            "min_duration": duration.minimum,
+            "max_duration": duration.maximum,
+            "p50_duration": duration.sketch.quantile(0.5),
+            "p90_duration": duration.sketch.quantile(0.9),
+            "p99_duration": duration.sketch.quantile(0.99),
+        })
+    return results
+
+
+def _approximate_trip_aggregates(db: Session, estimates, percent: float, seed: int, group_by, filters):
+    """
+    Trip aggregates from sample estimates; percentiles are read from a
+    sketch of the same (repeatable) sample.
+    """
+    sampled = sampled_table(TripModel, percent, seed)
+    group = [sampled.c[group_by].label("group")] if group_by else []
+    bucket = sketch_key(sampled.c.duration).label("bucket")
+    sketches = {}
+    rows = db.execute(
+        select(*group, bucket, func.count()).where(*filters(sampled)).group_by(*group, bucket)
+    ).all()
+    for row in rows:
+        sketches.setdefault(tuple(row[:-2]), LogSketch()).add(row[-2], row[-1])
+
+    results = []
+    for key, estimate in sorted(estimates.items(), key=lambda item: [(v is None, v if v is not None else 0) for v in item[0]]):
+        sketch = sketches.get(key, LogSketch())
+        results.append({
+            "group": key[0] if key else None,
+            "trips": round(estimate.rows.value),
+            "total_duration": round(estimate.sums["duration"].value),
+            "avg_duration": estimate.means["duration"].value,
+            "min_duration": estimate.minimums["duration"],
+            "max_duration": estimate.maximums["duration"],
+            "p50_duration": sketch.quantile(0.5),
+            "p90_duration": sketch.quantile(0.9),
+            "p99_duration": sketch.quantile(0.99),
+            "approximate": True,
+            "trips_ci95": estimate.rows.interval,
+            "total_duration_ci95": estimate.sums["duration"].interval,
+            "avg_duration_ci95": estimate.means["duration"].interval,
+        })
+    return results
+
+
+@router.get("/bikes/{bike_id}/timeline", response_model=List[Trip], summary="Get trip timeline of a bike")
+def get_bike_timeline(
+    bike_id: int,
+    response: Response,
+    start: Optional[datetime] = Query(None, description="Only trips starting at or after this timestamp"),
+    end: Optional[datetime] = Query(None, description="Only trips starting before this timestamp"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    with_total: bool = Query(False, description="Return the total in the X-Total-Count header"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve the trips of a single bike in chronological order.
+    
+    - **bike_id**: The bike identifier
+    - **start** / **end**: Half-open `start_date` range (optional)
+    - **skip**: Number of records to skip (for pagination)
+    - **limit**: Maximum number of records to return (max 1000)
+    - **with_total**: Add `X-Total-Count` / `X-Total-Count-Exact` headers
+    - **fields**: Comma-separated columns to return (optional)
+
+    Served by the covering `idx_trip_bike_start_date` index as an
+    index-only scan.
+    """
+    columns = parse_fields(TripModel, fields)
+    query = db.query(TripModel).filter(TripModel.bike_id == bike_id)
+
+    if start is not None:
+        query = query.filter(TripModel.start_date >= start)
+    if end is not None:
+        query = query.filter(TripModel.start_date < end)
+
+    if with_total:
+        set_total_count_headers(response, db, query, "trip", filtered=True)
+
+    query = query.order_by(TripModel.start_date, TripModel.id)
+    if columns is not None:
+        rows = query.with_entities(*columns).offset(skip).limit(limit).all()
+        return sparse_response(rows, columns, Trip, response)
+
+    trips = query.offset(skip).limit(limit).all()
     return trips
 
 
 @router.get("/{trip_id}", response_model=Trip, summary="Get trip by ID")
-def get_trip(trip_id: int, db: Session = Depends(get_db)):
+def get_trip(
+    trip_id: int,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
     """
     Retrieve a specific trip by its ID.
     
     - **trip_id**: The unique identifier of the trip
+    - **fields**: Comma-separated columns to return (optional)
     """
-    trip = db.query(TripModel).filter(TripModel.id == trip_id).first()
+    columns = parse_fields(TripModel, fields)
+    query = db.query(TripModel).filter(TripModel.id == trip_id)
+    trip = query.with_entities(*columns).first() if columns else query.first()
     if trip is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Trip with id {trip_id} not found"
         )
+    if columns is not None:
+        return sparse_response(trip, columns, Trip)
     return trip
 
 
@@ -72,6 +442,7 @@ def create_trip(trip: TripCreate, db: Session = Depends(get_db)):
     db_trip = TripModel(**trip.model_dump())
     db.add(db_trip)
     try:
+        refresh_daily_demand(db, [db_trip.start_date.date()], [db_trip.start_station_id])
         db.commit()
         db.refresh(db_trip)
     except Exception as e:
@@ -100,10 +471,15 @@ def update_trip(trip_id: int, trip: TripUpdate, db: Session = Depends(get_db)):
     
     # Update only provided fields
     update_data = trip.model_dump(exclude_unset=True)
+    stale_days = [db_trip.start_date.date()]
+    stale_stations = [db_trip.start_station_id]
     for field, value in update_data.items():
         setattr(db_trip, field, value)
+    stale_days.append(db_trip.start_date.date())
+    stale_stations.append(db_trip.start_station_id)
     
     try:
+        refresh_daily_demand(db, stale_days, stale_stations)
         db.commit()
         db.refresh(db_trip)
     except Exception as e:
@@ -131,6 +507,7 @@ def delete_trip(trip_id: int, db: Session = Depends(get_db)):
     
     try:
         db.delete(db_trip)
+        refresh_daily_demand(db, [db_trip.start_date.date()], [db_trip.start_station_id])
         db.commit()
     except Exception as e:
         db.rollback()
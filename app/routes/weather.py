@@ -1,24 +1,31 @@
 """
 API routes for Weather endpoints.
 """
-from typing import List
+from typing import List, Literal, Optional
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
 
+from app.core.counting import set_total_count_headers
 from app.core.database import get_db
+from app.core.fields import FIELDS_DESCRIPTION, parse_fields, sparse_response
+from app.core.daily_demand import refresh_daily_demand, zip_code_stations
+from app.core.weather_cube import weather_cube
 from app.models.models import Weather as WeatherModel
-from app.schemas.weather import Weather, WeatherCreate, WeatherUpdate
+from app.schemas.weather import Weather, WeatherCreate, WeatherSummary, WeatherUpdate
 
 router = APIRouter(prefix="/weather", tags=["Weather"])
 
 
 @router.get("/", response_model=List[Weather], summary="Get all weather records")
 def get_weather_records(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     zip_code: str = Query(None, description="Filter by ZIP code"),
+    with_total: bool = Query(False, description="Return the total in the X-Total-Count header"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
@@ -27,34 +34,76 @@ def get_weather_records(
     - **skip**: Number of records to skip (for pagination)
     - **limit**: Maximum number of records to return (max 1000)
     - **zip_code**: Filter by specific ZIP code (optional)
+    - **with_total**: Add `X-Total-Count` / `X-Total-Count-Exact` headers
+    - **fields**: Comma-separated columns to return (optional)
     """
+    columns = parse_fields(WeatherModel, fields)
     query = db.query(WeatherModel)
     
     if zip_code is not None:
         query = query.filter(WeatherModel.zip_code == zip_code)
     
+    if with_total:
+        set_total_count_headers(response, db, query, "weather", filtered=zip_code is not None)
+    
+    if columns is not None:
+        rows = query.with_entities(*columns).offset(skip).limit(limit).all()
+        return sparse_response(rows, columns, Weather, response)
+    
     weather_records = query.offset(skip).limit(limit).all()
     return weather_records
 
 
+@router.get("/summary", response_model=List[WeatherSummary], summary="Weather aggregated by period")
+def get_weather_summary(
+    granularity: Literal["day", "week", "month", "year"] = Query("month", description="Period size"),
+    group_by: Literal["zip_code", "events"] = Query("zip_code", description="Split each period by ZIP code or by events"),
+    zip_code: Optional[str] = Query(None, description="Filter by ZIP code"),
+    start: Optional[date] = Query(None, description="First period to include (date inside it)"),
+    end: Optional[date] = Query(None, description="Last period to include (its first day)"),
+):
+    """
+    Climate summary per period: days, rainy days, total precipitation,
+    mean / max / min temperature, mean humidity and wind speed.
+    
+    - **granularity**: `day`, `week` (starting Monday), `month` or `year`
+    - **group_by**: One row per period and `zip_code` (default) or per period and `events`
+    - **zip_code**: Filter by ZIP code (optional)
+    - **start** / **end**: Inclusive range of periods (optional)
+
+    Served from the in-memory weather cube, rebuilt after weather records change.
+    """
+    return weather_cube.get().summary(granularity, group_by, zip_code, start, end)
+
+
 @router.get("/{weather_date}/{zip_code}", response_model=Weather, summary="Get weather by date and ZIP code")
-def get_weather(weather_date: date, zip_code: str, db: Session = Depends(get_db)):
+def get_weather(
+    weather_date: date,
+    zip_code: str,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
     """
     Retrieve a specific weather record by date and ZIP code.
     
     - **weather_date**: The date of the weather record (format: YYYY-MM-DD)
     - **zip_code**: The ZIP code
+    - **fields**: Comma-separated columns to return (optional)
     """
-    weather = db.query(WeatherModel).filter(
+    columns = parse_fields(WeatherModel, fields)
+    query = db.query(WeatherModel).filter(
         WeatherModel.date == weather_date,
         WeatherModel.zip_code == zip_code
-    ).first()
+    )
+    weather = query.with_entities(*columns).first() if columns else query.first()
     
     if weather is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Weather record for date {weather_date} and ZIP code {zip_code} not found"
         )
+    if columns is not None:
+        return sparse_response(weather, columns, Weather)
     return weather
 
 
@@ -82,7 +131,11 @@ def create_weather(weather: WeatherCreate, db: Session = Depends(get_db)):
     db_weather = WeatherModel(**weather.model_dump())
     db.add(db_weather)
     try:
+        refresh_daily_demand(
+            db, [db_weather.date], zip_code_stations(db, db_weather.zip_code)
+        )
         db.commit()
+        weather_cube.invalidate()
         db.refresh(db_weather)
     except Exception as e:
         db.rollback()
@@ -124,7 +177,11 @@ def update_weather(
         setattr(db_weather, field, value)
     
     try:
+        refresh_daily_demand(
+            db, [db_weather.date], zip_code_stations(db, db_weather.zip_code)
+        )
         db.commit()
+        weather_cube.invalidate()
         db.refresh(db_weather)
     except Exception as e:
         db.rollback()
@@ -156,7 +213,11 @@ def delete_weather(weather_date: date, zip_code: str, db: Session = Depends(get_
     
     try:
         db.delete(db_weather)
+        refresh_daily_demand(
+            db, [db_weather.date], zip_code_stations(db, db_weather.zip_code)
+        )
         db.commit()
+        weather_cube.invalidate()
     except Exception as e:
         db.rollback()
         raise HTTPException(
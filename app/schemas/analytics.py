@@ -0,0 +1,30 @@
+"""
+Pydantic schemas for analytics responses.
+"""
+from datetime import date as date_type
+from typing import Optional
+from decimal import Decimal
+
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class DailyDemand(BaseModel):
+    """Schema for a daily demand x weather row"""
+    date: date_type = Field(..., description="Day of the trips", examples=["2013-08-29"])
+    station_id: int = Field(..., description="Starting station identifier", examples=[70])
+    zip_code: Optional[str] = Field(None, description="Weather ZIP code of the station", examples=["94107"])
+    trips_started: int = Field(..., description="Trips started at the station on that day", examples=[42])
+    subscriber_trips: int = Field(..., description="Trips by subscribers", examples=[38])
+    customer_trips: int = Field(..., description="Trips by customers", examples=[4])
+    mean_duration: Optional[Decimal] = Field(None, description="Mean trip duration in seconds", examples=[612.5])
+    max_temperature_f: Optional[Decimal] = Field(None, description="Maximum temperature in Fahrenheit")
+    mean_temperature_f: Optional[Decimal] = Field(None, description="Mean temperature in Fahrenheit")
+    min_temperature_f: Optional[Decimal] = Field(None, description="Minimum temperature in Fahrenheit")
+    mean_humidity: Optional[Decimal] = Field(None, description="Mean humidity percentage")
+    mean_visibility_miles: Optional[Decimal] = Field(None, description="Mean visibility in miles")
+    mean_wind_speed_mph: Optional[Decimal] = Field(None, description="Mean wind speed in mph")
+    precipitation_inches: Optional[Decimal] = Field(None, description="Precipitation in inches")
+    cloud_cover: Optional[Decimal] = Field(None, description="Cloud cover percentage")
+    events: Optional[str] = Field(None, description="Weather events", examples=["Rain"])
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,24 @@
+"""
+Pydantic schemas for the change feed.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class Change(BaseModel):
+    """Schema for one inserted, updated or deleted record"""
+    token: str = Field(..., description="Position of this change in the feed", examples=["48213-1532"])
+    table: Literal["station", "trip", "status", "weather"] = Field(..., description="Table of the record", examples=["status"])
+    op: Literal["insert", "update", "delete"] = Field(..., description="Kind of change", examples=["insert"])
+    key: Dict[str, Any] = Field(..., description="Primary key of the record", examples=[{"station_id": 70, "time": "2014-03-01T08:14:02"}])
+    data: Optional[Dict[str, Any]] = Field(None, description="Record after the change (null for deletes)", examples=[{"station_id": 70, "bikes_available": 10, "docks_available": 13, "time": "2014-03-01T08:14:02", "category1": None, "category2": None}])
+    changed_at: datetime = Field(..., description="Start of the transaction that made the change", examples=["2014-03-01T08:14:05.120000Z"])
+
+
+class ChangeFeed(BaseModel):
+    """Schema for a page of the change feed"""
+    changes: List[Change] = Field(..., description="Changes after `since`, in commit-safe order")
+    next: str = Field(..., description="Token to pass as `since` on the next call", examples=["48213-1532"])
+    has_more: bool = Field(..., description="Whether more changes are already available", examples=[False])
@@ -0,0 +1,42 @@
+"""
+Pydantic schemas for bulk export jobs.
+"""
+from datetime import datetime
+from typing import Any, Dict, Literal, Optional
+
+from pydantic import BaseModel, Field, ConfigDict, computed_field
+
+
+class ExportCreate(BaseModel):
+    """Schema for requesting a new export"""
+    table: Literal["station", "trip", "status", "weather"] = Field(..., description="Table to export", examples=["status"])
+    format: Literal["csv", "ndjson", "parquet"] = Field("csv", description="Output format", examples=["csv"])
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Equality filters by column", examples=[{"station_id": 70}])
+    start: Optional[datetime] = Field(None, description="Start of the time range (inclusive)", examples=["2014-01-01T00:00:00"])
+    end: Optional[datetime] = Field(None, description="End of the time range (exclusive)", examples=["2015-01-01T00:00:00"])
+
+
+class ExportJob(BaseModel):
+    """Schema for export job response"""
+    id: str
+    table_name: str
+    format: str
+    status: str = Field(..., description="pending, running, done or failed")
+    rows_written: int
+    rows_estimate: Optional[int] = None
+    file_size: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def progress(self) -> Optional[float]:
+        """Fraction of the estimated rows already written"""
+        if self.status == "done":
+            return 1.0
+        if not self.rows_estimate:
+            return None
+        return min(self.rows_written / self.rows_estimate, 0.99)
+
+    model_config = ConfigDict(from_attributes=True)
@@ -2,8 +2,8 @@
 Pydantic schemas for Station data validation and serialization.
 """
 
-from datetime import date as date_type
-from typing import Optional
+from datetime import date as date_type, datetime
+from typing import Literal, Optional
 from decimal import Decimal
 
 from pydantic import BaseModel, Field, ConfigDict
@@ -56,3 +56,49 @@ class Station(StationBase):
     id: int
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class StationOutage(BaseModel):
+    """Schema for a station outage interval"""
+
+    station_id: int = Field(..., description="Station identifier", examples=[70])
+    kind: Literal["empty", "full"] = Field(
+        ..., description="`empty`: no bikes available; `full`: no docks available", examples=["empty"]
+    )
+    started_at: datetime = Field(
+        ..., description="First sample of the outage", examples=["2013-09-03T17:42:00"]
+    )
+    ended_at: Optional[datetime] = Field(
+        None,
+        description="First sample back in service (null while ongoing)",
+        examples=["2013-09-03T18:15:00"],
+    )
+    last_seen: datetime = Field(
+        ..., description="Last sample of the outage", examples=["2013-09-03T18:14:00"]
+    )
+    samples: int = Field(..., description="Status samples in the outage", examples=[33])
+    duration_seconds: float = Field(
+        ...,
+        description="Time from `started_at` to `ended_at` (to `last_seen` while ongoing)",
+        examples=[1980.0],
+    )
+    ongoing: bool = Field(
+        ..., description="Whether the station's latest sample is still in the outage", examples=[False]
+    )
+
+
+class StationOutageRank(BaseModel):
+    """Schema for a station's outage time within a window"""
+
+    station_id: int = Field(..., description="Station identifier", examples=[70])
+    name: Optional[str] = Field(
+        None, description="Station name", examples=["San Francisco Caltrain (Townsend at 4th)"]
+    )
+    kind: Literal["empty", "full"] = Field(..., description="Kind of outage", examples=["empty"])
+    outages: int = Field(..., description="Outages overlapping the window", examples=[12])
+    total_seconds: float = Field(
+        ..., description="Outage time inside the window", examples=[18240.0]
+    )
+    longest_seconds: float = Field(
+        ..., description="Longest single outage inside the window", examples=[5400.0]
+    )
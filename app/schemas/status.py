@@ -2,10 +2,14 @@
 Pydantic schemas for Status data validation and serialization.
 """
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
 
 from pydantic import BaseModel, Field, ConfigDict
 
+# Range of the INTEGER columns of public.status
+PG_INTEGER_MIN = -(2 ** 31)
+PG_INTEGER_MAX = 2 ** 31 - 1
+
 
 class StatusBase(BaseModel):
     """Base schema for Status data"""
@@ -19,17 +23,47 @@ class StatusBase(BaseModel):
 
 class StatusCreate(StatusBase):
     """Schema for creating a new status record"""
-    pass
+    station_id: int = Field(..., ge=PG_INTEGER_MIN, le=PG_INTEGER_MAX, description="Station identifier", examples=[70])
+    bikes_available: int = Field(..., ge=PG_INTEGER_MIN, le=PG_INTEGER_MAX, description="Number of bikes available", examples=[10])
+    docks_available: int = Field(..., ge=PG_INTEGER_MIN, le=PG_INTEGER_MAX, description="Number of docks available", examples=[13])
+    category1: Optional[int] = Field(None, ge=PG_INTEGER_MIN, le=PG_INTEGER_MAX, description="Category 1 classification", examples=[1])
+    category2: Optional[int] = Field(None, ge=PG_INTEGER_MIN, le=PG_INTEGER_MAX, description="Category 2 classification", examples=[5432])
 
 
 class StatusUpdate(BaseModel):
     """Schema for updating an existing status record"""
-    bikes_available: Optional[int] = None
-    docks_available: Optional[int] = None
-    category1: Optional[int] = None
-    category2: Optional[int] = None
+    bikes_available: Optional[int] = Field(None, ge=PG_INTEGER_MIN, le=PG_INTEGER_MAX)
+    docks_available: Optional[int] = Field(None, ge=PG_INTEGER_MIN, le=PG_INTEGER_MAX)
+    category1: Optional[int] = Field(None, ge=PG_INTEGER_MIN, le=PG_INTEGER_MAX)
+    category2: Optional[int] = Field(None, ge=PG_INTEGER_MIN, le=PG_INTEGER_MAX)
 
 
 class Status(StatusBase):
     """Schema for status response"""
     model_config = ConfigDict(from_attributes=True)
+
+
+class StatusAggregate(BaseModel):
+    """Schema for per-station (and per-bucket) availability statistics"""
+    station_id: int = Field(..., description="Station identifier", examples=[70])
+    bucket: Optional[datetime] = Field(None, description="Start of the hour/day bucket (null when not bucketed)", examples=["2013-09-01T00:00:00"])
+    samples: int = Field(..., description="Number of status samples aggregated", examples=[1440])
+    avg_bikes_available: float = Field(..., description="Average bikes available", examples=[8.4])
+    min_bikes_available: int = Field(..., description="Minimum bikes available", examples=[0])
+    max_bikes_available: int = Field(..., description="Maximum bikes available", examples=[19])
+    avg_docks_available: float = Field(..., description="Average docks available", examples=[10.6])
+    min_docks_available: int = Field(..., description="Minimum docks available", examples=[0])
+    max_docks_available: int = Field(..., description="Maximum docks available", examples=[19])
+    approximate: bool = Field(False, description="Whether the statistics were estimated from a table sample (`approx=true`)", examples=[False])
+    samples_ci95: Optional[Tuple[float, float]] = Field(None, description="95% confidence interval of `samples` (approximate only)", examples=[[1402.3, 1477.7]])
+    avg_bikes_available_ci95: Optional[Tuple[float, float]] = Field(None, description="95% confidence interval of `avg_bikes_available` (approximate only)", examples=[[8.3, 8.5]])
+    avg_docks_available_ci95: Optional[Tuple[float, float]] = Field(None, description="95% confidence interval of `avg_docks_available` (approximate only)", examples=[[10.5, 10.7]])
+
+
+class StatusAt(BaseModel):
+    """Schema for the latest status of a station at or before a requested time"""
+    at: datetime = Field(..., description="Requested point in time", examples=["2014-03-01T08:15:00"])
+    station_id: int = Field(..., description="Station identifier", examples=[70])
+    time: datetime = Field(..., description="Timestamp of the sample in effect at `at`", examples=["2014-03-01T08:14:02"])
+    bikes_available: int = Field(..., description="Number of bikes available", examples=[10])
+    docks_available: int = Field(..., description="Number of docks available", examples=[13])
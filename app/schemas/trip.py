@@ -2,7 +2,7 @@
 Pydantic schemas for Trip data validation and serialization.
 """
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple, Union
 
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -41,3 +41,27 @@ class Trip(TripBase):
     id: int
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class TripAggregate(BaseModel):
+    """Schema for trip count and duration statistics of a group"""
+    group: Optional[Union[int, str]] = Field(None, description="Value of the `group_by` column (null when not grouped)", examples=[70])
+    trips: int = Field(..., description="Number of trips", examples=[1523])
+    total_duration: int = Field(..., description="Sum of trip durations in seconds", examples=[1380211])
+    avg_duration: float = Field(..., description="Average trip duration in seconds", examples=[906.2])
+    min_duration: int = Field(..., description="Shortest trip in seconds", examples=[60])
+    max_duration: int = Field(..., description="Longest trip in seconds", examples=[86310])
+    p50_duration: float = Field(..., description="Median trip duration in seconds (within 1%)", examples=[540.3])
+    p90_duration: float = Field(..., description="90th percentile of trip duration in seconds (within 1%)", examples=[1210.8])
+    p99_duration: float = Field(..., description="99th percentile of trip duration in seconds (within 1%)", examples=[5120.4])
+    approximate: bool = Field(False, description="Whether the statistics were estimated from a table sample (`approx=true`)", examples=[False])
+    trips_ci95: Optional[Tuple[float, float]] = Field(None, description="95% confidence interval of `trips` (approximate only)", examples=[[1489.2, 1556.8]])
+    total_duration_ci95: Optional[Tuple[float, float]] = Field(None, description="95% confidence interval of `total_duration` (approximate only)", examples=[[1351020.5, 1409401.5]])
+    avg_duration_ci95: Optional[Tuple[float, float]] = Field(None, description="95% confidence interval of `avg_duration` (approximate only)", examples=[[897.1, 915.3]])
+
+
+class TripActiveCount(BaseModel):
+    """Schema for the number of trips overlapping a time bucket"""
+    bucket: datetime = Field(..., description="Start of the bucket", examples=["2014-03-01T08:00:00"])
+    bucket_end: datetime = Field(..., description="End of the bucket (exclusive)", examples=["2014-03-01T09:00:00"])
+    trips: int = Field(..., description="Trips in progress at any moment of the bucket", examples=[42])
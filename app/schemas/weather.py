@@ -70,3 +70,18 @@ class WeatherUpdate(BaseModel):
 class Weather(WeatherBase):
     """Schema for weather response"""
     model_config = ConfigDict(from_attributes=True)
+
+
+class WeatherSummary(BaseModel):
+    """Schema for a weather cube cell: one period for one ZIP code or events value"""
+    period: date_type = Field(..., description="First day of the day/week/month/year", examples=["2014-01-01"])
+    zip_code: Optional[str] = Field(None, description="ZIP code (null when grouped by events without a ZIP filter)", examples=["94107"])
+    events: Optional[str] = Field(None, description="Weather events value when grouped by events (null = no event)", examples=["Rain"])
+    days: int = Field(..., description="Number of daily records", examples=[31])
+    rainy_days: int = Field(..., description="Days with precipitation or a Rain event", examples=[9])
+    total_precipitation_inches: float = Field(..., description="Total precipitation in inches", examples=[3.42])
+    mean_temperature_f: Optional[float] = Field(None, description="Average of the daily mean temperature", examples=[52.7])
+    max_temperature_f: Optional[float] = Field(None, description="Highest daily maximum temperature", examples=[68.0])
+    min_temperature_f: Optional[float] = Field(None, description="Lowest daily minimum temperature", examples=[38.0])
+    mean_humidity: Optional[float] = Field(None, description="Average of the daily mean humidity", examples=[71.3])
+    mean_wind_speed_mph: Optional[float] = Field(None, description="Average of the daily mean wind speed", examples=[5.8])
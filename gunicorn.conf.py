@@ -0,0 +1,33 @@
+"""
+Gunicorn settings for serving the API in production.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+The app is imported once in the master (`preload_app`) and forked into
+the workers; each worker then pre-fills its own connection pool during
+startup (see `app/core/warmup.py`). Set `API_RELOAD=true` for the
+development auto-reload mode instead.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('API_INTERNAL_PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+reload = os.getenv("API_RELOAD", "false").lower() == "true"
+preload_app = not reload
+
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_fork(server, worker):
+    """
+    Drop any pooled connection inherited from the master process.
+    """
+    from app.core.database import engine, replica_engines
+    from app.core.sharding import shard_map
+
+    for target in (engine, *replica_engines, *shard_map.engines):
+        target.dispose(close=False)
@@ -2,7 +2,10 @@ ALTER TABLE public.status
   ADD COLUMN category1 INTEGER NULL,
   ADD COLUMN category2 INTEGER NULL;
 
--- Descomente caso queira explorar estas colunas
+-- Para popular estas colunas use o backfill em lotes, que não reescreve a
+-- tabela inteira numa única transação:
+--   python src/backfill_status.py --column category1 --workers 4
+-- O UPDATE abaixo é mantido apenas como referência das expressões usadas.
 -- UPDATE public.status
 -- SET category1 = floor(random() * 3)::INTEGER,
 --     category2 = floor(random() * 10000)::INTEGER;
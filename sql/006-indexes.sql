@@ -1,2 +1,30 @@
 CREATE INDEX idx_status_time_btree
-    ON status USING btree(time);
\ No newline at end of file
+    ON status USING btree(time);
+
+-- Trip search (GET /trips filters and GET /trips/bikes/{bike_id}/timeline)
+CREATE INDEX idx_trip_start_date_btree
+    ON trip USING btree(start_date);
+
+CREATE INDEX idx_trip_start_station_start_date
+    ON trip USING btree(start_station_id, start_date);
+
+CREATE INDEX idx_trip_end_station_start_date
+    ON trip USING btree(end_station_id, start_date);
+
+CREATE INDEX idx_trip_subscription_start_date
+    ON trip USING btree(subscription_type, start_date);
+
+CREATE INDEX idx_trip_duration_btree
+    ON trip USING btree(duration);
+
+-- Cobre todas as colunas da rota para permitir index-only scan da linha do tempo
+CREATE INDEX idx_trip_bike_start_date
+    ON trip USING btree(bike_id, start_date, id)
+    INCLUDE (duration, start_station_id, end_date, end_station_id, subscription_type, zip_code);
+
+ANALYZE public.trip;
+
+-- Leituras por estação (e fields= estreitos) atendidas por index-only scan
+CREATE INDEX idx_status_station_time
+    ON status USING btree(station_id, time)
+    INCLUDE (bikes_available, docks_available);
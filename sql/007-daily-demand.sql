@@ -0,0 +1,140 @@
+DROP TABLE IF EXISTS public.daily_demand;
+DROP TABLE IF EXISTS public.city_zip_code;
+
+-- Mapeia a cidade de cada estação para o zip code usado em public.weather
+CREATE TABLE public.city_zip_code (
+    city VARCHAR(100) PRIMARY KEY,
+    zip_code VARCHAR(14) NOT NULL
+);
+
+INSERT INTO public.city_zip_code (city, zip_code) VALUES
+    ('San Francisco', '94107'),
+    ('Redwood City', '94063'),
+    ('Palo Alto', '94301'),
+    ('Mountain View', '94041'),
+    ('San Jose', '95113');
+
+CREATE TABLE public.daily_demand (
+    date DATE NOT NULL,
+    station_id INTEGER NOT NULL,
+    zip_code VARCHAR(14),
+    trips_started INTEGER NOT NULL,
+    subscriber_trips INTEGER NOT NULL,
+    customer_trips INTEGER NOT NULL,
+    mean_duration NUMERIC(12,3),
+    max_temperature_f NUMERIC(8,3),
+    mean_temperature_f NUMERIC(8,3),
+    min_temperature_f NUMERIC(8,3),
+    mean_humidity NUMERIC(8,3),
+    mean_visibility_miles NUMERIC(8,3),
+    mean_wind_speed_mph NUMERIC(8,3),
+    precipitation_inches NUMERIC(8,3),
+    cloud_cover NUMERIC(8,3),
+    events VARCHAR(100),
+    PRIMARY KEY (date, station_id)
+);
+
+CREATE INDEX idx_daily_demand_station_date
+    ON daily_demand USING btree(station_id, date);
+
+CREATE INDEX idx_daily_demand_zip_date
+    ON daily_demand USING btree(zip_code, date);
+
+DROP FUNCTION IF EXISTS public.refresh_daily_demand(DATE, DATE);
+DROP FUNCTION IF EXISTS public.refresh_daily_demand(DATE, DATE, INTEGER[]);
+
+-- Recalcula os dias [p_start, p_end). Usado pela carga inicial, pela API
+-- (a cada escrita em trip/weather) e por src/refresh_daily_demand.py.
+-- Com p_station_ids, só as linhas dessas estações são recalculadas.
+--
+-- Cada dia é travado com um advisory lock da transação, em ordem, antes do
+-- DELETE: duas escritas concorrentes no mesmo dia se serializam, e a segunda
+-- recalcula já vendo o que a primeira gravou (cada comando tem um snapshot
+-- novo em READ COMMITTED), em vez de falhar em daily_demand_pkey.
+CREATE OR REPLACE FUNCTION public.refresh_daily_demand(
+    p_start DATE,
+    p_end DATE,
+    p_station_ids INTEGER[] DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    inserted INTEGER;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('daily_demand'), d.day - DATE '2000-01-01')
+    FROM (
+        SELECT generate_series(p_start, p_end - 1, INTERVAL '1 day')::DATE AS day
+    ) d
+    ORDER BY d.day;
+
+    DELETE FROM public.daily_demand
+    WHERE date >= p_start AND date < p_end
+      AND (p_station_ids IS NULL OR station_id = ANY(p_station_ids));
+
+    INSERT INTO public.daily_demand (
+        date,
+        station_id,
+        zip_code,
+        trips_started,
+        subscriber_trips,
+        customer_trips,
+        mean_duration,
+        max_temperature_f,
+        mean_temperature_f,
+        min_temperature_f,
+        mean_humidity,
+        mean_visibility_miles,
+        mean_wind_speed_mph,
+        precipitation_inches,
+        cloud_cover,
+        events
+    )
+    SELECT
+        d.date,
+        d.station_id,
+        z.zip_code,
+        d.trips_started,
+        d.subscriber_trips,
+        d.customer_trips,
+        d.mean_duration,
+        w.max_temperature_f,
+        w.mean_temperature_f,
+        w.min_temperature_f,
+        w.mean_humidity,
+        w.mean_visibility_miles,
+        w.mean_wind_speed_mph,
+        w.precipitation_inches,
+        w.cloud_cover,
+        w.events
+    FROM (
+        SELECT
+            t.start_date::DATE AS date,
+            t.start_station_id AS station_id,
+            COUNT(*) AS trips_started,
+            COUNT(*) FILTER (WHERE t.subscription_type = 'Subscriber') AS subscriber_trips,
+            COUNT(*) FILTER (WHERE t.subscription_type = 'Customer') AS customer_trips,
+            AVG(t.duration) AS mean_duration
+        FROM public.trip t
+        WHERE t.start_date >= p_start
+          AND t.start_date < p_end
+          AND t.start_station_id IS NOT NULL
+          AND (p_station_ids IS NULL OR t.start_station_id = ANY(p_station_ids))
+        GROUP BY 1, 2
+    ) d
+    LEFT JOIN public.station s ON s.id = d.station_id
+    LEFT JOIN public.city_zip_code z ON z.city = s.city
+    LEFT JOIN public.weather w ON w.date = d.date AND w.zip_code = z.zip_code;
+
+    GET DIAGNOSTICS inserted = ROW_COUNT;
+    RETURN inserted;
+END;
+$$;
+
+SELECT public.refresh_daily_demand(
+    MIN(start_date)::DATE,
+    MAX(start_date)::DATE + 1
+)
+FROM public.trip;
+
+ANALYZE public.daily_demand;
@@ -0,0 +1,80 @@
+DROP TABLE IF EXISTS public.status_hourly;
+
+-- Agregados por estação e hora das amostras removidas de public.status
+CREATE TABLE public.status_hourly (
+    station_id INTEGER NOT NULL,
+    hour TIMESTAMP NOT NULL,
+    samples INTEGER NOT NULL,
+    bikes_min INTEGER NOT NULL,
+    bikes_max INTEGER NOT NULL,
+    bikes_avg NUMERIC(8,3) NOT NULL,
+    docks_min INTEGER NOT NULL,
+    docks_max INTEGER NOT NULL,
+    docks_avg NUMERIC(8,3) NOT NULL,
+    PRIMARY KEY (station_id, hour)
+);
+
+DROP FUNCTION IF EXISTS public.downsample_status_batch(TIMESTAMP, INTERVAL);
+
+-- Move a janela mais antiga (no máximo p_batch, sempre antes de p_cutoff)
+-- de public.status para public.status_hourly. Deve ser chamada em loop,
+-- com um COMMIT por chamada, até não retornar linhas.
+--
+-- bytes_deleted é o tamanho das linhas removidas. O VACUUM simples não
+-- devolve esse espaço ao sistema de arquivos, pois as amostras antigas ficam
+-- no início da tabela: ele fica livre para reuso pelas próximas inserções.
+CREATE OR REPLACE FUNCTION public.downsample_status_batch(p_cutoff TIMESTAMP, p_batch INTERVAL)
+RETURNS TABLE (window_start TIMESTAMP, window_end TIMESTAMP, rows_deleted BIGINT, buckets_written BIGINT, bytes_deleted BIGINT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cutoff TIMESTAMP := date_trunc('hour', p_cutoff);
+    v_start TIMESTAMP;
+    v_end TIMESTAMP;
+BEGIN
+    SELECT date_trunc('hour', MIN(s.time)) INTO v_start FROM public.status s;
+    IF v_start IS NULL OR v_start >= v_cutoff THEN
+        RETURN;
+    END IF;
+    v_end := LEAST(v_start + p_batch, v_cutoff);
+
+    RETURN QUERY
+    WITH moved AS (
+        DELETE FROM public.status s
+        WHERE s.time >= v_start AND s.time < v_end
+        RETURNING s.station_id, s.time, s.bikes_available, s.docks_available,
+                  pg_column_size(s.*) AS row_bytes
+    ),
+    aggregated AS (
+        SELECT
+            m.station_id,
+            date_trunc('hour', m.time) AS hour,
+            COUNT(*)::INTEGER AS samples,
+            MIN(m.bikes_available) AS bikes_min,
+            MAX(m.bikes_available) AS bikes_max,
+            AVG(m.bikes_available) AS bikes_avg,
+            MIN(m.docks_available) AS docks_min,
+            MAX(m.docks_available) AS docks_max,
+            AVG(m.docks_available) AS docks_avg
+        FROM moved m
+        GROUP BY 1, 2
+    ),
+    written AS (
+        INSERT INTO public.status_hourly AS h
+        SELECT * FROM aggregated
+        ON CONFLICT (station_id, hour) DO UPDATE SET
+            samples = h.samples + EXCLUDED.samples,
+            bikes_min = LEAST(h.bikes_min, EXCLUDED.bikes_min),
+            bikes_max = GREATEST(h.bikes_max, EXCLUDED.bikes_max),
+            bikes_avg = (h.bikes_avg * h.samples + EXCLUDED.bikes_avg * EXCLUDED.samples)
+                        / (h.samples + EXCLUDED.samples),
+            docks_min = LEAST(h.docks_min, EXCLUDED.docks_min),
+            docks_max = GREATEST(h.docks_max, EXCLUDED.docks_max),
+            docks_avg = (h.docks_avg * h.samples + EXCLUDED.docks_avg * EXCLUDED.samples)
+                        / (h.samples + EXCLUDED.samples)
+        RETURNING 1
+    )
+    SELECT v_start, v_end, (SELECT COUNT(*) FROM moved), (SELECT COUNT(*) FROM written),
+           (SELECT COALESCE(SUM(m.row_bytes), 0)::BIGINT FROM moved m);
+END;
+$$;
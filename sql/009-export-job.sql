@@ -0,0 +1,22 @@
+DROP TABLE IF EXISTS public.export_job;
+
+-- Jobs de exportação em massa (POST /exports), compartilhados entre os workers da API
+CREATE TABLE public.export_job (
+    id VARCHAR(32) PRIMARY KEY,
+    params_hash VARCHAR(64) NOT NULL,
+    table_name VARCHAR(50) NOT NULL,
+    format VARCHAR(10) NOT NULL,
+    params JSONB NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'pending',
+    rows_written BIGINT NOT NULL DEFAULT 0,
+    rows_estimate BIGINT,
+    file_path TEXT,
+    file_size BIGINT,
+    error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX idx_export_job_params_hash
+    ON export_job USING btree(params_hash, created_at);
@@ -0,0 +1,34 @@
+-- Publica cada nova amostra de public.status no canal status_insert,
+-- consumido pelo stream SSE da API (GET /status/stream). Cobre tanto
+-- POST /status quanto cargas em massa via INSERT/COPY. Cargas que não
+-- devem chegar aos assinantes (como a cópia inicial de um shard) fazem
+-- SET sfbikeshare.skip_status_notify = on: uma notificação por linha
+-- encheria a fila de NOTIFY do servidor.
+CREATE OR REPLACE FUNCTION public.notify_status_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF current_setting('sfbikeshare.skip_status_notify', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM pg_notify(
+        'status_insert',
+        json_build_object(
+            'station_id', NEW.station_id,
+            'bikes_available', NEW.bikes_available,
+            'docks_available', NEW.docks_available,
+            'time', NEW.time,
+            'category1', NEW.category1,
+            'category2', NEW.category2
+        )::TEXT
+    );
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_status_notify ON public.status;
+CREATE TRIGGER trg_status_notify
+    AFTER INSERT ON public.status
+    FOR EACH ROW EXECUTE FUNCTION public.notify_status_insert();
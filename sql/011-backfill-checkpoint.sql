@@ -0,0 +1,11 @@
+-- Checkpoint dos backfills em lotes (src/backfill_status.py). Cada lote
+-- concluído é registrado na mesma transação do seu UPDATE, permitindo
+-- retomar uma execução interrompida sem reprocessar nem pular intervalos.
+CREATE TABLE IF NOT EXISTS public.backfill_checkpoint (
+    job VARCHAR(100) NOT NULL,
+    chunk_start TIMESTAMP NOT NULL,
+    chunk_end TIMESTAMP NOT NULL,
+    rows_updated BIGINT NOT NULL,
+    finished_at TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (job, chunk_start)
+);
@@ -0,0 +1,11 @@
+-- Viagens em andamento (GET /trips/active e /trips/active/count): índice
+-- GiST sobre o intervalo [start_date, end_date) de cada viagem. GREATEST
+-- protege contra registros com end_date anterior a start_date, que
+-- tornariam o intervalo inválido. Por ser um índice de expressão, é
+-- mantido automaticamente a cada escrita em public.trip.
+--
+-- As consultas precisam repetir exatamente esta expressão para usar o índice.
+CREATE INDEX IF NOT EXISTS idx_trip_active_span
+    ON public.trip USING gist (tsrange(start_date, GREATEST(start_date, end_date), '[)'));
+
+ANALYZE public.trip;
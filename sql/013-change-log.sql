@@ -0,0 +1,126 @@
+-- Feed de alterações para espelhos (GET /changes). Cada INSERT, UPDATE e
+-- DELETE em station, trip, status e weather grava uma linha por registro
+-- afetado, com o xid8 da transação que a gerou.
+--
+-- A ordem de leitura é (txid, id) e a API só entrega linhas com txid
+-- abaixo do xmin do snapshot atual: todas as transações anteriores já
+-- terminaram, então nenhuma alteração pode aparecer depois "atrás" de um
+-- token já entregue, mesmo com commits fora de ordem.
+--
+-- Cargas e manutenções em massa podem desligar o registro na sessão com
+--   SET sfbikeshare.skip_change_log = on
+-- (usado pela retenção e pelo backfill); os espelhos não recebem essas
+-- alterações.
+CREATE TABLE IF NOT EXISTS public.change_log (
+    id BIGSERIAL NOT NULL,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    table_name VARCHAR(20) NOT NULL,
+    op CHAR(1) NOT NULL,
+    key JSONB NOT NULL,
+    data JSONB,
+    PRIMARY KEY (txid, id)
+);
+
+-- Limite inferior dos tokens ainda válidos (linha única), avançado pela
+-- limpeza de public.prune_change_log
+CREATE TABLE IF NOT EXISTS public.change_log_horizon (
+    single BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (single),
+    txid XID8 NOT NULL,
+    id BIGINT NOT NULL
+);
+INSERT INTO public.change_log_horizon (txid, id)
+VALUES ('0'::XID8, 0)
+ON CONFLICT DO NOTHING;
+
+-- Trigger por comando com tabelas de transição: um único INSERT no log por
+-- comando, mesmo em cargas de muitas linhas. TG_ARGV lista as colunas da
+-- chave da tabela.
+CREATE OR REPLACE FUNCTION public.record_changes()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF current_setting('sfbikeshare.skip_change_log', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO public.change_log (table_name, op, key, data)
+        SELECT TG_TABLE_NAME, 'D',
+               (SELECT jsonb_object_agg(k, r.j -> k) FROM unnest(TG_ARGV) AS k),
+               NULL
+        FROM (SELECT to_jsonb(o) AS j FROM old_rows o) AS r;
+    ELSE
+        INSERT INTO public.change_log (table_name, op, key, data)
+        SELECT TG_TABLE_NAME, left(TG_OP, 1),
+               (SELECT jsonb_object_agg(k, r.j -> k) FROM unnest(TG_ARGV) AS k),
+               r.j
+        FROM (SELECT to_jsonb(n) AS j FROM new_rows n) AS r;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN
+        SELECT * FROM (VALUES
+            ('station', '''id'''),
+            ('trip', '''id'''),
+            ('status', '''station_id'', ''time'''),
+            ('weather', '''date'', ''zip_code''')
+        ) AS v(name, key_columns)
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_change_insert ON public.%I', t.name, t.name);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_change_update ON public.%I', t.name, t.name);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_change_delete ON public.%I', t.name, t.name);
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_change_insert AFTER INSERT ON public.%I '
+            'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT '
+            'EXECUTE FUNCTION public.record_changes(%s)',
+            t.name, t.name, t.key_columns
+        );
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_change_update AFTER UPDATE ON public.%I '
+            'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT '
+            'EXECUTE FUNCTION public.record_changes(%s)',
+            t.name, t.name, t.key_columns
+        );
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_change_delete AFTER DELETE ON public.%I '
+            'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT '
+            'EXECUTE FUNCTION public.record_changes(%s)',
+            t.name, t.name, t.key_columns
+        );
+    END LOOP;
+END;
+$$;
+
+-- Remove as alterações anteriores a p_before (apenas de transações já
+-- encerradas) e avança o horizonte; tokens abaixo dele recebem 410.
+CREATE OR REPLACE FUNCTION public.prune_change_log(p_before TIMESTAMPTZ)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_txid XID8;
+    v_id BIGINT;
+    v_deleted BIGINT;
+BEGIN
+    SELECT c.txid, c.id INTO v_txid, v_id
+    FROM public.change_log c
+    WHERE c.changed_at < p_before
+      AND c.txid < pg_snapshot_xmin(pg_current_snapshot())
+    ORDER BY c.txid DESC, c.id DESC
+    LIMIT 1;
+    IF v_txid IS NULL THEN
+        RETURN 0;
+    END IF;
+    DELETE FROM public.change_log c WHERE (c.txid, c.id) <= (v_txid, v_id);
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    UPDATE public.change_log_horizon SET txid = v_txid, id = v_id;
+    RETURN v_deleted;
+END;
+$$;
@@ -0,0 +1,187 @@
+-- Intervalos em que cada estação ficou sem bicicletas (empty:
+-- bikes_available = 0) ou sem vagas (full: docks_available = 0), usados
+-- por GET /stations/{id}/outages e GET /stations/outages.
+--
+-- Um intervalo começa na primeira amostra da sequência e termina na
+-- primeira amostra seguinte fora dela (ended_at). Enquanto a última
+-- amostra da estação ainda está na sequência, ended_at fica NULL e
+-- last_seen marca até onde a falta é conhecida.
+DROP TABLE IF EXISTS public.station_outage CASCADE;
+
+CREATE TABLE public.station_outage (
+    station_id INTEGER NOT NULL,
+    kind VARCHAR(5) NOT NULL CHECK (kind IN ('empty', 'full')),
+    started_at TIMESTAMP NOT NULL,
+    ended_at TIMESTAMP,
+    last_seen TIMESTAMP NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (station_id, kind, started_at)
+);
+
+-- Ranking da rede por janela de tempo. As consultas precisam repetir
+-- exatamente esta expressão para usar o índice.
+CREATE INDEX idx_station_outage_span
+    ON public.station_outage USING gist (tsrange(started_at, COALESCE(ended_at, last_seen), '[]'));
+
+-- Codificação run-length das amostras de uma estação (ou de todas, com
+-- p_station_id NULL) a partir de p_from, em uma única passada ordenada
+-- por (station_id, time) sobre idx_status_station_time. A contagem
+-- acumulada de amostras fora da falta é constante dentro de cada
+-- sequência e serve de identificador da ilha, sem uma segunda ordenação.
+CREATE OR REPLACE FUNCTION public.station_outage_runs(p_station_id INTEGER, p_from TIMESTAMP)
+RETURNS SETOF public.station_outage
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT o.station_id, k.kind, MIN(o.time),
+           CASE WHEN bool_or(o.next_time IS NULL) THEN NULL ELSE MAX(o.next_time) END,
+           MAX(o.time), COUNT(*)::INTEGER
+    FROM (
+        SELECT s.station_id, s.time, s.bikes_available, s.docks_available,
+               lead(s.time) OVER w AS next_time,
+               COUNT(*) FILTER (WHERE s.bikes_available <> 0) OVER w AS empty_run,
+               COUNT(*) FILTER (WHERE s.docks_available <> 0) OVER w AS full_run
+        FROM public.status s
+        WHERE (p_station_id IS NULL OR s.station_id = p_station_id)
+          AND s.time >= p_from
+        WINDOW w AS (PARTITION BY s.station_id ORDER BY s.time ROWS UNBOUNDED PRECEDING)
+    ) AS o
+    CROSS JOIN LATERAL (VALUES
+        ('empty', o.bikes_available = 0, o.empty_run),
+        ('full', o.docks_available = 0, o.full_run)
+    ) AS k(kind, active, run)
+    WHERE k.active
+    GROUP BY o.station_id, k.kind, k.run
+$$;
+
+-- Recalcula os intervalos de uma estação afetados por amostras a partir
+-- de p_from: remove os que terminam nele ou depois dele (ou seguem
+-- abertos) e refaz a codificação desde o início do mais antigo deles. O
+-- início recua até que nenhum intervalo restante cruze o ponto de
+-- recomeço. Um intervalo que termina exatamente em p_from também é
+-- refeito, pois a amostra que o encerrava pode ter sido removida ou
+-- alterada.
+--
+-- Um advisory lock da transação por estação serializa escritas
+-- concorrentes na mesma estação: a segunda espera o COMMIT da primeira e
+-- recalcula vendo as amostras e intervalos dela, em vez de falhar em
+-- station_outage_pkey ao inserir o mesmo intervalo aberto.
+CREATE OR REPLACE FUNCTION public.refresh_station_outages(p_station_id INTEGER, p_from TIMESTAMP)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_from TIMESTAMP := p_from;
+    v_earlier TIMESTAMP;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('station_outage'), p_station_id);
+
+    LOOP
+        SELECT MIN(o.started_at) INTO v_earlier
+        FROM public.station_outage o
+        WHERE o.station_id = p_station_id
+          AND (o.ended_at IS NULL OR o.ended_at >= v_from)
+          AND o.started_at < v_from;
+        EXIT WHEN v_earlier IS NULL;
+        v_from := v_earlier;
+    END LOOP;
+
+    DELETE FROM public.station_outage o
+    WHERE o.station_id = p_station_id
+      AND (o.ended_at IS NULL OR o.ended_at >= v_from);
+    INSERT INTO public.station_outage
+    SELECT * FROM public.station_outage_runs(p_station_id, v_from);
+END;
+$$;
+
+-- Recalcula todos os intervalos (carga inicial e split_status_shards.py)
+CREATE OR REPLACE FUNCTION public.rebuild_station_outages()
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows BIGINT;
+BEGIN
+    TRUNCATE public.station_outage;
+    INSERT INTO public.station_outage
+    SELECT * FROM public.station_outage_runs(NULL, '-infinity');
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$;
+
+-- Trigger por comando: recalcula cada estação afetada a partir da sua
+-- amostra alterada mais antiga. UPDATEs que não mexem em estação, horário
+-- ou disponibilidade (ex.: backfill de category1/category2) não custam
+-- nada além da comparação. As estações são percorridas em ordem, para
+-- que lotes concorrentes tomem os locks na mesma ordem, sem deadlock.
+--
+-- A retenção remove amostras antigas sem apagar os intervalos já
+-- calculados, e cargas em massa chamam rebuild_station_outages() ao final:
+--   SET sfbikeshare.skip_station_outages = on
+CREATE OR REPLACE FUNCTION public.maintain_station_outages()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    IF current_setting('sfbikeshare.skip_station_outages', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        FOR r IN
+            SELECT n.station_id, MIN(n.time) AS from_time FROM new_rows n
+            GROUP BY n.station_id
+            ORDER BY n.station_id
+        LOOP
+            PERFORM public.refresh_station_outages(r.station_id, r.from_time);
+        END LOOP;
+    ELSIF TG_OP = 'UPDATE' THEN
+        FOR r IN
+            SELECT c.station_id, MIN(c.time) AS from_time
+            FROM (
+                (SELECT n.station_id, n.time, n.bikes_available, n.docks_available FROM new_rows n
+                 EXCEPT ALL
+                 SELECT o.station_id, o.time, o.bikes_available, o.docks_available FROM old_rows o)
+                UNION ALL
+                (SELECT o.station_id, o.time, o.bikes_available, o.docks_available FROM old_rows o
+                 EXCEPT ALL
+                 SELECT n.station_id, n.time, n.bikes_available, n.docks_available FROM new_rows n)
+            ) AS c
+            GROUP BY c.station_id
+            ORDER BY c.station_id
+        LOOP
+            PERFORM public.refresh_station_outages(r.station_id, r.from_time);
+        END LOOP;
+    ELSE
+        FOR r IN
+            SELECT o.station_id, MIN(o.time) AS from_time FROM old_rows o
+            GROUP BY o.station_id
+            ORDER BY o.station_id
+        LOOP
+            PERFORM public.refresh_station_outages(r.station_id, r.from_time);
+        END LOOP;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_status_outages_insert ON public.status;
+CREATE TRIGGER trg_status_outages_insert AFTER INSERT ON public.status
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_station_outages();
+
+DROP TRIGGER IF EXISTS trg_status_outages_update ON public.status;
+CREATE TRIGGER trg_status_outages_update AFTER UPDATE ON public.status
+    REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_station_outages();
+
+DROP TRIGGER IF EXISTS trg_status_outages_delete ON public.status;
+CREATE TRIGGER trg_status_outages_delete AFTER DELETE ON public.status
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_station_outages();
+
+SELECT public.rebuild_station_outages();
+
+ANALYZE public.station_outage;
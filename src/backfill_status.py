@@ -0,0 +1,340 @@
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+import psycopg2
+from psycopg2 import errors, sql
+
+from db_utils import get_connection, load_env_vars, wait_for_postgres
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(threadName)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Expressões padrão de cada coluna (as mesmas do UPDATE comentado em sql/005-col-status.sql)
+DEFAULT_EXPRESSIONS = {
+    "category1": "floor(random() * 3)::INTEGER",
+    "category2": "floor(random() * 10000)::INTEGER",
+}
+
+MAX_ATTEMPTS = 5
+
+
+def parse_args():
+    load_env_vars()
+    parser = argparse.ArgumentParser(
+        description="Preenche uma coluna de public.status em lotes por intervalo de tempo"
+    )
+    parser.add_argument("--column", required=True, choices=sorted(DEFAULT_EXPRESSIONS), help="Coluna a preencher")
+    parser.add_argument("--expression", help="Expressão SQL do novo valor (padrão: expressão da coluna)")
+    parser.add_argument("--job", help="Nome do checkpoint (padrão: backfill_<coluna>)")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Início do intervalo (padrão: MIN(time))")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Fim do intervalo, exclusivo (padrão: MAX(time))")
+    parser.add_argument("--chunk-hours", type=float, default=6, help="Janela de tempo de cada lote")
+    parser.add_argument("--workers", type=int, default=4, help="Conexões processando lotes em paralelo")
+    parser.add_argument("--all-rows", action="store_true", help="Atualiza também linhas já preenchidas")
+    parser.add_argument("--restart", action="store_true", help="Descarta o checkpoint e recomeça do início")
+    parser.add_argument("--max-replication-lag", type=float, default=10.0, help="Pausa enquanto o atraso de replicação (s) exceder este valor")
+    parser.add_argument("--max-active-queries", type=int, default=20, help="Pausa enquanto houver mais consultas ativas que isso")
+    parser.add_argument("--pause", type=float, default=0.0, help="Intervalo (s) entre lotes de cada conexão")
+    parser.add_argument("--lock-timeout", default="5s", help="lock_timeout de cada lote")
+    parser.add_argument(
+        "--shard-urls",
+        default=os.getenv("STATUS_SHARD_URLS", ""),
+        help="Atualiza public.status em cada shard (padrão: STATUS_SHARD_URLS) em vez do banco principal",
+    )
+    return parser.parse_args()
+
+
+def connect(url):
+    """Conexão com um shard, ou com o banco principal se `url` é None"""
+    return psycopg2.connect(url) if url else get_connection()
+
+
+def chunk_ranges(start, end, size):
+    """Divide [start, end) em janelas consecutivas de tamanho `size`"""
+    chunks = []
+    while start < end:
+        chunks.append((start, min(start + size, end)))
+        start += size
+    return chunks
+
+
+def uncovered_ranges(start, end, covered):
+    """
+    Partes de [start, end) fora dos intervalos `covered`, que devem estar
+    ordenados pelo início
+    """
+    pieces = []
+    for covered_start, covered_end in covered:
+        if covered_end <= start:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > start:
+            pieces.append((start, covered_start))
+        start = max(start, covered_end)
+    if start < end:
+        pieces.append((start, end))
+    return pieces
+
+
+def resolve_chunks(conn, args, job):
+    """
+    Calcula os lotes a processar, descontando os intervalos já registrados
+    no checkpoint
+
+    A comparação é pelos intervalos [chunk_start, chunk_end) concluídos, e
+    não pelo início de cada lote: uma nova execução com outro --start, outro
+    --chunk-hours ou depois da retenção (que muda MIN(time)) processa só as
+    partes ainda não cobertas, sem repetir nem pular nenhuma. Retorna os
+    lotes pendentes e o total de lotes do intervalo.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('public.backfill_checkpoint')")
+        if cur.fetchone()[0] is None:
+            raise RuntimeError(
+                "public.backfill_checkpoint não existe; em shards, execute "
+                "src/split_status_shards.py --schema-only"
+            )
+        if args.restart:
+            cur.execute("DELETE FROM public.backfill_checkpoint WHERE job = %s", (job,))
+        cur.execute("SELECT MIN(time), MAX(time) FROM public.status")
+        min_time, max_time = cur.fetchone()
+        if min_time is None:
+            return [], 0
+        start = args.start or min_time
+        end = args.end or max_time + timedelta(seconds=1)
+        cur.execute(
+            "SELECT chunk_start, chunk_end FROM public.backfill_checkpoint "
+            "WHERE job = %s ORDER BY chunk_start",
+            (job,),
+        )
+        covered = cur.fetchall()
+    conn.commit()
+    pending, total = [], 0
+    for chunk_start, chunk_end in chunk_ranges(start, end, timedelta(hours=args.chunk_hours)):
+        pieces = uncovered_ranges(chunk_start, chunk_end, covered)
+        pending.extend(pieces)
+        total += len(pieces) or 1
+    return pending, total
+
+
+class Throttle:
+    """
+    Pausa os workers enquanto o atraso de replicação ou a carga do banco
+    estiverem acima dos limites configurados
+    """
+
+    def __init__(self, max_lag, max_active, interval=5.0):
+        self.max_lag = max_lag
+        self.max_active = max_active
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._reason = None
+
+    def check(self, cur):
+        """Retorna o motivo da pausa, ou None se o lote pode seguir"""
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.interval:
+                return self._reason
+            cur.execute(
+                "SELECT COALESCE(MAX(EXTRACT(EPOCH FROM replay_lag)), 0) FROM pg_stat_replication"
+            )
+            lag = float(cur.fetchone()[0])
+            cur.execute(
+                "SELECT COUNT(*) FROM pg_stat_activity "
+                "WHERE state = 'active' AND backend_type = 'client backend' "
+                "AND application_name <> 'backfill_status' AND pid <> pg_backend_pid()"
+            )
+            active = cur.fetchone()[0]
+            self._reason = None
+            if lag > self.max_lag:
+                self._reason = f"atraso de replicação de {lag:.1f}s"
+            elif active > self.max_active:
+                self._reason = f"{active} consultas ativas"
+            self._checked_at = time.monotonic()
+            return self._reason
+
+    def wait(self, cur, stop):
+        while not stop.is_set():
+            reason = self.check(cur)
+            if reason is None:
+                return
+            logger.info(f"Pausando: {reason}")
+            stop.wait(self.interval)
+
+
+class Backfill:
+    """
+    Processa os lotes em paralelo, uma conexão por thread e banco. Com
+    shards, cada lote é um (shard, janela) e o checkpoint fica no shard,
+    na mesma transação do UPDATE
+    """
+
+    def __init__(self, args, job, urls):
+        self.args = args
+        self.job = job
+        self.urls = urls
+        self.expression = args.expression or DEFAULT_EXPRESSIONS[args.column]
+        self.throttles = [
+            Throttle(args.max_replication_lag, args.max_active_queries) for _ in urls
+        ]
+        self.stop = threading.Event()
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.statement = self._build_statement()
+
+    def _build_statement(self):
+        column = sql.Identifier(self.args.column)
+        where = sql.SQL("time >= %(start)s AND time < %(end)s")
+        if not self.args.all_rows:
+            where = sql.SQL("{} AND {} IS NULL").format(where, column)
+        return sql.SQL("UPDATE public.status SET {} = {} WHERE {}").format(
+            column, sql.SQL(self.expression), where
+        )
+
+    def _connection(self, index):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(index)
+        if conn is None:
+            conn = connect(self.urls[index])
+            with conn.cursor() as cur:
+                cur.execute("SET application_name = 'backfill_status'")
+                cur.execute("SET lock_timeout = %s", (self.args.lock_timeout,))
+                # Backfill não entra no feed de alterações (sql/013-change-log.sql)
+                cur.execute("SET sfbikeshare.skip_change_log = on")
+            conn.commit()
+            conns[index] = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def run_chunk(self, chunk):
+        """
+        Atualiza um lote (índice do banco, (início, fim)) e registra o
+        checkpoint na mesma transação
+
+        Lotes que esbarram em lock_timeout ou deadlock são repetidos.
+        """
+        index, (start, end) = chunk
+        conn = self._connection(index)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            if self.stop.is_set():
+                return None
+            try:
+                with conn.cursor() as cur:
+                    self.throttles[index].wait(cur, self.stop)
+                    if self.stop.is_set():
+                        conn.rollback()
+                        return None
+                    cur.execute(self.statement, {"start": start, "end": end})
+                    rows = cur.rowcount
+                    cur.execute(
+                        "INSERT INTO public.backfill_checkpoint (job, chunk_start, chunk_end, rows_updated) "
+                        "VALUES (%s, %s, %s, %s) ON CONFLICT (job, chunk_start) DO NOTHING",
+                        (self.job, start, end, rows),
+                    )
+                conn.commit()
+                if self.args.pause:
+                    self.stop.wait(self.args.pause)
+                return rows
+            except (errors.LockNotAvailable, errors.DeadlockDetected) as e:
+                conn.rollback()
+                logger.warning(f"Lote {start} a {end} falhou (tentativa {attempt}): {e}")
+                self.stop.wait(attempt)
+        raise RuntimeError(f"Lote {start} a {end} falhou após {MAX_ATTEMPTS} tentativas")
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+
+
+def main():
+    args = parse_args()
+    if not wait_for_postgres():
+        logger.error("Falha ao conectar com PostgreSQL")
+        sys.exit(1)
+
+    job = args.job or f"backfill_{args.column}"
+    urls = [url.strip() for url in args.shard_urls.split(",") if url.strip()] or [None]
+    chunks, total = [], 0
+    for index, url in enumerate(urls):
+        conn = connect(url)
+        try:
+            pending_chunks, target_total = resolve_chunks(conn, args, job)
+        finally:
+            conn.close()
+        chunks.extend((index, chunk) for chunk in pending_chunks)
+        total += target_total
+
+    if not chunks:
+        logger.info(f"Nada a fazer para o job {job}")
+        return
+    # Janelas na mesma ordem em todos os shards, para que avancem juntos
+    chunks.sort(key=lambda item: (item[1][0], item[0]))
+    logger.info(
+        f"Job {job}: {len(chunks)} de {total} lotes pendentes "
+        f"({chunks[0][1][0]} a {chunks[-1][1][1]}) em {len(urls)} banco(s), "
+        f"{args.workers} conexões"
+    )
+
+    backfill = Backfill(args, job, urls)
+    done = total - len(chunks)
+    rows_updated = 0
+    started = time.monotonic()
+    pending = iter(chunks)
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="backfill")
+    try:
+        # Mantém no máximo 2 lotes por worker em fila, para que uma interrupção
+        # não deixe centenas de lotes agendados
+        futures = set()
+        for chunk in pending:
+            futures.add(executor.submit(backfill.run_chunk, chunk))
+            if len(futures) >= args.workers * 2:
+                break
+        while futures:
+            finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                rows = future.result()
+                if rows is None:
+                    continue
+                done += 1
+                rows_updated += rows
+                chunk = next(pending, None)
+                if chunk is not None:
+                    futures.add(executor.submit(backfill.run_chunk, chunk))
+            elapsed = time.monotonic() - started
+            processed = done - (total - len(chunks))
+            eta = elapsed / processed * (total - done) if processed else 0
+            logger.info(
+                f"Progresso: {done}/{total} lotes ({done / total:.1%}), "
+                f"{rows_updated} linhas atualizadas, ETA {timedelta(seconds=int(eta))}"
+            )
+    except KeyboardInterrupt:
+        logger.warning("Interrompido; lotes concluídos estão no checkpoint, execute novamente para retomar")
+        backfill.stop.set()
+        sys.exit(130)
+    finally:
+        backfill.stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        backfill.close()
+
+    logger.info(
+        f"Backfill {job} concluído: {rows_updated} linhas em "
+        f"{timedelta(seconds=int(time.monotonic() - started))}"
+    )
+
+
+if __name__ == "__main__":
+    main()
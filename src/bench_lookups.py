@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from db_utils import get_connection
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rotas de busca por chave e a consulta que sorteia as chaves usadas
+LOOKUPS = {
+    "get_station": (
+        "/stations/{}",
+        "SELECT id FROM public.station ORDER BY random() LIMIT %s",
+    ),
+    "get_trip": (
+        "/trips/{}",
+        "SELECT id FROM public.trip TABLESAMPLE SYSTEM (1) LIMIT %s",
+    ),
+    "get_status": (
+        "/status/{}/{}",
+        "SELECT station_id, time FROM public.status TABLESAMPLE SYSTEM (1) LIMIT %s",
+    ),
+    "get_weather": (
+        "/weather/{}/{}",
+        "SELECT date, zip_code FROM public.weather ORDER BY random() LIMIT %s",
+    ),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compara a latência das rotas de busca por chave entre os drivers do Postgres"
+    )
+    parser.add_argument("--drivers", nargs="+", default=["psycopg2", "psycopg"], help="Valores de DB_DRIVER comparados")
+    parser.add_argument("--requests", type=int, default=2000, help="Requisições medidas por rota")
+    parser.add_argument("--warmup", type=int, default=200, help="Requisições de aquecimento por rota (não medidas)")
+    parser.add_argument("--keys", type=int, default=200, help="Chaves distintas sorteadas por rota")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--keys-file", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def sample_keys(count):
+    """Sorteia chaves existentes de cada tabela"""
+    keys = {}
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            for route, (_, query) in LOOKUPS.items():
+                cur.execute(query, (count,))
+                keys[route] = [
+                    [value.isoformat() if hasattr(value, "isoformat") else value for value in row]
+                    for row in cur.fetchall()
+                ]
+    finally:
+        conn.close()
+    return keys
+
+
+def run_child(args):
+    """
+    Executa o benchmark com o DB_DRIVER do ambiente e imprime o resultado em JSON
+
+    O driver é lido na importação de app.core.database, por isso cada
+    driver roda em um processo próprio.
+    """
+    sys.path.insert(0, ROOT)
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.main import app
+
+    with open(args.keys_file) as f:
+        keys = json.load(f)
+    client = TestClient(app)
+    results = {}
+    for route, (template, _) in LOOKUPS.items():
+        paths = [settings.api_prefix + template.format(*key) for key in keys[route]]
+        for i in range(args.warmup):
+            client.get(paths[i % len(paths)])
+        latencies = []
+        for i in range(args.requests):
+            path = random.choice(paths)
+            started = time.perf_counter()
+            response = client.get(path)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path}: {response.status_code} {response.text}")
+        latencies.sort()
+        results[route] = {
+            "mean": statistics.fmean(latencies),
+            "p50": latencies[len(latencies) // 2],
+            "p95": latencies[int(len(latencies) * 0.95)],
+            "p99": latencies[int(len(latencies) * 0.99)],
+        }
+    print(json.dumps(results))
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        run_child(args)
+        return
+
+    keys_file = os.path.join("/tmp", f"bench_lookups_keys_{os.getpid()}.json")
+    with open(keys_file, "w") as f:
+        json.dump(sample_keys(args.keys), f)
+
+    results = {}
+    try:
+        for driver in args.drivers:
+            print(f"Medindo {driver}...", file=sys.stderr)
+            output = subprocess.run(
+                [
+                    sys.executable, os.path.abspath(__file__),
+                    "--child", driver,
+                    "--keys-file", keys_file,
+                    "--requests", str(args.requests),
+                    "--warmup", str(args.warmup),
+                ],
+                env={**os.environ, "DB_DRIVER": driver},
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results[driver] = json.loads(output.strip().splitlines()[-1])
+    finally:
+        os.remove(keys_file)
+
+    base = args.drivers[0]
+    print(f"{'rota':<14}{'driver':<10}{'média ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'p50 vs ' + base:>16}")
+    for route in LOOKUPS:
+        for driver in args.drivers:
+            r = results[driver][route]
+            change = (r["p50"] / results[base][route]["p50"] - 1) * 100
+            print(
+                f"{route:<14}{driver:<10}{r['mean']:>10.3f}{r['p50']:>9.3f}"
+                f"{r['p95']:>9.3f}{r['p99']:>9.3f}{change:>+15.1f}%"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import argparse
+import heapq
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+import psycopg2
+
+from db_utils import get_connection, load_env_vars, wait_for_postgres
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Deve acompanhar FORMAT_VERSION em app/core/status_snapshot.py
+FORMAT_VERSION = 1
+DEFAULT_DIR = "/tmp/sfbikeshare-status-snapshot"
+
+
+def parse_args():
+    load_env_vars()
+    parser = argparse.ArgumentParser(
+        description="Gera o snapshot colunar (mmap) de public.status usado pela API"
+    )
+    parser.add_argument(
+        "--output",
+        default=os.getenv("STATUS_SNAPSHOT_DIR", DEFAULT_DIR),
+        help="Diretório dos snapshots (padrão: STATUS_SNAPSHOT_DIR)",
+    )
+    parser.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        help="Fim (exclusivo) da cobertura; padrão: último instante amostrado, que pode estar incompleto",
+    )
+    parser.add_argument("--batch-rows", type=int, default=200000, help="Linhas lidas por vez do cursor")
+    parser.add_argument("--keep", type=int, default=2, help="Quantidade de versões antigas mantidas")
+    parser.add_argument(
+        "--shard-urls",
+        default=os.getenv("STATUS_SHARD_URLS", ""),
+        help="Lê public.status dos shards (padrão: STATUS_SHARD_URLS) em vez do banco principal",
+    )
+    return parser.parse_args()
+
+
+def resolve_coverage(conns, until):
+    """Retorna o intervalo [início, fim) coberto pelo snapshot"""
+    bounds = []
+    for conn in conns:
+        with conn.cursor() as cur:
+            cur.execute("SELECT MIN(time), MAX(time) FROM public.status")
+            bounds.append(cur.fetchone())
+    bounds = [b for b in bounds if b[0] is not None]
+    if not bounds:
+        return None, None
+    min_time = min(b[0] for b in bounds)
+    max_time = max(b[1] for b in bounds)
+    end = min(until, max_time) if until else max_time
+    return min_time, end
+
+
+def read_batches(conns, start, end, batch_rows):
+    """
+    Lotes de public.status ordenados por (station_id, time), com um
+    cursor no servidor por banco
+    """
+    cursors = []
+    try:
+        for i, conn in enumerate(conns):
+            cur = conn.cursor(name=f"status_snapshot_{i}")
+            cur.itersize = batch_rows
+            cur.execute(
+                """
+                SELECT station_id, EXTRACT(EPOCH FROM time)::BIGINT,
+                       bikes_available, docks_available
+                FROM public.status
+                WHERE time >= %s AND time < %s
+                ORDER BY station_id, time
+                """,
+                (start, end),
+            )
+            cursors.append(cur)
+        if len(cursors) == 1:
+            while batch := cursors[0].fetchmany(batch_rows):
+                yield batch
+        else:
+            # Cada estação está em um único shard: intercalar os cursores
+            # por (station_id, time) mantém a ordem global
+            merged = heapq.merge(*cursors, key=lambda row: (row[0], row[1]))
+            while batch := list(islice(merged, batch_rows)):
+                yield batch
+    finally:
+        for cur in cursors:
+            cur.close()
+
+
+def write_columns(conns, version_dir, start, end, batch_rows):
+    """
+    Lê public.status ordenado por (station_id, time) e grava cada coluna
+    em seu arquivo binário
+
+    Returns:
+        tuple: (linhas gravadas, ids das estações, offsets de cada estação)
+    """
+    stations, offsets = [], []
+    rows = 0
+    files = {
+        name: open(os.path.join(version_dir, name), "wb")
+        for name in ("time.i64", "bikes.i16", "docks.i16")
+    }
+    try:
+        for batch in read_batches(conns, start, end, batch_rows):
+            station_col, time_col, bikes_col, docks_col = zip(*batch)
+            station_arr = np.asarray(station_col, dtype="<i4")
+            # Início de cada estação nova dentro do lote
+            changes = np.flatnonzero(np.r_[True, station_arr[1:] != station_arr[:-1]])
+            for i in changes:
+                if not stations or stations[-1] != station_arr[i]:
+                    stations.append(int(station_arr[i]))
+                    offsets.append(rows + int(i))
+            np.asarray(time_col, dtype="<i8").tofile(files["time.i64"])
+            np.asarray(bikes_col, dtype="<i2").tofile(files["bikes.i16"])
+            np.asarray(docks_col, dtype="<i2").tofile(files["docks.i16"])
+            rows += len(batch)
+            logger.info(f"{rows} linhas gravadas...")
+    finally:
+        for f in files.values():
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+    offsets.append(rows)
+    return rows, stations, offsets
+
+
+def publish(output, version):
+    """Aponta o link `current` para a nova versão de forma atômica"""
+    tmp_link = os.path.join(output, f".current-{version}")
+    os.symlink(version, tmp_link)
+    os.replace(tmp_link, os.path.join(output, "current"))
+
+
+def prune(output, keep):
+    """Remove versões antigas, mantendo a atual e as `keep` anteriores"""
+    current = os.path.realpath(os.path.join(output, "current"))
+    versions = sorted(
+        d for d in os.listdir(output)
+        if not d.startswith(".") and d != "current" and os.path.isdir(os.path.join(output, d))
+    )
+    for name in versions[: -(keep + 1)]:
+        path = os.path.join(output, name)
+        if path != current:
+            shutil.rmtree(path)
+            logger.info(f"Versão antiga removida: {name}")
+
+
+def main():
+    args = parse_args()
+    if not wait_for_postgres():
+        logger.error("Falha ao conectar com PostgreSQL")
+        sys.exit(1)
+
+    os.makedirs(args.output, exist_ok=True)
+    version = datetime.now().strftime("%Y%m%dT%H%M%S")
+    tmp_dir = os.path.join(args.output, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+
+    started = time.monotonic()
+    shard_urls = [url.strip() for url in args.shard_urls.split(",") if url.strip()]
+    conns = [psycopg2.connect(url) for url in shard_urls] or [get_connection()]
+    try:
+        # Leitura consistente: o snapshot vem de uma única transação por
+        # banco (com shards, cada um tem seu próprio instante de leitura)
+        for conn in conns:
+            conn.set_session(readonly=True, isolation_level="REPEATABLE READ")
+        start, end = resolve_coverage(conns, args.until)
+        if start is None:
+            logger.warning("public.status está vazia, nada a fazer")
+            shutil.rmtree(tmp_dir)
+            return
+        logger.info(f"Gerando snapshot de {start} a {end} em {tmp_dir}...")
+        rows, stations, offsets = write_columns(conns, tmp_dir, start, end, args.batch_rows)
+        for conn in conns:
+            conn.rollback()
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    finally:
+        for conn in conns:
+            conn.close()
+
+    np.asarray(stations, dtype="<i4").tofile(os.path.join(tmp_dir, "stations.i32"))
+    np.asarray(offsets, dtype="<i8").tofile(os.path.join(tmp_dir, "offsets.i64"))
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(
+            {
+                "format_version": FORMAT_VERSION,
+                "rows": rows,
+                "stations": len(stations),
+                "coverage_start": start.isoformat(),
+                "coverage_end": end.isoformat(),
+                "built_at": datetime.now().isoformat(),
+            },
+            f,
+            indent=2,
+        )
+
+    os.rename(tmp_dir, os.path.join(args.output, version))
+    publish(args.output, version)
+    prune(args.output, args.keep)
+
+    size = sum(
+        os.path.getsize(os.path.join(args.output, version, name))
+        for name in os.listdir(os.path.join(args.output, version))
+    )
+    logger.info(
+        f"Snapshot {version} publicado: {rows} linhas, {len(stations)} estações, "
+        f"{size / 1024 / 1024:.1f} MB em {time.monotonic() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
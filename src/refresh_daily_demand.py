@@ -0,0 +1,83 @@
+import argparse
+import logging
+import sys
+from datetime import date, timedelta
+
+from db_utils import get_connection, wait_for_postgres
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Atualiza incrementalmente a tabela public.daily_demand"
+    )
+    parser.add_argument("--start", type=date.fromisoformat, help="Primeiro dia (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Último dia, inclusivo (YYYY-MM-DD)")
+    parser.add_argument(
+        "--lookback-days",
+        type=int,
+        default=2,
+        help="Sem --start, recalcula a partir do último dia já materializado menos N dias",
+    )
+    return parser.parse_args()
+
+
+def resolve_range(cur, args):
+    """
+    Determina o intervalo [start, end) a recalcular
+
+    Sem --start, continua a partir do último dia presente em daily_demand
+    (recalculando alguns dias para cobrir escritas atrasadas) até o último
+    dia com viagens em public.trip.
+    """
+    if args.start is None:
+        cur.execute("SELECT MAX(date) FROM public.daily_demand")
+        last_day = cur.fetchone()[0]
+        if last_day is None:
+            cur.execute("SELECT MIN(start_date)::DATE FROM public.trip")
+            start = cur.fetchone()[0]
+        else:
+            start = last_day - timedelta(days=args.lookback_days)
+    else:
+        start = args.start
+
+    if args.end is None:
+        cur.execute("SELECT MAX(start_date)::DATE FROM public.trip")
+        end = cur.fetchone()[0]
+    else:
+        end = args.end
+
+    if start is None or end is None:
+        return None
+    return start, end + timedelta(days=1)
+
+
+def main():
+    args = parse_args()
+    if not wait_for_postgres():
+        logger.error("Falha ao conectar com PostgreSQL")
+        sys.exit(1)
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            day_range = resolve_range(cur, args)
+            if day_range is None:
+                logger.info("Nenhuma viagem encontrada, nada a atualizar")
+                return
+            start, end = day_range
+            logger.info(f"Recalculando daily_demand de {start} até {end} (exclusivo)...")
+            cur.execute("SELECT public.refresh_daily_demand(%s, %s)", (start, end))
+            rows = cur.fetchone()[0]
+        conn.commit()
+        logger.info(f"daily_demand atualizada: {rows} linhas")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+import psycopg2
+
+from db_utils import get_connection, load_env_vars, wait_for_postgres
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sql")
+
+# Tabela e índices de public.status (001, 003, 005 e 006) em cada shard
+SHARD_DDL = """
+CREATE TABLE IF NOT EXISTS public.status (
+    station_id INTEGER NOT NULL,
+    bikes_available INTEGER NOT NULL,
+    docks_available INTEGER NOT NULL,
+    time TIMESTAMP NOT NULL,
+    category1 INTEGER NULL,
+    category2 INTEGER NULL
+);
+CREATE INDEX IF NOT EXISTS idx_status_time_btree
+    ON public.status USING btree(time);
+CREATE INDEX IF NOT EXISTS idx_status_station_time
+    ON public.status USING btree(station_id, time)
+    INCLUDE (bikes_available, docks_available);
+"""
+
+# Retenção (status_hourly), NOTIFY do stream SSE, checkpoint do backfill e
+# intervalos de falta também rodam no shard; cada arquivo roda se a tabela
+# indicada não existe
+SHARD_SQL_FILES = {
+    "008-status-retention.sql": "public.status_hourly",
+    "010-status-notify.sql": None,
+    "011-backfill-checkpoint.sql": None,
+    "014-station-outages.sql": "public.station_outage",
+}
+
+COLUMNS = "station_id, bikes_available, docks_available, time, category1, category2"
+
+
+def parse_args():
+    load_env_vars()
+    parser = argparse.ArgumentParser(
+        description="Distribui public.status entre os shards por estação (STATUS_SHARD_URLS)"
+    )
+    parser.add_argument(
+        "--shard-urls",
+        default=os.getenv("STATUS_SHARD_URLS", ""),
+        help="URLs dos shards separadas por vírgula (padrão: STATUS_SHARD_URLS)",
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=("hash", "range"),
+        default=os.getenv("STATUS_SHARD_STRATEGY", "hash"),
+        help="Estratégia de distribuição (padrão: STATUS_SHARD_STRATEGY)",
+    )
+    parser.add_argument(
+        "--range-starts",
+        default=os.getenv("STATUS_SHARD_RANGE_STARTS", ""),
+        help="Primeira estação de cada shard após o primeiro, para --strategy range",
+    )
+    parser.add_argument(
+        "--schema-only",
+        action="store_true",
+        help="Apenas cria as tabelas nos shards, sem copiar amostras",
+    )
+    parser.add_argument(
+        "--truncate-source",
+        action="store_true",
+        help="Esvazia public.status no banco principal após copiar para todos os shards",
+    )
+    return parser.parse_args()
+
+
+def shard_predicates(count, strategy, range_starts):
+    """
+    Filtro SQL das estações de cada shard. Deve acompanhar
+    ShardMap.index_for em app/core/sharding.py
+    """
+    if strategy == "hash":
+        return [f"station_id % {count} = {i}" for i in range(count)]
+    if len(range_starts) != count - 1 or range_starts != sorted(range_starts):
+        raise ValueError(f"--range-starts precisa de {count - 1} valores crescentes")
+    bounds = [None, *range_starts, None]
+    predicates = []
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        clauses = []
+        if low is not None:
+            clauses.append(f"station_id >= {low}")
+        if high is not None:
+            clauses.append(f"station_id < {high}")
+        predicates.append(" AND ".join(clauses) or "TRUE")
+    return predicates
+
+
+def create_schema(shard):
+    with shard.cursor() as cur:
+        cur.execute(SHARD_DDL)
+        for fname, table in SHARD_SQL_FILES.items():
+            if table is not None:
+                cur.execute("SELECT to_regclass(%s)", (table,))
+                if cur.fetchone()[0] is not None:
+                    continue
+            with open(os.path.join(SQL_DIR, fname)) as f:
+                cur.execute(f.read())
+    shard.commit()
+
+
+def copy_shard(source, shard, predicate):
+    """
+    Copia as amostras do shard do banco principal via COPY, sem passar
+    os dados pela memória: um pipe liga o COPY TO da origem ao COPY FROM
+    do shard
+
+    Returns:
+        int: Linhas copiadas
+    """
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        try:
+            with os.fdopen(write_fd, "w") as out, source.cursor() as cur:
+                cur.copy_expert(
+                    f"COPY (SELECT {COLUMNS} FROM public.status WHERE {predicate}) TO STDOUT",
+                    out,
+                )
+        except Exception as e:
+            errors.append(e)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    with os.fdopen(read_fd, "r") as data, shard.cursor() as cur:
+        # Recarga idempotente: o shard recebe apenas o conteúdo atual da origem
+        cur.execute("SET sfbikeshare.skip_change_log = on")
+        cur.execute("SET sfbikeshare.skip_station_outages = on")
+        cur.execute("SET sfbikeshare.skip_status_notify = on")
+        cur.execute("TRUNCATE public.status")
+        cur.copy_expert(f"COPY public.status ({COLUMNS}) FROM STDIN", data)
+        rows = cur.rowcount
+        cur.execute("SELECT public.rebuild_station_outages()")
+    producer.join()
+    if errors:
+        shard.rollback()
+        raise errors[0]
+    shard.commit()
+    return rows
+
+
+def main():
+    args = parse_args()
+    urls = [url.strip() for url in args.shard_urls.split(",") if url.strip()]
+    if not urls:
+        logger.error("Nenhum shard configurado (STATUS_SHARD_URLS ou --shard-urls)")
+        sys.exit(1)
+    range_starts = [int(v) for v in args.range_starts.split(",") if v.strip()]
+    predicates = shard_predicates(len(urls), args.strategy, range_starts)
+
+    if not wait_for_postgres():
+        logger.error("Falha ao conectar com PostgreSQL")
+        sys.exit(1)
+
+    source = get_connection()
+    # Todos os shards leem o mesmo snapshot da origem
+    source.set_session(readonly=True, isolation_level="REPEATABLE READ")
+    try:
+        for i, (url, predicate) in enumerate(zip(urls, predicates)):
+            shard = psycopg2.connect(url)
+            try:
+                create_schema(shard)
+                if args.schema_only:
+                    logger.info(f"Shard {i}: tabelas criadas")
+                    continue
+                started = time.monotonic()
+                rows = copy_shard(source, shard, predicate)
+                logger.info(
+                    f"Shard {i} ({predicate}): {rows} linhas em {time.monotonic() - started:.1f}s"
+                )
+                shard.autocommit = True
+                with shard.cursor() as cur:
+                    cur.execute("VACUUM ANALYZE public.status")
+            finally:
+                shard.close()
+        source.rollback()
+    finally:
+        source.close()
+
+    if args.truncate_source and not args.schema_only:
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE public.status")
+            conn.commit()
+            logger.info("public.status esvaziada no banco principal")
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
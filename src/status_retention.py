@@ -0,0 +1,121 @@
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+
+import psycopg2
+
+from db_utils import get_connection, load_env_vars, wait_for_postgres
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = "sfbikeshare.status_retention"
+
+
+def parse_args():
+    load_env_vars()
+    parser = argparse.ArgumentParser(
+        description="Agrega por hora e remove amostras antigas de public.status"
+    )
+    parser.add_argument("--older-than-days", type=int, default=365, help="Idade mínima das amostras removidas")
+    parser.add_argument("--batch-hours", type=int, default=24, help="Janela de tempo processada por transação")
+    parser.add_argument("--max-batches", type=int, default=0, help="Limite de lotes (0 = sem limite)")
+    parser.add_argument("--no-vacuum", action="store_true", help="Não executa VACUUM ANALYZE ao final")
+    parser.add_argument(
+        "--shard-urls",
+        default=os.getenv("STATUS_SHARD_URLS", ""),
+        help="Aplica a retenção em cada shard (padrão: STATUS_SHARD_URLS) em vez do banco principal",
+    )
+    return parser.parse_args()
+
+
+def status_size(cur):
+    cur.execute("SELECT pg_total_relation_size('public.status')")
+    return cur.fetchone()[0]
+
+
+def run_retention(conn, args, cutoff, batch, label):
+    """
+    Agrega e remove as amostras antigas de um banco
+
+    Returns:
+        tuple: (lotes, linhas removidas, agregados gravados, bytes das linhas
+        removidas, tamanho da tabela ao final), ou None se outra execução
+        detém o lock
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (LOCK_NAME,))
+        if not cur.fetchone()[0]:
+            logger.warning(f"{label}: outra execução de retenção está em andamento, pulando")
+            return None
+
+        # A retenção não entra no feed de alterações (sql/013-change-log.sql)
+        # e mantém os intervalos de falta já calculados (sql/014-station-outages.sql)
+        cur.execute("SET sfbikeshare.skip_change_log = on")
+        cur.execute("SET sfbikeshare.skip_station_outages = on")
+        batches = rows_deleted = buckets_written = bytes_deleted = 0
+        logger.info(f"{label}: agregando amostras anteriores a {cutoff}...")
+        while not args.max_batches or batches < args.max_batches:
+            cur.execute(
+                "SELECT * FROM public.downsample_status_batch(%s, %s)", (cutoff, batch)
+            )
+            row = cur.fetchone()
+            if row is None:
+                break
+            window_start, window_end, deleted, written, freed = row
+            batches += 1
+            rows_deleted += deleted
+            buckets_written += written
+            bytes_deleted += freed
+            logger.info(
+                f"{label}: lote {batches}: {window_start} a {window_end}, "
+                f"{deleted} linhas em {written} agregados"
+            )
+
+        if rows_deleted and not args.no_vacuum:
+            logger.info(f"{label}: executando VACUUM ANALYZE public.status...")
+            cur.execute("VACUUM ANALYZE public.status")
+        size_after = status_size(cur)
+
+        cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (LOCK_NAME,))
+    return batches, rows_deleted, buckets_written, bytes_deleted, size_after
+
+
+def main():
+    args = parse_args()
+    if not wait_for_postgres():
+        logger.error("Falha ao conectar com PostgreSQL")
+        sys.exit(1)
+
+    cutoff = datetime.now() - timedelta(days=args.older_than_days)
+    batch = timedelta(hours=args.batch_hours)
+
+    # Com shards, public.status e status_hourly ficam em cada shard
+    shard_urls = [url.strip() for url in args.shard_urls.split(",") if url.strip()]
+    targets = [(f"Shard {i}", url) for i, url in enumerate(shard_urls)] or [("Banco principal", None)]
+    for label, url in targets:
+        conn = psycopg2.connect(url) if url else get_connection()
+        conn.autocommit = True
+        try:
+            result = run_retention(conn, args, cutoff, batch, label)
+        finally:
+            conn.close()
+        if result is None:
+            continue
+        batches, rows_deleted, buckets_written, bytes_deleted, size_after = result
+        # O VACUUM simples não encolhe o arquivo (as amostras antigas ficam no
+        # início da tabela): o espaço das linhas removidas fica livre para reuso
+        logger.info(
+            f"{label}: retenção concluída: {rows_deleted} linhas processadas em {batches} lotes, "
+            f"{buckets_written} agregados gravados, "
+            f"{bytes_deleted / 1024 / 1024:.1f} MB liberados para reuso "
+            f"(tabela com {size_after / 1024 / 1024:.1f} MB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
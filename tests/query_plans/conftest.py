@@ -0,0 +1,190 @@
+"""
+Fixtures for the query-plan regression suite.
+
+The suite builds a scratch database (`PLAN_TEST_DB`, default
+`sfbikeshare_plans`) on the server given by the usual `POSTGRES_*_APP`
+variables, running every file of `sql/` in order except the CSV loaders,
+which are replaced by the generators in this directory. The database is
+rebuilt only when those files or `PLAN_TEST_SCALE` change.
+"""
+import hashlib
+import json
+import os
+
+import psycopg2
+import pytest
+
+HERE = os.path.dirname(__file__)
+ROOT = os.path.dirname(os.path.dirname(HERE))
+SQL_DIR = os.path.join(ROOT, "sql")
+BASELINES_PATH = os.path.join(HERE, "baselines.json")
+
+GENERATORS = {
+    "002-load-base.sql": os.path.join(HERE, "generate-base.sql"),
+    "003-load-status.sql": os.path.join(HERE, "generate-status.sql"),
+}
+
+PLAN_TEST_DB = os.getenv("PLAN_TEST_DB", "sfbikeshare_plans")
+SCALE = int(os.getenv("PLAN_TEST_SCALE", "1"))
+COST_THRESHOLD = float(os.getenv("PLAN_COST_THRESHOLD", "0.5"))
+LARGE_TABLE_ROWS = int(os.getenv("PLAN_LARGE_TABLE_ROWS", "100000"))
+UPDATE_BASELINES = os.getenv("UPDATE_PLAN_BASELINES") == "1"
+
+
+def _connect(dbname):
+    return psycopg2.connect(
+        dbname=dbname,
+        user=os.getenv("POSTGRES_USER_APP", "postgres"),
+        password=os.getenv("POSTGRES_PASSWORD_APP", "postgres"),
+        host=os.getenv("POSTGRES_HOST_APP", "localhost"),
+        port=os.getenv("POSTGRES_PORT_APP", "5432"),
+    )
+
+
+def _build_steps():
+    """
+    Ordered (name, path) of the files that build the test database.
+    """
+    files = sorted(f for f in os.listdir(SQL_DIR) if f.endswith(".sql"))
+    return [(f, GENERATORS.get(f, os.path.join(SQL_DIR, f))) for f in files]
+
+
+def _fingerprint(steps):
+    digest = hashlib.sha256(str(SCALE).encode())
+    for name, path in steps:
+        with open(path, "rb") as f:
+            digest.update(name.encode() + f.read())
+    return digest.hexdigest()
+
+
+def _build_database():
+    steps = _build_steps()
+    fingerprint = _fingerprint(steps)
+
+    admin = _connect("postgres")
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (PLAN_TEST_DB,))
+        exists = cur.fetchone() is not None
+    if exists:
+        conn = _connect(PLAN_TEST_DB)
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('public.plan_test_fingerprint')")
+            if cur.fetchone()[0] is not None:
+                cur.execute("SELECT value FROM public.plan_test_fingerprint")
+                if cur.fetchone()[0] == fingerprint:
+                    conn.close()
+                    admin.close()
+                    return
+        conn.close()
+        with admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE "{PLAN_TEST_DB}"')
+    with admin.cursor() as cur:
+        cur.execute(f'CREATE DATABASE "{PLAN_TEST_DB}"')
+    admin.close()
+
+    conn = _connect(PLAN_TEST_DB)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        for name, path in steps:
+            with open(path) as f:
+                sql = f.read()
+            if path in GENERATORS.values():
+                cur.execute(sql, {"scale": SCALE})
+            else:
+                cur.execute(sql)
+        cur.execute("VACUUM ANALYZE")
+        cur.execute("CREATE TABLE public.plan_test_fingerprint (value TEXT)")
+        cur.execute("INSERT INTO public.plan_test_fingerprint VALUES (%s)", (fingerprint,))
+    conn.close()
+
+
+@pytest.fixture(scope="session")
+def plan_db():
+    """
+    Build (or reuse) the scratch database and point the app at it.
+    """
+    if os.getenv("RUN_PLAN_TESTS") != "1":
+        pytest.skip("set RUN_PLAN_TESTS=1 to run the query-plan regression suite")
+    _build_database()
+    os.environ["POSTGRES_DB_APP"] = PLAN_TEST_DB
+    return PLAN_TEST_DB
+
+
+@pytest.fixture
+def plan_conn(plan_db):
+    """
+    Connection to the plan database; everything it does is rolled back.
+    """
+    conn = _connect(plan_db)
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+@pytest.fixture(scope="session")
+def cost_threshold():
+    """
+    Relative cost increase over the baseline that fails a case (`PLAN_COST_THRESHOLD`).
+    """
+    return COST_THRESHOLD
+
+
+@pytest.fixture(scope="session")
+def update_baselines():
+    """
+    Whether plans are recorded as the new baselines (`UPDATE_PLAN_BASELINES=1`).
+    """
+    return UPDATE_BASELINES
+
+
+@pytest.fixture(scope="session")
+def large_tables(plan_db):
+    """
+    Tables whose planner row estimate makes a sequential scan a regression.
+    """
+    conn = _connect(plan_db)
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' "
+            "AND relnamespace = 'public'::regnamespace AND reltuples > %s",
+            (LARGE_TABLE_ROWS,),
+        )
+        tables = {row[0] for row in cur.fetchall()}
+    conn.close()
+    return tables
+
+
+@pytest.fixture(scope="session")
+def client(plan_db):
+    """
+    TestClient of the app bound to the plan database (lifespan not started).
+
+    The status snapshot is disabled so every route reaches Postgres, and
+    partitioned aggregates run as a single query so the captured
+    statements do not depend on thread scheduling.
+    """
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.main import app
+
+    settings.status_snapshot_enabled = False
+    settings.route_parallel_degree = {}
+
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def baselines():
+    """
+    Committed baselines; rewritten at the end when UPDATE_PLAN_BASELINES=1.
+    """
+    data = {}
+    if os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH) as f:
+            data = json.load(f)
+    yield data
+    if UPDATE_BASELINES:
+        with open(BASELINES_PATH, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write("\n")
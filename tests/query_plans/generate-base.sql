@@ -0,0 +1,56 @@
+-- Substitui sql/002-load-base.sql: dados sintéticos com volume realista.
+-- %(scale)s multiplica o número de viagens.
+SELECT setseed(0.42);
+
+INSERT INTO public.station (id, name, lat, long, dock_count, city, installation_date)
+SELECT
+    i,
+    'Station ' || i,
+    37.3 + random(),
+    -122.4 + random() * 0.5,
+    (ARRAY[11, 15, 19, 23, 27])[1 + mod(i, 5)],
+    (ARRAY['San Francisco', 'Redwood City', 'Palo Alto', 'Mountain View', 'San Jose'])[1 + mod(i, 5)],
+    DATE '2013-08-06'
+FROM generate_series(2, 84) i;
+
+INSERT INTO public.weather (
+    date, zip_code, max_temperature_f, mean_temperature_f, min_temperature_f,
+    mean_humidity, mean_visibility_miles, mean_wind_speed_mph,
+    precipitation_inches, cloud_cover, events
+)
+SELECT
+    d::DATE,
+    z,
+    70 + random() * 20,
+    60 + random() * 15,
+    45 + random() * 10,
+    50 + random() * 40,
+    10,
+    5 + random() * 10,
+    CASE WHEN random() < 0.15 THEN round((random() * 0.8)::NUMERIC, 2) ELSE 0 END,
+    floor(random() * 8),
+    CASE WHEN random() < 0.15 THEN 'Rain' WHEN random() < 0.1 THEN 'Fog' END
+FROM generate_series(TIMESTAMP '2013-08-29', TIMESTAMP '2015-08-31', INTERVAL '1 day') d
+CROSS JOIN unnest(ARRAY['94107', '94063', '94301', '94041', '95113']) z;
+
+INSERT INTO public.trip (
+    id, duration, start_date, start_station_id, end_date, end_station_id,
+    bike_id, subscription_type, zip_code
+)
+SELECT
+    i,
+    t.duration,
+    t.start_date,
+    2 + floor(random() * 83)::INTEGER,
+    t.start_date + make_interval(secs => t.duration),
+    2 + floor(random() * 83)::INTEGER,
+    1 + floor(random() * 700)::INTEGER,
+    CASE WHEN random() < 0.85 THEN 'Subscriber' ELSE 'Customer' END,
+    '94107'
+FROM generate_series(1, 670000 * %(scale)s) i
+CROSS JOIN LATERAL (
+    SELECT
+        (60 + floor(-ln(1 - random()) * 600))::INTEGER AS duration,
+        date_trunc('minute', TIMESTAMP '2013-08-29' + random() * INTERVAL '730 days') AS start_date
+    OFFSET 0 * i
+) t;
@@ -0,0 +1,27 @@
+-- Substitui sql/003-load-status.sql: uma amostra por estação a cada 5 minutos.
+-- %(scale)s multiplica o número de dias.
+DROP TABLE IF EXISTS public.status CASCADE;
+
+CREATE TABLE public.status (
+    station_id INTEGER NOT NULL,
+    bikes_available INTEGER NOT NULL,
+    docks_available INTEGER NOT NULL,
+    time TIMESTAMP NOT NULL
+);
+
+INSERT INTO public.status (station_id, bikes_available, docks_available, time)
+SELECT
+    s.id,
+    b.bikes,
+    s.dock_count - b.bikes,
+    t
+FROM public.station s
+CROSS JOIN generate_series(
+    TIMESTAMP '2013-08-29',
+    TIMESTAMP '2013-08-29' + %(scale)s * INTERVAL '100 days',
+    INTERVAL '5 minutes'
+) t
+CROSS JOIN LATERAL (
+    SELECT floor(random() * (s.dock_count + 1))::INTEGER AS bikes
+    OFFSET 0 * s.id
+) b;
@@ -0,0 +1,158 @@
+"""
+Query-plan regression suite.
+
+Each case calls a GET route, captures the SQL it sends to Postgres and
+runs it again under `EXPLAIN (FORMAT JSON)`. Plans are compared with
+`baselines.json`: a sequential scan over a large table that the
+baseline did not have, or a total cost more than `PLAN_COST_THRESHOLD`
+above the baseline, fails the case. Other plan-shape changes are
+reported as warnings.
+
+    RUN_PLAN_TESTS=1 python -m pytest tests/query_plans
+    RUN_PLAN_TESTS=1 UPDATE_PLAN_BASELINES=1 python -m pytest tests/query_plans
+"""
+import warnings
+
+import pytest
+from sqlalchemy import event
+
+P = "/api/v2"
+
+# (case name, path, query parameters)
+CASES = [
+    ("stations_list", "/stations/", {}),
+    ("station_get", "/stations/10", {}),
+    ("station_outages", "/stations/70/outages", {"start": "2013-09-01", "end": "2013-09-08", "kind": "empty"}),
+    ("station_outages_rank", "/stations/outages", {"start": "2013-09-01", "end": "2013-09-02"}),
+    ("trips_list", "/trips/", {}),
+    ("trips_by_start_station_and_date", "/trips/", {"start_station_id": 70, "start_date_from": "2014-03-01", "start_date_to": "2014-03-08"}),
+    ("trips_by_end_station", "/trips/", {"end_station_id": 70}),
+    ("trips_by_bike", "/trips/", {"bike_id": 288}),
+    ("trips_by_subscription_and_date", "/trips/", {"subscription_type": "Customer", "start_date_from": "2014-03-01", "start_date_to": "2014-03-02"}),
+    ("trips_by_duration", "/trips/", {"min_duration": 20000}),
+    ("trips_with_total", "/trips/", {"start_station_id": 70, "with_total": "true"}),
+    ("trips_active_at", "/trips/active", {"at": "2014-03-01T08:15:00"}),
+    ("trips_active_count_hourly", "/trips/active/count", {"start": "2014-03-01T06:00:00", "end": "2014-03-01T10:00:00", "bucket": "hour"}),
+    ("trip_get", "/trips/1000", {}),
+    ("trips_aggregate_by_station", "/trips/aggregate", {"start_date_from": "2014-01-01", "start_date_to": "2014-02-01", "group_by": "start_station_id"}),
+    ("trips_aggregate_station_filter", "/trips/aggregate", {"start_date_from": "2014-01-01", "start_date_to": "2014-07-01", "start_station_id": 70}),
+    ("bike_timeline", "/trips/bikes/288/timeline", {"start": "2014-01-01", "end": "2014-07-01"}),
+    ("status_list", "/status/", {}),
+    ("status_by_station", "/status/", {"station_id": 70, "skip": 1000}),
+    ("status_by_station_narrow", "/status/", {"station_id": 70, "fields": "time,bikes_available"}),
+    ("status_with_total", "/status/", {"with_total": "true"}),
+    ("status_by_station_range", "/status/", {"station_id": 70, "time_from": "2013-09-01", "time_to": "2013-09-02", "fields": "time,bikes_available"}),
+    ("status_by_time_range", "/status/", {"time_from": "2013-09-01T12:00:00", "time_to": "2013-09-01T13:00:00"}),
+    ("status_by_cursor", "/status/", {"cursor": "2013-09-01T12:00:00_70"}),
+    ("status_aggregate_hourly", "/status/aggregate", {"station_id": [2, 70], "time_from": "2013-09-01", "time_to": "2013-09-08", "bucket": "hour"}),
+    ("status_aggregate_all_stations", "/status/aggregate", {"time_from": "2013-09-01", "time_to": "2013-09-02"}),
+    ("status_at_batch", "/status/at", {"time": ["2013-09-01T08:15:00", "2013-09-15T18:00:00"]}),
+    ("status_get", "/status/70/2013-09-01T12:00:00", {}),
+    ("weather_list", "/weather/", {}),
+    ("weather_by_zip", "/weather/", {"zip_code": "94107", "fields": "date,zip_code,mean_temperature_f"}),
+    ("weather_get", "/weather/2014-01-01/94107", {}),
+    ("daily_demand_by_station", "/analytics/daily-demand", {"station_id": 70, "start": "2014-01-01", "end": "2014-12-31"}),
+    ("daily_demand_by_zip", "/analytics/daily-demand", {"zip_code": "94107", "start": "2014-01-01", "end": "2014-01-31"}),
+    ("changes_head", "/changes/", {}),
+    ("changes_since", "/changes/", {"since": "0-0", "tables": ["status", "trip"]}),
+]
+
+# Statements issued by the API's own plumbing rather than by the route
+IGNORED_PREFIXES = ("EXPLAIN", "SELECT set_config", "SELECT reltuples", "SELECT pg_", "SELECT 1")
+
+
+def _capture(client, path, params):
+    from app.core.database import engine
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not statement.lstrip().startswith(IGNORED_PREFIXES):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(P + path, params=params)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code < 500, response.text
+    return statements
+
+
+def _explain(statement, parameters):
+    from app.core.database import engine
+
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            return cur.fetchone()[0][0]["Plan"]
+    finally:
+        conn.close()
+
+
+def _shape(node, depth=0):
+    """
+    Flatten a plan into indented "Node Type on relation using index" lines.
+    """
+    line = "  " * depth + node["Node Type"]
+    if "Relation Name" in node:
+        line += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        line += f" using {node['Index Name']}"
+    lines = [line]
+    for child in node.get("Plans", []):
+        lines.extend(_shape(child, depth + 1))
+    return lines
+
+
+def _seq_scans(node):
+    scans = set()
+    if node["Node Type"] == "Seq Scan":
+        scans.add(node["Relation Name"])
+    for child in node.get("Plans", []):
+        scans |= _seq_scans(child)
+    return scans
+
+
+@pytest.mark.parametrize("name,path,params", CASES, ids=[case[0] for case in CASES])
+def test_query_plan(
+    name, path, params, client, baselines, large_tables, cost_threshold, update_baselines
+):
+    plans = []
+    for statement, parameters in _capture(client, path, params):
+        plan = _explain(statement, parameters)
+        plans.append({
+            "shape": _shape(plan),
+            "cost": plan["Total Cost"],
+            "seq_scans": sorted(_seq_scans(plan)),
+        })
+    assert plans, f"{name} issued no query"
+
+    if update_baselines:
+        baselines[name] = plans
+        return
+
+    assert name in baselines, f"No baseline for {name}; run with UPDATE_PLAN_BASELINES=1"
+    expected = baselines[name]
+    assert len(plans) == len(expected), (
+        f"{name} now issues {len(plans)} queries instead of {len(expected)}"
+    )
+
+    for index, (current, baseline) in enumerate(zip(plans, expected)):
+        new_seq_scans = (set(current["seq_scans"]) - set(baseline["seq_scans"])) & large_tables
+        assert not new_seq_scans, (
+            f"{name} query {index} now seq-scans {sorted(new_seq_scans)}:\n"
+            + "\n".join(current["shape"])
+        )
+        limit = baseline["cost"] * (1 + cost_threshold)
+        assert current["cost"] <= limit, (
+            f"{name} query {index} cost {current['cost']:.2f} exceeds baseline "
+            f"{baseline['cost']:.2f} by more than {cost_threshold:.0%}:\n"
+            + "\n".join(current["shape"])
+        )
+        if current["shape"] != baseline["shape"]:
+            warnings.warn(
+                f"{name} query {index} plan changed:\n"
+                + "\n".join(baseline["shape"]) + "\n->\n" + "\n".join(current["shape"])
+            )